@@ -37,16 +37,65 @@ can be used on future data.
     generator.generate(10000, file_prefix="test_")
     generator.save_scaler('data_scaler.pkl')
 
+Rendering can be spread across multiple processes by passing the number of
+workers into :py:meth:`~spiegelib.DatasetGenerator.generate`. Each worker process
+renders chunks of the dataset with its own synthesizer instance. Synthesizers
+that cannot be pickled (such as :class:`~spiegelib.synth.SynthVST`) must be
+created in each worker by a picklable factory function, optionally followed by
+loading a synth state JSON file saved with :py:meth:`~spiegelib.synth.SynthBase.save_state`.
+
+.. code-block:: python
+    :linenos:
+
+    def make_dexed():
+        return spgl.synth.SynthVST("/Library/Audio/Plug-Ins/VST/Dexed.vst",
+                                   note_length_secs=1.0,
+                                   render_length_secs=1.0)
+
+    generator = spgl.DatasetGenerator(make_dexed(), features,
+                                      output_folder="./data_FM_mfcc",
+                                      synth_factory=make_dexed,
+                                      synth_state="./dexed_config.json")
+    generator.generate(50000, file_prefix="train_", workers=8, seed=1)
+
+Datasets that are too large to fit in memory can be streamed to disk by setting
+a chunk size. Each chunk is written into memory mapped .npy files as soon as it
+has been rendered.
+
+.. code-block:: python
+    :linenos:
+
+    generator.generate(500000, file_prefix="train_", workers=8, chunk_size=1000)
+
+When streaming, a progress manifest is saved alongside the dataset and updated
+after every chunk. If generation is interrupted, it can be restarted from the
+last completed chunk by calling generate again with the same arguments and
+``resume=True``. If a scaler is being fit, the fitted scaler is also saved next to
+the manifest and scaling progress is recorded, so that an interrupted scaling
+pass is resumed without scaling any chunks twice.
+
+.. code-block:: python
+    :linenos:
+
+    generator.generate(500000, file_prefix="train_", workers=8, chunk_size=1000,
+                       resume=True)
+
 """
 
 import os
+import json
+import random
+import secrets
+import multiprocessing
 
 import numpy as np
 import scipy.io.wavfile
-from tqdm import trange
+from tqdm import tqdm
 
+from spiegelib import AudioBuffer
 from spiegelib.features.features_base import FeaturesBase
 from spiegelib.synth.synth_base import SynthBase
+from spiegelib.core.worker import init_worker, worker_synth, worker_features
 
 
 class DatasetGenerator():
@@ -63,15 +112,30 @@ class DatasetGenerator():
             object does not have a scaler set, then this will train a data scaler based on the
             generated dataset and store them in the features object. Call :py:meth:`save_scaler`
             to store scaler settings. Defaults to False.
+        synth_factory (callable, optional): A picklable function that takes no arguments
+            and returns a new synthesizer instance. Used to create a synthesizer in each
+            worker process when generating with multiple workers. Defaults to None, in
+            which case the synth object is pickled and sent to each worker.
+        synth_state (str, optional): Location of a synth state JSON file (see
+            :py:meth:`~spiegelib.synth.SynthBase.save_state`) that is loaded into each
+            worker synthesizer after it is created. Defaults to None.
 
     Attributes:
         features_filename (str): filename for features output file, defaults to features.npy
         patches_filename (str): filename for patches output file, defaults to patches.npy
+        manifest_filename (str): filename for the progress manifest saved when streaming
+            a dataset to disk, defaults to manifest.json
         audio_folder_name (str): folder name for the audio output if used. Will be automatically
             created within the output folder if saving audio. Defaults to audio
+        batch_size (int): number of random patches created and rendered at once with
+            :py:meth:`~spiegelib.synth.SynthBase.random_patches` and
+            :py:meth:`~spiegelib.synth.SynthBase.render_batch`. Defaults to 64.
+        max_chunk_size (int): maximum number of samples in each chunk sent to a worker
+            process when chunk_size isn't passed to :py:meth:`generate`. Defaults to 1024.
     """
 
-    def __init__(self, synth, features, output_folder=os.getcwd(), save_audio=False, scale=False):
+    def __init__(self, synth, features, output_folder=os.getcwd(), save_audio=False, scale=False,
+                 synth_factory=None, synth_state=None):
         """
         Contructor
         """
@@ -101,12 +165,27 @@ class DatasetGenerator():
         # Default filenames for output files
         self.features_filename = "features.npy"
         self.patches_filename = "patches.npy"
+        self.manifest_filename = "manifest.json"
+
+        # Number of patches to render at once
+        self.batch_size = 64
+
+        # Limits the size of results returned by worker processes
+        self.max_chunk_size = 1024
 
         # Should the feature set data be scaled?
         self.should_scale = scale
 
+        # Used to create synths in worker processes
+        if synth_factory is not None and not callable(synth_factory):
+            raise TypeError('synth_factory must be callable')
+
+        self.synth_factory = synth_factory
+        self.synth_state = synth_state
 
-    def generate(self, size, file_prefix="", fit_scaler_only=False):
+
+    def generate(self, size, file_prefix="", fit_scaler_only=False, workers=1, seed=None,
+                 chunk_size=None, resume=False):
         """
         Generate dataset with a set of random patches. Saves the extracted features
         and parameter settings in separate .npy files. Files are stored in the output
@@ -123,32 +202,135 @@ class DatasetGenerator():
             fit_scaler_only (bool, optional): If this is set to True, then
                 no data will be saved and only scaler will be set or reset
                 for the feature object.
+            workers (int, optional): Number of worker processes to render with. Each
+                worker creates its own synthesizer and renders chunks of the dataset.
+                Defaults to 1, which renders in this process.
+            seed (int, optional): Seed for the random number generators used to create
+                patches. Each chunk of the dataset is seeded with seed + chunk index so
+                that runs can be reproduced. Note that this only affects synthesizers that
+                use python or numpy random number generators, or that reseed their own
+                generators in :py:meth:`~spiegelib.synth.SynthBase.seed_random`.
+                Defaults to None. When streaming or rendering with more than one worker
+                without a seed, a random seed is chosen so that workers don't render the
+                same patches, and it is recorded in the progress manifest when streaming
+                so that resumed chunks continue the same dataset.
+            chunk_size (int, optional): If set, the dataset is rendered in chunks of this
+                many samples and each chunk is written to memory mapped .npy output files
+                as soon as it is complete, so memory usage is bounded by the chunk size
+                instead of the dataset size. If a scaler needs to be fit, the scaler is fit
+                and then applied one chunk at a time. Defaults to None, which holds the
+                entire dataset in memory and saves it once all samples have been rendered.
+                If not set, the dataset is split into one chunk per worker, with at most
+                max_chunk_size samples in each chunk.
+            resume (bool, optional): If True, continue generating a streamed dataset
+                from the progress manifest saved by a previous call with the same
+                file_prefix, size, and chunk_size. Chunks that were completed are
+                skipped and the seed recorded in the manifest is used for the rest.
+                If the scaling pass was interrupted, the saved scaler is loaded and
+                only chunks that weren't scaled yet are scaled. Requires chunk_size to
+                be set. Defaults to False.
         """
 
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError('chunk_size must be greater than zero, received %s' % chunk_size)
+
+        if resume and (chunk_size is None or fit_scaler_only):
+            raise ValueError('resume requires chunk_size to be set and fit_scaler_only to be False')
+
         # Get a single example to determine required array size required
         audio = self.synth.get_random_example()
         features = self.features(audio)
         patch = self.synth.get_patch()
 
-        # Arrays to hold dataset
-        shape = list(features.shape)
-        shape.insert(0, size)
-        feature_set = np.empty(shape, dtype=features.dtype)
-        patch_set = np.zeros((size, len(patch)), dtype=np.float32)
+        feature_shape = (size,) + features.shape
+        patch_shape = (size, len(patch))
+        features_path = os.path.join(self.output_folder, "%s%s" % (file_prefix, self.features_filename))
+        patches_path = os.path.join(self.output_folder, "%s%s" % (file_prefix, self.patches_filename))
+        manifest_path = os.path.join(self.output_folder, "%s%s" % (file_prefix, self.manifest_filename))
+
+        # Worker processes start with copies of the same random state, so each
+        # chunk must be seeded to render different patches
+        if seed is None and workers > 1:
+            seed = secrets.randbelow(2 ** 31)
+
+        # Is a scaler being fit and applied to the generated data?
+        fit_scaler = self.should_scale and not self.features.has_scaler()
+
+        # Arrays to hold dataset. When streaming these are memory mapped to the
+        # output files and chunks are written as they are rendered. Progress is
+        # recorded in a manifest so that generation can be resumed.
+        stream = chunk_size is not None and not fit_scaler_only
+        manifest = None
+        if stream:
+            # Chunks rendered after resuming must use the same seed
+            if seed is None:
+                seed = secrets.randbelow(2 ** 31)
+
+            manifest = {
+                'size': size,
+                'chunk_size': chunk_size,
+                'seed': seed,
+                'features_shape': list(feature_shape),
+                'features_dtype': str(features.dtype),
+                'patches_shape': list(patch_shape),
+                'chunks': [],
+                'scaler': False,
+                'scaled': [],
+                'pending': None,
+                'complete': False
+            }
+
+            if resume and os.path.exists(manifest_path):
+                manifest = DatasetGenerator._resume_manifest(manifest_path, manifest)
+                if manifest['complete']:
+                    if fit_scaler and manifest['scaler']:
+                        self.features.load_scaler(DatasetGenerator._scaler_path(manifest_path))
+                    print("Dataset already complete, nothing to resume", flush=True)
+                    return
+
+                seed = manifest['seed']
+                mode = 'r+'
+            else:
+                mode = 'w+'
+
+            feature_set = np.lib.format.open_memmap(features_path, mode=mode,
+                                                    dtype=features.dtype, shape=feature_shape)
+            patch_set = np.lib.format.open_memmap(patches_path, mode=mode,
+                                                  dtype=np.float32, shape=patch_shape)
+            DatasetGenerator._save_manifest(manifest_path, manifest)
+        else:
+            feature_set = np.empty(feature_shape, dtype=features.dtype)
+            patch_set = np.zeros(patch_shape, dtype=np.float32)
 
         # Should the features be normalized with the feature scaler?
         should_scale = self.should_scale and self.features.has_scaler()
 
-        # Generate data
-        for i in trange(size, desc="Generating Dataset"):
-            audio = self.synth.get_random_example()
-            feature_set[i] = self.features(audio, scale=should_scale)
-            patch_set[i] = [p[1] for p in self.synth.get_patch()]
+        if self.save_audio:
+            self._create_audio_folder()
+            audio_path = os.path.join(self.audio_folder_path, file_prefix)
+        else:
+            audio_path = None
 
-            # Save rendered audio if required
-            if self.save_audio:
-                self._create_audio_folder()
-                audio.save(os.path.join(self.audio_folder_path, "%soutput_%s.wav" % (file_prefix, i)))
+        # Generate data
+        chunks = DatasetGenerator._get_chunks(size, workers, chunk_size, seed,
+                                              should_scale, audio_path, self.batch_size,
+                                              self.max_chunk_size)
+
+        # Skip any chunks completed in a previous run
+        completed = 0
+        if manifest is not None:
+            finished = set(c[0] for c in manifest['chunks'])
+            completed = sum(c[1] - c[0] for c in manifest['chunks'])
+            chunks = [c for c in chunks if c[0] not in finished]
+
+        with tqdm(total=size, initial=completed, desc="Generating Dataset") as pbar:
+            for start, stop in self._render_chunks(chunks, workers, feature_set, patch_set,
+                                                   pbar):
+                if stream:
+                    feature_set.flush()
+                    patch_set.flush()
+                    manifest['chunks'].append([start, stop])
+                    DatasetGenerator._save_manifest(manifest_path, manifest)
 
         # If only fitting scaler, do that and return. Don't save any data
         if fit_scaler_only:
@@ -156,13 +338,183 @@ class DatasetGenerator():
             self.features.fit_scaler(feature_set, transform=False)
             return
 
-        if self.should_scale and not self.features.has_scaler():
+        if fit_scaler:
             print("Fitting scaler and scaling data", flush=True)
-            feature_set = self.features.fit_scaler(feature_set)
+            if stream:
+                self._scale_chunks(feature_set, chunk_size, manifest, manifest_path)
+            else:
+                feature_set = self.features.fit_scaler(feature_set)
 
         # Save dataset
-        np.save(os.path.join(self.output_folder, "%s%s" % (file_prefix, self.features_filename)), feature_set)
-        np.save(os.path.join(self.output_folder, "%s%s" % (file_prefix, self.patches_filename)), patch_set)
+        if stream:
+            manifest['complete'] = True
+            DatasetGenerator._save_manifest(manifest_path, manifest)
+        else:
+            np.save(features_path, feature_set)
+            np.save(patches_path, patch_set)
+
+
+    def _render_chunks(self, chunks, workers, feature_set, patch_set, pbar):
+        """
+        Render chunks of the dataset into the feature and patch arrays, either in this
+        process or using a pool of worker processes. Yields the start and stop index
+        of each chunk as it is completed.
+        """
+
+        if workers > 1:
+            synth = None if self.synth_factory else self.synth
+            initargs = (synth, self.synth_factory, self.synth_state, self.features)
+
+            with multiprocessing.Pool(workers, init_worker, initargs) as pool:
+                for start, features, patches in pool.imap_unordered(_render_chunk_worker,
+                                                                    chunks):
+                    feature_set[start:start + len(features)] = features
+                    patch_set[start:start + len(patches)] = patches
+                    pbar.update(len(features))
+                    yield start, start + len(features)
+
+        else:
+            for chunk in chunks:
+                _render_chunk(self.synth, self.features, chunk, feature_set, patch_set, pbar)
+                yield chunk[0], chunk[1]
+
+
+    def _fit_scaler_chunks(self, feature_set, chunk_size):
+        """
+        Fit the feature scaler one chunk at a time, so that a memory mapped dataset
+        doesn't need to be loaded into memory. Falls back to fitting on the whole
+        dataset if the scaler doesn't support partial fitting.
+        """
+
+        try:
+            for start in range(0, len(feature_set), chunk_size):
+                self.features.partial_fit_scaler(feature_set[start:start + chunk_size],
+                                                 reset=(start == 0))
+        except NotImplementedError:
+            print("Scaler does not support partial fitting, fitting on full dataset",
+                  flush=True)
+            self.features.fit_scaler(feature_set, transform=False)
+
+
+    def _scale_chunks(self, feature_set, chunk_size, manifest, manifest_path):
+        """
+        Fit the feature scaler and scale a memory mapped dataset in place one chunk
+        at a time, recording progress in the manifest. The scaler is saved once it
+        is fit, and each scaled chunk is saved to a pending file before it is
+        written to the dataset, so an interrupted pass can be resumed without
+        fitting the scaler on scaled data or scaling a chunk twice.
+        """
+
+        scaler_path = DatasetGenerator._scaler_path(manifest_path)
+        pending_path = os.path.splitext(manifest_path)[0] + '_pending.npy'
+
+        if manifest['scaler']:
+            self.features.load_scaler(scaler_path)
+        else:
+            self._fit_scaler_chunks(feature_set, chunk_size)
+            self.features.save_scaler(scaler_path)
+            manifest['scaler'] = True
+            DatasetGenerator._save_manifest(manifest_path, manifest)
+
+        finished = set(c[0] for c in manifest['scaled'])
+        for start in range(0, len(feature_set), chunk_size):
+            stop = min(start + chunk_size, len(feature_set))
+            if start in finished:
+                continue
+
+            # A chunk that was interrupted while being written is redone from
+            # the pending file instead of being scaled again
+            if manifest.get('pending') == [start, stop]:
+                scaled = np.load(pending_path)
+            else:
+                scaled = self.features.scale(feature_set[start:stop])
+                np.save(pending_path, scaled)
+                manifest['pending'] = [start, stop]
+                DatasetGenerator._save_manifest(manifest_path, manifest)
+
+            feature_set[start:stop] = scaled
+            feature_set.flush()
+            manifest['scaled'].append([start, stop])
+            manifest['pending'] = None
+            DatasetGenerator._save_manifest(manifest_path, manifest)
+
+        if os.path.exists(pending_path):
+            os.remove(pending_path)
+
+
+    @staticmethod
+    def _scaler_path(manifest_path):
+        """
+        Location of the scaler saved alongside a progress manifest
+        """
+
+        return os.path.splitext(manifest_path)[0] + '_scaler.pkl'
+
+
+    @staticmethod
+    def _get_chunks(size, workers, chunk_size, seed, should_scale, audio_path, batch_size=64,
+                    max_chunk_size=1024):
+        """
+        Split a dataset into chunks of contiguous samples. Returns a list of
+        tuples with the start index, stop index, and settings for each chunk.
+        If chunk_size isn't set, the dataset is split evenly between workers
+        with at most max_chunk_size samples in each chunk.
+        """
+
+        if chunk_size:
+            bounds = list(range(0, size, chunk_size)) + [size]
+        else:
+            num_chunks = max(max(workers, 1), -(-size // max_chunk_size))
+            bounds = np.linspace(0, size, num_chunks + 1, dtype=int)
+
+        chunks = []
+        for i in range(len(bounds) - 1):
+            if bounds[i] == bounds[i+1]:
+                continue
+
+            chunk_seed = None if seed is None else seed + i
+            chunks.append((int(bounds[i]), int(bounds[i+1]), chunk_seed, should_scale,
+                           audio_path, batch_size))
+
+        return chunks
+
+
+    @staticmethod
+    def _resume_manifest(path, expected):
+        """
+        Load a progress manifest from a previous run and check that it matches
+        the dataset being generated.
+        """
+
+        with open(path, 'r') as file_handle:
+            manifest = json.load(file_handle)
+
+        for key in ['size', 'chunk_size', 'features_shape', 'features_dtype', 'patches_shape']:
+            if manifest.get(key) != expected[key]:
+                raise ValueError('Unable to resume, %s in manifest %s does not match. '
+                                 'Expected %s, received %s.'
+                                 % (key, path, expected[key], manifest.get(key)))
+
+        # Manifests saved before scaling progress was recorded
+        manifest.setdefault('scaler', False)
+        manifest.setdefault('scaled', [])
+        manifest.setdefault('pending', None)
+
+        return manifest
+
+
+    @staticmethod
+    def _save_manifest(path, manifest):
+        """
+        Save progress manifest. Written to a temporary file first so that an
+        interruption never leaves a partially written manifest.
+        """
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as file_handle:
+            json.dump(manifest, file_handle, indent=True)
+
+        os.replace(temp_path, path)
 
 
     def save_scaler(self, file_name):
@@ -182,3 +534,76 @@ class DatasetGenerator():
         self.audio_folder_path = os.path.abspath(os.path.join(self.output_folder, self.audio_folder_name))
         if not (os.path.exists(self.audio_folder_path) and os.path.isdir(self.audio_folder_path)):
             os.mkdir(self.audio_folder_path)
+
+
+
+def _seed_random(synth, seed):
+    """
+    Seed python and numpy random number generators, and those of the synth, if a
+    seed is provided
+    """
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+        synth.seed_random(seed)
+
+
+def _render_batch(synth, features, should_scale, audio_path, start, size):
+    """
+    Render a batch of random patches and return the extracted features and
+    parameter values for each patch
+    """
+
+    patches = synth.random_patches(size)
+    audio = synth.render_batch(patches)
+
+    feature_set = []
+    for i, samples in enumerate(audio):
+        buffer = AudioBuffer(samples, synth.sample_rate)
+        feature_set.append(features(buffer, scale=should_scale))
+
+        # Save rendered audio if required
+        if audio_path is not None:
+            buffer.save("%soutput_%s.wav" % (audio_path, start + i))
+
+    return feature_set, patches
+
+
+def _render_chunk(synth, features, chunk, feature_set=None, patch_set=None, pbar=None):
+    """
+    Render a contiguous chunk of the dataset. Each batch is written into the feature
+    and patch arrays for the whole dataset as it is rendered. If arrays aren't given,
+    arrays holding just this chunk are created.
+    """
+
+    start, stop, seed, should_scale, audio_path, batch_size = chunk
+    _seed_random(synth, seed)
+
+    offset = 0 if feature_set is not None else start
+    for batch_start in range(start, stop, batch_size):
+        size = min(batch_size, stop - batch_start)
+        features_batch, patches = _render_batch(synth, features, should_scale, audio_path,
+                                                batch_start, size)
+        if feature_set is None:
+            feature_set = np.empty((stop - start,) + features_batch[0].shape,
+                                   dtype=features_batch[0].dtype)
+            patch_set = np.empty((stop - start, patches.shape[1]), dtype=np.float32)
+
+        index = batch_start - offset
+        for i, batch_features in enumerate(features_batch):
+            feature_set[index + i] = batch_features
+        patch_set[index:index + size] = patches
+
+        if pbar is not None:
+            pbar.update(size)
+
+    return start, feature_set, patch_set
+
+
+def _render_chunk_worker(chunk):
+    """
+    Render a chunk of the dataset within a worker process
+    """
+
+    return _render_chunk(worker_synth(), worker_features(), chunk)
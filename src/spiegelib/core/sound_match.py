@@ -41,9 +41,11 @@ Sound matching with a genetic algorithm
     result_patch = ga_matcher.get_patch()
 
 """
+import numpy as np
 
 from spiegelib import AudioBuffer
 from spiegelib.synth.synth_base import SynthBase
+from spiegelib.synth.patch import Patch
 from spiegelib.features.features_base import FeaturesBase
 from spiegelib.estimator.estimator_base import EstimatorBase
 
@@ -104,7 +106,8 @@ class SoundMatch():
     def get_patch(self):
         """
         Returns:
-            list: The resulting patch after estimation
+            list: The resulting patch after estimation, or a list of patches for
+            each target after :py:meth:`match_batch`
 
         Raises:
             Exception: If sound matching has not been run first
@@ -133,14 +136,55 @@ class SoundMatch():
 
         # Estimate parameters
         params = self.match_parameters(target)
+        return self._render_match(params)
+
+
+    def _render_match(self, params):
+        """
+        Load estimated parameters into the synth and return rendered audio
+        """
 
-        # Load patch into synth and return audio
         self.synth.set_patch(params)
         self.synth.render_patch()
         self.patch = self.synth.get_patch(skip_overridden=True)
         return self.synth.get_audio()
 
 
+    def match_batch(self, targets, batch_size=None):
+        """
+        Attempt to estimate parameters for a batch of targets and render audio for
+        all of the estimated patches with one call to
+        :py:meth:`~spiegelib.synth.SynthBase.render_batch`. Patches for each target
+        are available afterwards from :py:meth:`get_patch`.
+
+        Args:
+            targets (list or np.ndarray): list of :ref:`AudioBuffers <audio_buffer>`
+                or a 2D array of audio samples with shape (batch, samples)
+            batch_size (int, optional): Number of targets to predict at once, see
+                :py:meth:`match_parameters_batch`
+
+        Returns:
+            list: :ref:`AudioBuffers <audio_buffer>` with audio output from the
+            synthesizer for each target
+        """
+
+        if self.synth is None:
+            raise ValueError("No Synth object. Perhaps you want to run a parameter "
+                             "only match? Use match_parameters_batch method instead")
+
+        params = np.asarray(self.match_parameters_batch(targets, batch_size=batch_size))
+        audio = self.synth.render_batch(params)
+
+        # Patches as they were rendered, with values clamped and overridden parameters removed
+        patch = self.synth.patch
+        clamp = self.synth.param_range if self.synth.clamp_params else None
+        values = patch.expand_batch(params, clamp)[:, patch.free]
+        indices = patch.indices[patch.free].tolist()
+        self.patch = [list(zip(indices, row)) for row in values.tolist()]
+
+        return [AudioBuffer(samples, self.synth.sample_rate) for samples in audio]
+
+
     def match_parameters(self, target, expand=False):
         """
         Run estimation of parameters and use audio feature extraction if it
@@ -165,31 +209,89 @@ class SoundMatch():
         # Estimate parameters
         params = self.estimator.predict(input_data)
 
-        if expand and self.parameters is not None and self.overridden is not None:
-            param_indices = [p[0] for p in self.parameters]
-            params = SynthBase.expand_sub_patch(params, param_indices, self.overridden)
-            params = sorted(params + self.overridden, key=lambda p: p[0])
+        if expand:
+            params = self.expand_parameters(params)
             self.patch = params
-            if len(params) != len(self.parameters):
+
+        return params
+
+
+    def expand_parameters(self, params):
+        """
+        Expand parameter values returned from an estimator into a full patch,
+        including overridden parameters
+
+        Args:
+            params (list): parameter values returned from the estimator
+
+        Returns:
+            list: full patch as a list of tuples of parameter indices and values
+        """
+
+        if self.parameters is not None and self.overridden is not None:
+            patch = Patch(self.parameters, [p[0] for p in self.overridden])
+            if len(params) != len(patch.free) and len(params) != len(patch):
                 raise ValueError("Incorrect number of parameters returned. Number of "
                                  "overridden parameters from synth config file + parameters "
                                  "returned from the estimator must equal the full patch for synth")
 
-        elif expand and self.synth is not None:
+            patch.set_free(params)
+            params = patch.to_list()
+
+        elif self.synth is not None:
             self.synth.set_patch(params)
             params = self.synth.get_patch(skip_overridden=False)
-            self.patch = params
 
-        elif expand and (self.parameters is None or self.overridden is None):
+        else:
             raise ValueError("Unable to expand parameters, in order to use this feature please "
                              "load a synthesizer or a synth config JSON file during consruction")
 
         return params
 
 
+    def match_parameters_batch(self, targets, batch_size=None, expand=False):
+        """
+        Run estimation of parameters for a batch of targets. Feature extraction is
+        run once over the whole batch if it has been set (see
+        :py:meth:`~spiegelib.features.FeaturesBase.batch`), and estimators that
+        support batched prediction are called once per ``batch_size`` targets.
+
+        Args:
+            targets (list or np.ndarray): list of :ref:`AudioBuffer <audio_buffer>`
+                objects, or a 2D array of audio samples with shape (batch, samples).
+                If features have not been set then this is passed directly to the
+                estimator and can be any batch of inputs it accepts.
+            batch_size (int, optional): Number of targets to predict at once,
+                passed to :py:meth:`~spiegelib.estimator.EstimatorBase.predict_batch`
+            expand (bool, optional): If set to True, parameter values for each target
+                are expanded into a full patch with overridden parameters, see
+                :py:meth:`expand_parameters`.
+
+        Returns:
+            np.ndarray or list: estimated parameter values for each target, with shape
+            (batch, parameters). A list of full patches if expand is True.
+        """
+
+        # Attempt to run feature extraction if features have been provided
+        if self.features is not None:
+            input_data = self.features.batch(targets)
+        else:
+            input_data = targets
+
+        params = self.estimator.predict_batch(input_data, batch_size=batch_size)
+
+        if expand:
+            return [self.expand_parameters(p) for p in params]
+
+        return params
+
+
     def match_from_file(self, path):
         """
-        Load audio file from disk and perform sound matching on it
+        Load audio file from disk and perform sound matching on it. If features
+        have been set, they are extracted with
+        :py:meth:`~spiegelib.features.FeaturesBase.from_file` so that results in the
+        feature cache are used without loading the file.
 
         Args:
             filepath (str): location of audio file on disk
@@ -198,8 +300,15 @@ class SoundMatch():
             :ref:`AudioBuffer <audio_buffer>`: audio output from synthesizer after sound matching
         """
 
-        target = AudioBuffer(path, self.features.sample_rate)
-        return self.match(target)
+        if self.features is None:
+            return self.match(AudioBuffer(path, self.synth.sample_rate))
+
+        if self.synth is None:
+            raise ValueError("No Synth object. Perhaps you want to run a parameter "
+                             "only match? Use match_parameter method instead")
+
+        params = self.estimator.predict(self.features.from_file(path))
+        return self._render_match(params)
 
 
     def setup_synth_params(self, config_location):
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+State of worker processes that render with a synthesizer and extract features,
+shared by :class:`~spiegelib.DatasetGenerator` and
+:class:`~spiegelib.estimator.EvaluationPool`. Pass :py:func:`init_worker` as the
+initializer of a ``multiprocessing.Pool`` and get the synthesizer and feature
+extractor in tasks with :py:func:`worker_synth` and :py:func:`worker_features`::
+
+    initargs = (synth, synth_factory, synth_state, features)
+    with multiprocessing.Pool(workers, init_worker, initargs) as pool:
+        results = pool.map(task, items)
+
+The synthesizer is created by the first task run in each worker rather than by
+the initializer, since a pool restarts workers whose initializer fails
+indefinitely. An error creating the synthesizer is raised by the task instead, and
+is passed back to the main process.
+"""
+
+from spiegelib.synth.synth_base import SynthBase
+
+
+# Synthesizer and feature extractor used by this worker process
+_worker = {}
+
+
+def init_worker(synth, synth_factory, synth_state, features):
+    """
+    Initializer for worker processes
+
+    Args:
+        synth (:class:`~spiegelib.synth.SynthBase`): synthesizer to use, pickled to
+            each worker. Ignored if synth_factory is set.
+        synth_factory (callable): picklable function that takes no arguments and
+            returns a new synthesizer, called once in each worker
+        synth_state (str): location of a synth state JSON file that is loaded into
+            the worker synthesizer
+        features (:class:`~spiegelib.features.FeaturesBase`): feature extractor
+    """
+
+    _worker['synth'] = None
+    _worker['synth_args'] = (synth, synth_factory, synth_state)
+    _worker['features'] = features
+
+
+def worker_synth():
+    """
+    Get the synthesizer for this worker process, creating it if necessary
+
+    Returns:
+        :class:`~spiegelib.synth.SynthBase`: synthesizer for this worker
+    """
+
+    if _worker['synth'] is None:
+        synth, synth_factory, synth_state = _worker['synth_args']
+        if synth_factory is not None:
+            synth = SynthBase.from_factory(synth_factory, synth_state)
+        elif synth_state is not None:
+            synth.load_state(synth_state)
+
+        _worker['synth'] = synth
+
+    return _worker['synth']
+
+
+def worker_features():
+    """
+    Get the feature extractor for this worker process
+
+    Returns:
+        :class:`~spiegelib.features.FeaturesBase`: feature extractor for this worker
+    """
+
+    return _worker['features']
@@ -10,6 +10,8 @@ from .tf_estimator_base import TFEstimatorBase
 # Genetic Algorithms
 from .basic_ga import BasicGA
 from .nsga3 import NSGA3
+from .evaluation_pool import EvaluationPool
+from .fitness_cache import FitnessCache
 
 # Deep learning models
 from .conv6 import Conv6
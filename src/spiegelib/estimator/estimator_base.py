@@ -4,6 +4,7 @@ Abstract Base Class for Synthesizer Parameter Estimators
 """
 
 from abc import ABC, abstractmethod
+import numpy as np
 
 class EstimatorBase(ABC):
 
@@ -21,3 +22,37 @@ class EstimatorBase(ABC):
         given some input
         """
         pass
+
+
+    def predict_batch(self, inputs, batch_size=None):
+        """
+        Predict parameters for a batch of inputs. By default this calls
+        :py:meth:`predict` on each input, estimators that support batched
+        prediction override this.
+
+        Args:
+            inputs (np.ndarray or iterable): batch of inputs, or an iterable of inputs
+            batch_size (int, optional): Number of inputs to predict at once. Ignored
+                by estimators that do not support batched prediction.
+
+        Returns:
+            np.ndarray: stacked predictions for each input
+        """
+
+        return np.array([self.predict(input) for input in inputs])
+
+
+    def close(self):
+        """
+        Release resources held by this estimator, such as worker processes. Does
+        nothing by default, estimators that hold resources override this.
+        """
+        pass
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
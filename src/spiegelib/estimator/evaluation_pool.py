@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Pool of worker processes for evaluating the fitness of a population of
+synthesizer patches in parallel. Each worker process has its own synthesizer and
+feature extraction objects. The target is sent to each worker once per
+population, and each worker evaluates a slice of the population.
+
+This is used by the genetic algorithm estimators when they are constructed with
+more than one worker, where it is registered as the ``map`` function in the DEAP
+toolbox.
+
+Example evaluating a population using a fitness function, which must be picklable
+and accept a synth, features, target, and individual::
+
+    def make_dexed():
+        return spgl.synth.SynthVST("/Library/Audio/Plug-Ins/VST/Dexed.vst")
+
+    features = spgl.features.MFCC(num_mfccs=13, hop_size=1024)
+    pool = EvaluationPool(features, workers=8, synth_factory=make_dexed)
+    fitnesses = pool.map(spgl.estimator.BasicGA.evaluate_fitness, target, population)
+    pool.close()
+
+Functions that evaluate many individuals at once, such as
+:py:meth:`~spiegelib.estimator.BasicGA.evaluate_population`, can be used with
+:py:meth:`EvaluationPool.map_batches` so that each worker renders its slice of the
+population with :py:meth:`~spiegelib.synth.SynthBase.render_batch`::
+
+    fitnesses = pool.map_batches(spgl.estimator.BasicGA.evaluate_population,
+                                 target, population)
+"""
+
+import os
+import multiprocessing
+
+from spiegelib.core.worker import init_worker, worker_synth, worker_features
+
+
+class EvaluationPool():
+    """
+    Args:
+        features (Object or list): Feature extraction object, or list of feature
+            extraction objects, that is copied to each worker process.
+        workers (int, optional): Number of worker processes. Defaults to the number
+            of CPUs.
+        synth (Object, optional): Synthesizer that is pickled and copied to each worker.
+            Ignored if synth_factory is set.
+        synth_factory (callable, optional): A picklable function that takes no
+            arguments and returns a new synthesizer. Called in each worker process.
+        synth_state (str, optional): Location of a synth state JSON file (see
+            :py:meth:`~spiegelib.synth.SynthBase.save_state`) that is loaded into each
+            worker synthesizer after it is created.
+    """
+
+    def __init__(self, features, workers=None, synth=None, synth_factory=None,
+                 synth_state=None):
+        """
+        Constructor
+        """
+
+        if synth is None and synth_factory is None:
+            raise ValueError('Either synth or synth_factory must be provided')
+
+        if synth_factory is not None and not callable(synth_factory):
+            raise TypeError('synth_factory must be callable')
+
+        self.features = features
+        self.workers = workers if workers else os.cpu_count()
+        self.synth = None if synth_factory else synth
+        self.synth_factory = synth_factory
+        self.synth_state = synth_state
+        self.pool = None
+
+
+    def start(self):
+        """
+        Start worker processes. Called automatically the first time
+        :py:meth:`map` is called.
+        """
+
+        if self.pool is None:
+            initargs = (self.synth, self.synth_factory, self.synth_state, self.features)
+            self.pool = multiprocessing.Pool(self.workers, init_worker, initargs)
+
+
+    def map(self, fitness, target, individuals):
+        """
+        Evaluate fitness of a population of individuals in worker processes
+
+        Args:
+            fitness (callable): A picklable function that is called in a worker
+                process with the worker synth, features, target, and an individual,
+                and returns the fitness of that individual.
+            target (np.ndarray or list): Target features. Passed into fitness function
+                without modification.
+            individuals (list): Population of individuals to evaluate, each individual
+                is a list of parameter values.
+
+        Returns:
+            list: fitness values for each individual in the same order as individuals
+        """
+
+        return self._map_slices(_evaluate, fitness, target, individuals)
+
+
+    def map_batches(self, fitness, target, individuals):
+        """
+        Evaluate fitness of a population of individuals in worker processes, where
+        each worker evaluates its slice of the population with one call to the
+        fitness function
+
+        Args:
+            fitness (callable): A picklable function that is called in a worker
+                process with the worker synth, features, target, and a list of
+                individuals, and returns the fitness of each individual.
+            target (np.ndarray or list): Target features. Passed into fitness function
+                without modification.
+            individuals (list): Population of individuals to evaluate, each individual
+                is a list of parameter values.
+
+        Returns:
+            list: fitness values for each individual in the same order as individuals
+        """
+
+        return self._map_slices(_evaluate_batch, fitness, target, individuals)
+
+
+    def _map_slices(self, evaluate, fitness, target, individuals):
+        """
+        Split a population into contiguous slices, one per worker, and evaluate
+        each slice in a worker process
+        """
+
+        if len(individuals) == 0:
+            return []
+
+        self.start()
+
+        individuals = [list(individual) for individual in individuals]
+        size = -(-len(individuals) // self.workers)
+        tasks = [(fitness, target, individuals[i:i + size])
+                 for i in range(0, len(individuals), size)]
+
+        results = self.pool.map(evaluate, tasks)
+        return [value for result in results for value in result]
+
+
+    def close(self):
+        """
+        Stop worker processes
+        """
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+def _evaluate(task):
+    """
+    Evaluate a slice of a population within a worker process
+    """
+
+    fitness, target, individuals = task
+    return [fitness(worker_synth(), worker_features(), target, individual)
+            for individual in individuals]
+
+
+def _evaluate_batch(task):
+    """
+    Evaluate a slice of a population within a worker process with a single call
+    to the fitness function
+    """
+
+    fitness, target, individuals = task
+    return fitness(worker_synth(), worker_features(), target, individuals)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Least recently used cache of fitness values for genetic algorithm estimators.
+Individuals are keyed by their parameter values quantized to a fixed resolution,
+along with a digest of the target features, so results can be reused within a
+prediction and across repeated predictions for the same target. Each cache hit
+skips rendering and feature extraction for an individual.
+
+Used by :class:`~spiegelib.estimator.BasicGA` and :class:`~spiegelib.estimator.NSGA3`
+when constructed with a cache size::
+
+    ga = spgl.estimator.BasicGA(synth, features, cache_size=10000)
+    ga.predict(target)
+    print(ga.fitness_cache.hits, ga.fitness_cache.misses)
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FitnessCache():
+    """
+    Args:
+        max_size (int, optional): Maximum number of fitness values to store. The
+            least recently used values are removed once this is reached. Defaults to 10000.
+        resolution (float, optional): Parameter values are rounded to a multiple of
+            this value before being used as a key. Defaults to 1e-6.
+
+    Attributes:
+        hits (int): Number of fitness lookups that were found in the cache
+        misses (int): Number of fitness lookups that were not found in the cache
+    """
+
+    def __init__(self, max_size=10000, resolution=1e-6):
+        """
+        Constructor
+        """
+
+        if max_size < 1:
+            raise ValueError('max_size must be greater than zero, received %s' % max_size)
+
+        if resolution <= 0:
+            raise ValueError('resolution must be greater than zero, received %s' % resolution)
+
+        self.max_size = max_size
+        self.resolution = resolution
+        self.target_key = b''
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+
+    def set_target(self, target):
+        """
+        Set the target that fitness values are calculated against.
+
+        Args:
+            target (np.ndarray or list): Target features, or a list of target features
+        """
+
+        targets = target if isinstance(target, list) else [target]
+        digest = hashlib.sha1()
+        for item in targets:
+            item = np.ascontiguousarray(item)
+            digest.update(str(item.shape).encode('utf-8'))
+            digest.update(item.tobytes())
+
+        self.target_key = digest.digest()
+
+
+    def key(self, individual):
+        """
+        Args:
+            individual (list): Parameter values
+
+        Returns:
+            bytes: cache key for an individual and the current target
+        """
+
+        quantized = np.round(np.asarray(individual, dtype=np.float64) / self.resolution)
+        return self.target_key + quantized.astype(np.int64).tobytes()
+
+
+    def map(self, evaluate, individuals):
+        """
+        Get fitness values for a list of individuals. Fitness is only calculated
+        for individuals that are not in the cache, and only once for duplicate
+        individuals.
+
+        Args:
+            evaluate (callable): Function that accepts a list of individuals and returns
+                a list of fitness values for those individuals
+            individuals (list): Individuals to get fitness values for
+
+        Returns:
+            list: Fitness values in the same order as individuals
+        """
+
+        keys = [self.key(individual) for individual in individuals]
+        results = [None] * len(individuals)
+        missing = OrderedDict()
+
+        for i, key in enumerate(keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results[i] = self._cache[key]
+                self.hits += 1
+            elif key in missing:
+                missing[key].append(i)
+                self.hits += 1
+            else:
+                missing[key] = [i]
+                self.misses += 1
+
+        if missing:
+            fitnesses = evaluate([individuals[indices[0]] for indices in missing.values()])
+            for (key, indices), fitness in zip(missing.items(), fitnesses):
+                for i in indices:
+                    results[i] = fitness
+
+                self._cache[key] = fitness
+                if len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+        return results
+
+
+    def clear(self):
+        """
+        Remove all fitness values and reset hit and miss counters
+        """
+
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self._cache)
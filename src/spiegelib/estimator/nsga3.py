@@ -13,8 +13,11 @@ from deap import base
 from deap import creator
 from deap import tools
 
+from spiegelib import AudioBuffer
 from spiegelib.evaluation.evaluation_base import EvaluationBase
 from spiegelib.estimator.estimator_base import EstimatorBase
+from spiegelib.estimator.evaluation_pool import EvaluationPool
+from spiegelib.estimator.fitness_cache import FitnessCache
 from spiegelib.synth.synth_base import SynthBase
 from spiegelib.features.features_base import FeaturesBase
 
@@ -31,10 +34,29 @@ class NSGA3(EstimatorBase):
             ngen (int, optional): Number of generations to run
             cxpb (float, optional): Crossover probability, must be between 0 and 1.
             mutpb (float, optional): Mutation probability, must be between 0 and 1.
+            workers (int, optional): Number of worker processes used to evaluate the
+                fitness of each generation concurrently. Defaults to 1, which evaluates
+                in this process. See :class:`~spiegelib.estimator.EvaluationPool`.
+                Worker processes are stopped by :py:meth:`close`, or when the estimator is
+                used in a with statement.
+            synth_factory (callable, optional): A picklable function that takes no
+                arguments and returns a new synthesizer, used to create a synthesizer in
+                each worker process. Defaults to None, in which case the synth is pickled
+                and copied to each worker.
+            synth_state (str, optional): Location of a synth state JSON file that is
+                loaded into each worker synthesizer after it is created.
+            cache_size (int, optional): Maximum number of fitness values to store in a
+                fitness cache, which is used to skip evaluating individuals with the same
+                parameters as a previously evaluated individual for the same target.
+                Defaults to 0, which disables the cache. See
+                :class:`~spiegelib.estimator.FitnessCache`.
+            cache_resolution (float, optional): Resolution that parameter values are
+                quantized to when looking up cached fitness values. Defaults to 1e-6.
     """
 
     def __init__(self, synth, features, seed=None, pop_size=100, ngen=25,
-                 cxpb=0.5, mutpb=0.5):
+                 cxpb=0.5, mutpb=0.5, workers=1, synth_factory=None, synth_state=None,
+                 cache_size=0, cache_resolution=1e-6):
         """
         Constructor
         """
@@ -59,6 +81,18 @@ class NSGA3(EstimatorBase):
 
         self.logbook = tools.Logbook()
 
+        # Evaluate generations in parallel using worker processes
+        self.evaluation_pool = None
+        if workers > 1:
+            self.evaluation_pool = EvaluationPool(self.features_list, workers, synth=synth,
+                                                  synth_factory=synth_factory,
+                                                  synth_state=synth_state)
+
+        # Cache of previously evaluated individuals
+        self.fitness_cache = None
+        if cache_size:
+            self.fitness_cache = FitnessCache(cache_size, cache_resolution)
+
         random.seed(seed)
         self._setup()
 
@@ -95,6 +129,8 @@ class NSGA3(EstimatorBase):
         ref_points = tools.uniform_reference_points(self.num_objectives, 12)
 
         self.toolbox.register("evaluate", self.fitness)
+        self.toolbox.register("evaluate_population", self._evaluate_cached)
+        self.toolbox.register("map", self._map_population)
         self.toolbox.register("mate", tools.cxSimulatedBinaryBounded, low=0.0,
                               up=1.0, eta=30.0)
         self.toolbox.register("mutate", tools.mutPolynomialBounded, low=0.0,
@@ -118,21 +154,125 @@ class NSGA3(EstimatorBase):
             list: A list of the error values, one for each feature extractor
         """
 
-        self.synth.set_patch(individual)
-        self.synth.render_patch()
-        out = self.synth.get_audio()
+        return NSGA3.evaluate_fitness(self.synth, self.features_list, self.target,
+                                      individual)
+
+
+    @staticmethod
+    def evaluate_fitness(synth, features_list, target, individual):
+        """
+        Calculate the fitness of an individual by rendering audio and measuring the
+        mean absolute error between features of that audio and the target features
+        for each feature extractor. Used by :py:meth:`fitness` and by worker processes
+        when evaluating in parallel.
+
+        Args:
+            synth (Object): synthesizer to render individual with
+            features_list (list): list of feature extraction objects
+            target (list): list of target features, one for each feature extractor
+            individual (list): List of float values representing a synthesizer patch
+
+        Returns:
+            list: A list of the error values, one for each feature extractor
+        """
+
+        synth.set_patch(individual)
+        synth.render_patch()
+        out = synth.get_audio()
 
         errors = []
         index = 0
-        for extractor in self.features_list:
+        for extractor in features_list:
             out_features = extractor(out)
-            errors.append(EvaluationBase.mean_abs_error(self.target[index],
+            errors.append(EvaluationBase.mean_abs_error(target[index],
                                                         out_features))
             index += 1
 
         return errors
 
 
+    @staticmethod
+    def evaluate_population(synth, features_list, target, individuals, batch_size=64):
+        """
+        Calculate the fitness of a list of individuals. Individuals are rendered
+        ``batch_size`` at a time with :py:meth:`~spiegelib.synth.SynthBase.render_batch`,
+        and fitness is calculated in the same way as :py:meth:`evaluate_fitness`.
+        Used during prediction and by worker processes when evaluating in parallel.
+
+        Args:
+            synth (Object): synthesizer to render individuals with
+            features_list (list): list of feature extraction objects
+            target (list): list of target features, one for each feature extractor
+            individuals (list): List of individuals, each a list of float values
+                representing a synthesizer patch
+            batch_size (int, optional): Number of individuals to render at once.
+                Defaults to 64.
+
+        Returns:
+            list: A list of the error values for each individual, one for each
+            feature extractor
+        """
+
+        fitnesses = []
+        for start in range(0, len(individuals), batch_size):
+            audio = synth.render_batch(individuals[start:start + batch_size])
+            for samples in audio:
+                out = AudioBuffer(samples, synth.sample_rate)
+                fitnesses.append([EvaluationBase.mean_abs_error(target[i], extractor(out))
+                                  for i, extractor in enumerate(features_list)])
+
+        return fitnesses
+
+
+    def close(self):
+        """
+        Stop the worker processes used to evaluate fitness, if there are any. They
+        are started again if :py:meth:`predict` is called after this.
+        """
+
+        if self.evaluation_pool is not None:
+            self.evaluation_pool.close()
+
+
+    def _map_population(self, evaluate, individuals):
+        """
+        Registered as the toolbox map function. Populations mapped with
+        :py:meth:`fitness`, the default toolbox evaluate function, are evaluated all
+        at once with the toolbox evaluate_population function. Other functions are
+        called for each individual.
+        """
+
+        if getattr(evaluate, 'func', None) == self.fitness:
+            return self.toolbox.evaluate_population(individuals)
+
+        return list(map(evaluate, individuals))
+
+
+    def _evaluate_cached(self, individuals):
+        """
+        Registered as the toolbox evaluate_population function. Evaluates a
+        population, skipping any individuals with cached fitness values.
+        """
+
+        if self.fitness_cache is not None:
+            return self.fitness_cache.map(self._evaluate_population, individuals)
+
+        return self._evaluate_population(individuals)
+
+
+    def _evaluate_population(self, individuals):
+        """
+        Evaluate a list of individuals using the evaluation pool if it is set,
+        otherwise in this process. Individuals are rendered in batches.
+        """
+
+        if self.evaluation_pool is not None:
+            return self.evaluation_pool.map_batches(NSGA3.evaluate_population, self.target,
+                                                    individuals)
+
+        return NSGA3.evaluate_population(self.synth, self.features_list, self.target, individuals)
+
+
     def predict(self, input):
         """
         Run prection on input audio target
@@ -145,6 +285,9 @@ class NSGA3(EstimatorBase):
         for extractor in self.features_list:
             self.target.append(extractor(input))
 
+        if self.fitness_cache is not None:
+            self.fitness_cache.set_target(self.target)
+
         pop = self.toolbox.population(n=self.pop_size)
         invalid_ind = [ind for ind in pop if not ind.fitness.valid]
         fitnesses = self.toolbox.map(self.toolbox.evaluate, invalid_ind)
@@ -46,6 +46,7 @@ deep learning models like this, see the :ref:`FM Sound Match Example <fm_sound_m
 """
 
 import os
+import threading
 from abc import abstractmethod
 import datetime
 import numpy as np
@@ -63,13 +64,16 @@ class TFEstimatorBase(EstimatorBase):
             synthesizer parameters this will typically be the number of parameters.
         weights_path (string, optional): If given, model weights will be loaded from this file
         callbacks (list, optional): A list of callbacks to be passed into model fit method
+        inference_mode (bool, optional): If True, single instance predictions are run
+            through a compiled inference function, see :py:meth:`set_inference_mode`.
+            Defaults to False.
 
     Attributes:
         model (``tf.keras.Model``): Attribute for the model, see `TensorFlow docs <https://www.tensorflow.org/api_docs/python/tf/keras/Model>`__
     """
 
     def __init__(self, input_shape=None, num_outputs=None,
-                 weights_path = "", callbacks=[]):
+                 weights_path = "", callbacks=[], inference_mode=False):
         """
         Constructor
         """
@@ -98,6 +102,14 @@ class TFEstimatorBase(EstimatorBase):
         if weights_path:
             self.load_weights(weights_path)
 
+        # Compiled inference function for low latency single predictions
+        self.inference_mode = False
+        self._inference_function = None
+        self._inference_input = None
+        self._inference_lock = threading.Lock()
+        if inference_mode:
+            self.set_inference_mode(True)
+
 
     @abstractmethod
     def build_model(self):
@@ -197,25 +209,133 @@ class TFEstimatorBase(EstimatorBase):
             **kwargs
         )
 
-    def predict(self, input):
+    def predict(self, input, batch_size=None):
         """
         Run prediction on input
 
-        Arg (np.ndarray): matrix of input data to run predictions on. Can a single
-            instance or a batch
+        Args:
+            input (np.ndarray or iterable): input data to run predictions on. Can be
+                a single instance with shape ``input_shape``, a batch with shape
+                ``(N, *input_shape)``, or an iterable of single instances.
+            batch_size (int, optional): Number of instances passed to the model at
+                once when predicting on a batch. Defaults to 256.
+
+        Returns:
+            np.ndarray: prediction for a single instance, or stacked predictions
+            for a batch
+        """
+
+        if isinstance(input, np.ndarray) and input.shape == tuple(self.input_shape):
+            if self.inference_mode:
+                return self._predict_inference(input)
+            return self.model.predict_on_batch(input[np.newaxis])[0]
+
+        return self.predict_batch(input, batch_size)
+
+
+    def predict_batch(self, inputs, batch_size=None):
         """
+        Run prediction on a batch of inputs. The model is called once for every
+        ``batch_size`` instances, inputs provided as an iterable are collected into
+        batches as they are consumed.
 
-        # If this is a single instance we need to wrap in an np.array
-        is_single_input = False
-        if input.shape == self.input_shape:
-            is_single_input = True
-            input = np.array([input])
+        Args:
+            inputs (np.ndarray or iterable): batch with shape ``(N, *input_shape)``,
+                or an iterable of instances with shape ``input_shape``
+            batch_size (int, optional): Number of instances passed to the model at
+                once. Defaults to 256.
+
+        Returns:
+            np.ndarray: stacked predictions with shape ``(N, num_outputs)``
+        """
+
+        batch_size = batch_size if batch_size else 256
+        if batch_size < 1:
+            raise ValueError('batch_size must be greater than zero, received %s' % batch_size)
+
+        if isinstance(inputs, np.ndarray):
+            if inputs.shape[1:] != tuple(self.input_shape):
+                raise Exception('Input data has incorrect shape, expected %s or (N, %s), '
+                                'got %s' % (self.input_shape, self.input_shape, inputs.shape))
+            batches = (inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size))
         else:
-            raise Exception('Input data has incorrect shape, expected %s, '
-                             'got %s' % (self.input_shape, input.shape))
+            batches = self._collect_batches(inputs, batch_size)
+
+        predictions = [self.model.predict_on_batch(batch) for batch in batches]
+        if not predictions:
+            return np.empty((0, self.num_outputs) if self.num_outputs else (0,))
+
+        return np.concatenate(predictions)
+
+
+    def _collect_batches(self, inputs, batch_size):
+        """
+        Generator that stacks instances from an iterable into batches
+        """
+
+        batch = []
+        for input in inputs:
+            input = np.asarray(input)
+            if input.shape != tuple(self.input_shape):
+                raise Exception('Input data has incorrect shape, expected %s, '
+                                'got %s' % (self.input_shape, input.shape))
+            batch.append(input)
+            if len(batch) == batch_size:
+                yield np.stack(batch)
+                batch = []
 
-        prediction = self.model.predict(input)
-        return prediction[0] if is_single_input else prediction
+        if batch:
+            yield np.stack(batch)
+
+
+    def set_inference_mode(self, enabled=True, warmup=True):
+        """
+        Enable or disable inference mode. In inference mode, predictions for a single
+        instance call the model through a ``tf.function`` traced once with a fixed input
+        signature of a single float32 instance, and input data is copied into a
+        preallocated input array. This avoids the per-call setup of ``model.predict``
+        and is suited to servers responding to one target at a time.
+
+        Args:
+            enabled (bool, optional): Whether to enable inference mode. Defaults to True.
+            warmup (bool, optional): If True, the inference function is traced and run
+                once on zeros so that the first prediction is not delayed. Defaults to True.
+        """
+
+        if not enabled:
+            self.inference_mode = False
+            self._inference_function = None
+            self._inference_input = None
+            return
+
+        if self.model is None or self.input_shape is None:
+            raise Exception('A model with an input shape is required for inference mode')
+
+        input_shape = (1,) + tuple(self.input_shape)
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=input_shape, dtype=tf.float32)])
+        def inference_function(input):
+            return model(input, training=False)
+
+        self._inference_function = inference_function
+        self._inference_input = np.zeros(input_shape, dtype=np.float32)
+        self.inference_mode = True
+
+        if warmup:
+            self._predict_inference(self._inference_input[0])
+
+
+    def _predict_inference(self, input):
+        """
+        Predict a single instance using the compiled inference function
+        """
+
+        with self._inference_lock:
+            self._inference_input[0] = input
+            prediction = self._inference_function(self._inference_input)
+
+        return prediction.numpy()[0]
 
 
     def load_weights(self, filepath, **kwargs):
@@ -270,13 +390,15 @@ class TFEstimatorBase(EstimatorBase):
 
 
     @staticmethod
-    def load(filepath, **kwargs):
+    def load(filepath, inference_mode=False, **kwargs):
         """
         Load entire model and return an istantiated TFEstimatorBase class with
         the saved model loaded into it.
 
         Args:
             filepath (str): path to SavedModel or H5 file of saved model.
+            inference_mode (bool, optional): If True, inference mode is enabled and
+                warmed up after loading, see :py:meth:`set_inference_mode`.
             kwargs: Keyword arguments to pass into load_model function. See
                 `TensorFlow Doc <`https://www.tensorflow.org/api_docs/python/tf/keras/models/load_model>`__.
         """
@@ -293,6 +415,9 @@ class TFEstimatorBase(EstimatorBase):
         model = GenericTFModel()
         model.model = tf.keras.models.load_model(filepath, custom_objects=custom_objects)
         model.input_shape = model.model.get_layer(index=0).input_shape[1:]
+        if inference_mode:
+            model.set_inference_mode(True)
+
         return model
 
 
@@ -59,14 +59,19 @@ class MFCCEval(EvaluationBase):
             have the results from each method in the same position in each list.
         sample_rate (int, optional): sample rate to run feature extraction at. Defaults
             to the audio rate of the first target.
+        feature_cache (:class:`~spiegelib.features.FeatureCache`, optional): cache
+            used to store MFCCs, so features for the same audio are only calculated
+            once across evaluations.
         kwargs: Keyword arguments to pass into :class:`~spiegelib.evaluation.EvaluationBase`
     """
 
-    def __init__(self, targets, estimations, sample_rate=None, **kwargs):
+    def __init__(self, targets, estimations, sample_rate=None, feature_cache=None, **kwargs):
         """
         Constructor
         """
         self.sample_rate = sample_rate if sample_rate else targets[0].get_sample_rate()
+        self.mfcc = MFCC(sample_rate=self.sample_rate)
+        self.mfcc.set_cache(feature_cache)
         super().__init__(targets, estimations, **kwargs)
 
 
@@ -88,11 +93,10 @@ class MFCCEval(EvaluationBase):
         """
 
         results = []
-        mfcc = MFCC(sample_rate=self.sample_rate)
-        target_mfccs = mfcc(target)
+        target_mfccs = self.mfcc(target)
 
         for pred in predictions:
-            estimated_mfccs = mfcc(pred)
+            estimated_mfccs = self.mfcc(pred)
             results.append({
                 'mean_abs_error': EvaluationBase.mean_abs_error(target_mfccs, estimated_mfccs),
                 'mean_squared_error': EvaluationBase.mean_squared_error(target_mfccs, estimated_mfccs),
@@ -6,6 +6,7 @@ Init file for features
 from .data_scaler_base import DataScalerBase
 from .standard_scaler import StandardScaler
 
+from .feature_cache import FeatureCache
 from .features_base import FeaturesBase
 from .fft import FFT
 from .mfcc import MFCC
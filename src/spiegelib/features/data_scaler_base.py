@@ -21,6 +21,20 @@ class DataScalerBase(ABC):
         raise NotImplementedError
 
 
+    def partial_fit(self, data, axis=None):
+        """
+        Update scaling parameters with part of a dataset, so that parameters can be
+        fit to datasets that are too large to hold in memory. Optional, scalers that
+        support this must implement it.
+
+        Args:
+            data (np.ndarray): part of a dataset, split along the first axis
+            axis (int, tuple, optional): axis or axes to use for calculating scaling
+                parameteres. Defaults to None which will flatten the array first.
+        """
+        raise NotImplementedError
+
+
     @abstractmethod
     def transform(self, data):
         """
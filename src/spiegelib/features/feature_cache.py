@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+"""
+Persistent on-disk cache of audio feature extraction results. Results are stored
+as ``.npy`` files named by a hash of the audio and of the feature extraction
+settings, so the same cache folder can be shared by different feature extractors
+and reused across runs. The total size of the cache is bounded, and the least
+recently used results are removed once it grows past that size.
+
+A key for an audio buffer is computed from the audio samples and sample rate, the
+class and settings of the feature extractor, its modifiers, and the state of its
+scaler if scaling is applied. Modifiers are keyed by their code, the values they
+capture in closures, and the arguments of ``functools.partial`` objects. Results
+aren't cached for feature extractors with settings that can't be keyed
+deterministically, such as callable objects without attributes. Audio files can also be keyed by their path,
+modification time, and size, which avoids loading the file when there is a hit
+(see :py:meth:`~spiegelib.features.FeaturesBase.from_file`).
+
+Feature extraction classes opt in to caching with
+:py:meth:`~spiegelib.features.FeaturesBase.set_cache`::
+
+    cache = spgl.features.FeatureCache('./feature_cache', max_size=2**30)
+    mfcc = spgl.features.MFCC(num_mfccs=13)
+    mfcc.set_cache(cache)
+
+    # Results are loaded from the cache after the first call
+    features = mfcc(audio)
+    features = mfcc.from_file('./target.wav')
+    print(cache.report())
+"""
+
+import os
+import types
+import hashlib
+import functools
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class FeatureCache():
+    """
+    Args:
+        path (str): folder to store cached features in. Created if it doesn't exist.
+        max_size (int, optional): maximum total size of cached features in bytes.
+            Defaults to 1 GiB.
+
+    Attributes:
+        hits (int): number of lookups that were found in the cache
+        misses (int): number of lookups that were not found in the cache
+    """
+
+    def __init__(self, path, max_size=2**30):
+        """
+        Constructor
+        """
+
+        if max_size <= 0:
+            raise ValueError('max_size must be greater than zero, received %s' % max_size)
+
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._load_index()
+
+
+    def key(self, features, audio, scale):
+        """
+        Get the cache key for extracting features from an audio buffer
+
+        Args:
+            features (:class:`~spiegelib.features.FeaturesBase`): feature extractor
+            audio (:ref:`AudioBuffer <audio_buffer>`): input audio
+            scale (bool): whether scaling is applied
+
+        Returns:
+            str: hex digest key, or None if the feature extractor can't be keyed
+        """
+
+        digest = FeatureCache._features_digest(features, scale)
+        if digest is None:
+            return None
+
+        samples = np.ascontiguousarray(audio.get_audio())
+        FeatureCache._update_digest(digest, ('audio', audio.get_sample_rate(),
+                                             samples.dtype.str, samples.shape))
+        digest.update(samples.tobytes())
+        return digest.hexdigest()
+
+
+    def file_key(self, features, path, scale):
+        """
+        Get the cache key for extracting features from an audio file, based on the
+        location, modification time, and size of the file
+
+        Args:
+            features (:class:`~spiegelib.features.FeaturesBase`): feature extractor
+            path (str): location of audio file
+            scale (bool): whether scaling is applied
+
+        Returns:
+            str: hex digest key, or None if the feature extractor can't be keyed
+        """
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest = FeatureCache._features_digest(features, scale)
+        if digest is None:
+            return None
+
+        FeatureCache._update_digest(digest, ('file', path, stat.st_mtime_ns, stat.st_size))
+        return digest.hexdigest()
+
+
+    def get(self, key):
+        """
+        Load cached features
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            np.ndarray: cached features, or None if they are not in the cache
+        """
+
+        location = self._location(key)
+        try:
+            features = np.load(location, allow_pickle=False)
+            os.utime(location)
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.misses += 1
+                self._remove_entry(key)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._add_entry(key, os.path.getsize(location))
+
+        return features
+
+
+    def put(self, key, features):
+        """
+        Save features to the cache, removing least recently used features if the
+        cache is larger than the maximum size
+
+        Args:
+            key (str): cache key
+            features (np.ndarray): features to save
+        """
+
+        location = self._location(key)
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+
+        # Write to a temporary file first so partially written files are never loaded
+        handle, temp_location = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(location))
+        try:
+            with os.fdopen(handle, 'wb') as file_handle:
+                np.save(file_handle, np.asarray(features), allow_pickle=False)
+            os.replace(temp_location, location)
+        except Exception:
+            if os.path.exists(temp_location):
+                os.remove(temp_location)
+            raise
+
+        with self._lock:
+            self._remove_entry(key)
+            self._add_entry(key, os.path.getsize(location))
+            self._evict()
+
+
+    def report(self):
+        """
+        Returns:
+            dict: number of hits and misses, hit rate, number of cached entries, and
+            total size of cached features in bytes
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'size': self._size
+            }
+
+
+    def clear(self):
+        """
+        Remove all cached features and reset hit and miss counters
+        """
+
+        with self._lock:
+            for key in list(self._entries):
+                self._delete(key)
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __getstate__(self):
+        # Locks can't be pickled, so feature extractors with a cache can still be
+        # copied to worker processes. Each copy keeps its own index of the folder.
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+    def _location(self, key):
+        """
+        Location of the file for a cache key. Files are split into subfolders by
+        the first two characters of the key.
+        """
+
+        return os.path.join(self.path, key[:2], key + '.npy')
+
+
+    def _load_index(self):
+        """
+        Index files already in the cache folder, ordered from least to most
+        recently used
+        """
+
+        entries = []
+        for folder in os.scandir(self.path):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith('.npy'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._add_entry(key, size)
+
+        self._evict()
+
+
+    def _add_entry(self, key, size):
+        self._entries[key] = size
+        self._size += size
+
+
+    def _remove_entry(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits in the maximum size
+        """
+
+        while self._size > self.max_size and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._delete(key)
+
+
+    def _delete(self, key):
+        try:
+            os.remove(self._location(key))
+        except FileNotFoundError:
+            pass
+
+
+    @staticmethod
+    def _features_digest(features, scale):
+        """
+        Start a digest with the class and settings of a feature extractor. Returns
+        None if a setting can't be added to the digest deterministically.
+        """
+
+        digest = hashlib.sha1()
+        cls = type(features)
+        settings = {name: value for name, value in vars(features).items()
+                    if not name.startswith('_') and name not in ('scaler', 'cache')}
+
+        try:
+            FeatureCache._update_digest(digest, (cls.__module__, cls.__qualname__))
+            FeatureCache._update_digest(digest, settings)
+            FeatureCache._update_digest(digest, ('scale', bool(scale)))
+            if scale and features.scaler is not None:
+                FeatureCache._update_digest(digest, vars(features.scaler))
+        except _UnkeyableError:
+            return None
+
+        return digest
+
+
+    @staticmethod
+    def _update_digest(digest, value, depth=0):
+        """
+        Add a value to a digest. Arrays are added by their contents, and functions
+        by their name, code, default arguments, and closure values.
+
+        Raises:
+            _UnkeyableError: if the value can't be added deterministically
+        """
+
+        if depth > FeatureCache._max_depth:
+            raise _UnkeyableError()
+
+        update = functools.partial(FeatureCache._update_digest, digest, depth=depth + 1)
+
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            digest.update(('ndarray%s%s' % (value.dtype.str, value.shape)).encode('utf-8'))
+            digest.update(value.tobytes())
+        elif isinstance(value, dict):
+            digest.update(b'{')
+            for name in sorted(value, key=str):
+                update(name)
+                update(value[name])
+            digest.update(b'}')
+        elif isinstance(value, (list, tuple)):
+            digest.update(b'[')
+            for item in value:
+                update(item)
+            digest.update(b']')
+        elif isinstance(value, (set, frozenset)):
+            # Sorted so that the order doesn't depend on hash randomization
+            digest.update(b'(')
+            for item in sorted(value, key=repr):
+                update(item)
+            digest.update(b')')
+        elif isinstance(value, functools.partial):
+            digest.update(b'partial')
+            update((value.func, value.args, value.keywords))
+        elif isinstance(value, types.MethodType):
+            digest.update(b'method')
+            update((value.__func__, value.__self__))
+        elif isinstance(value, types.FunctionType):
+            digest.update(('function %s.%s' % (value.__module__, value.__qualname__))
+                          .encode('utf-8'))
+            closure = [cell.cell_contents for cell in value.__closure__ or ()]
+            update((value.__code__, value.__defaults__, value.__kwdefaults__, closure))
+        elif isinstance(value, types.CodeType):
+            digest.update(value.co_code)
+            update((value.co_consts, value.co_names))
+        elif isinstance(value, (type, types.BuiltinFunctionType, np.ufunc)):
+            name = '%s.%s' % (getattr(value, '__module__', ''),
+                              getattr(value, '__qualname__', value.__name__))
+            digest.update(name.encode('utf-8'))
+        elif callable(value) or ' at 0x' in repr(value):
+            # Other objects are added by class and attributes, objects without
+            # attributes are only identified by their memory address
+            if not hasattr(value, '__dict__'):
+                raise _UnkeyableError()
+            cls = type(value)
+            update(('%s.%s' % (cls.__module__, cls.__qualname__), vars(value)))
+        else:
+            digest.update(repr(value).encode('utf-8'))
+
+
+    # Limit on nesting of values, which stops values that refer to themselves
+    _max_depth = 32
+
+
+
+class _UnkeyableError(Exception):
+    """
+    Raised when a value can't be added to a cache key deterministically
+    """
+
@@ -17,6 +17,24 @@ Example of FFT, which inherits from FeaturesBase::
     # Now feature extraction is run by treating
     # the FFT instance, fft, like a function
     spectrum = fft(audio)
+
+Feature extraction can also be run on a batch of audio with
+:py:meth:`~spiegelib.features.FeaturesBase.batch`, which accepts a list of
+equal length :ref:`AudioBuffers <audio_buffer>` or a 2D array of audio samples
+with the shape (batch, samples). Inheriting classes can override
+:py:meth:`~spiegelib.features.FeaturesBase.get_features_batch` with a vectorized
+implementation::
+
+    audio = [AudioBuffer('./some_audio.wav'), AudioBuffer('./more_audio.wav')]
+    spectra = fft.batch(audio)
+
+Results can be stored in a persistent :class:`~spiegelib.features.FeatureCache`
+by calling :py:meth:`~spiegelib.features.FeaturesBase.set_cache`. Cached results
+are then loaded instead of running feature extraction again for the same audio::
+
+    fft.set_cache(spgl.features.FeatureCache('./feature_cache'))
+    spectrum = fft(audio)
+    spectrum = fft.from_file('./some_audio.wav')
 """
 
 from abc import ABC, abstractmethod
@@ -26,6 +44,7 @@ import numpy as np
 import joblib
 from tqdm import trange
 
+from spiegelib import AudioBuffer
 from spiegelib.features import StandardScaler
 
 
@@ -70,6 +89,8 @@ class FeaturesBase(ABC):
         # Update this in inheriting classes if you need
         self.dtype = np.float32
 
+        self.cache = None
+
 
     def __call__(self, audio, scale=None):
         """
@@ -87,6 +108,60 @@ class FeaturesBase(ABC):
             np.ndarray: results from audio feature extraction with modifiers and scaling.
         """
 
+        should_scale = scale if scale != None else self.should_scale
+        if self.cache is None:
+            return self._run_pipeline(audio, should_scale)
+
+        key = self.cache.key(self, audio, should_scale)
+        if key is None:
+            return self._run_pipeline(audio, should_scale)
+
+        features = self.cache.get(key)
+        if features is None:
+            features = self._run_pipeline(audio, should_scale)
+            self.cache.put(key, features)
+
+        return features
+
+
+    def from_file(self, path, scale=None):
+        """
+        Run this feature extraction pipeline on an audio file. If a cache is set,
+        results are looked up using the location, modification time, and size of
+        the file, so the file is only loaded when there is a cache miss.
+
+        Args:
+            path (str): location of audio file to extract features from. Audio is
+                resampled to the sample rate of this feature extractor.
+            scale (bool, optional): If set, will override scale attribute set
+                during construction.
+
+        Returns:
+            np.ndarray: results from audio feature extraction with modifiers and scaling.
+        """
+
+        should_scale = scale if scale != None else self.should_scale
+        if self.cache is None:
+            return self._run_pipeline(AudioBuffer(path, self.sample_rate), should_scale)
+
+        key = self.cache.file_key(self, path, should_scale)
+        if key is None:
+            return self._run_pipeline(AudioBuffer(path, self.sample_rate), should_scale)
+
+        features = self.cache.get(key)
+        if features is None:
+            features = self._run_pipeline(AudioBuffer(path, self.sample_rate), should_scale)
+            self.cache.put(key, features)
+
+        return features
+
+
+    def _run_pipeline(self, audio, should_scale):
+        """
+        Run input modifiers, feature extraction, prescale modifiers, scaling, and
+        output modifiers on a single audio buffer
+        """
+
         # Input data modification
         for modifer in self.input_modifiers:
             audio = modifer(audio)
@@ -94,6 +169,49 @@ class FeaturesBase(ABC):
         # Run feature extraction
         features = self.get_features(audio)
 
+        # Apply any prescaling data modification
+        for modifier in self.prescale_modifiers:
+            features = modifier(features)
+
+        # Normalize features
+        if should_scale:
+            assert self.has_scaler(), "Scaler must be set first."
+            features = self.scale(features)
+
+        # Apply any output data modification
+        for modifier in self.output_modifiers:
+            features = modifier(features)
+
+        return features
+
+
+    def batch(self, audio, scale=None):
+        """
+        Run this feature extraction pipeline on a batch of audio.
+
+        Input modifiers are applied to each audio buffer prior to feature extraction.
+        Prescale modifiers, data scaling, and output modifiers are applied once over
+        the stacked results, so modifiers used with batches must accept arrays with
+        the batch on the first axis.
+
+        Args:
+            audio (list or np.ndarray): A list of :ref:`AudioBuffers <audio_buffer>`
+                with the same length, or a 2D array of audio samples with the shape
+                (batch, samples). Audio must be at the sample rate of this feature
+                extractor.
+            scale (bool, optional): If set, will override scale attribute set
+                during construction.
+
+        Returns:
+            np.ndarray: results from audio feature extraction with modifiers and scaling,
+                with the batch on the first axis.
+        """
+
+        audio = self._stack_audio(audio)
+
+        # Run feature extraction
+        features = self.get_features_batch(audio)
+
         # Apply any prescaling data modification
         for modifier in self.prescale_modifiers:
             features = modifier(features)
@@ -127,6 +245,23 @@ class FeaturesBase(ABC):
         pass
 
 
+    def get_features_batch(self, audio):
+        """
+        Run audio feature extraction on a batch of audio. Defaults to calling
+        :py:meth:`~spiegelib.features.FeaturesBase.get_features` on each
+        item in the batch, override to implement vectorized feature extraction.
+
+        Args:
+            audio (np.ndarray): Audio samples with the shape (batch, samples)
+
+        Returns:
+            np.ndarray: Results of audio feature extraction with the batch on the first axis
+        """
+
+        return np.stack([self.get_features(AudioBuffer(item, self.sample_rate))
+                         for item in audio])
+
+
     def add_modifier(self, modifier, type):
         """
         Add a data modifier to the feature extraction pipeline.
@@ -179,6 +314,24 @@ class FeaturesBase(ABC):
             return None
 
 
+    def partial_fit_scaler(self, data, reset=False):
+        """
+        Update scaler with part of a dataset, for datasets that are too large to fit
+        in memory. Call this for each part of the dataset split along the first axis.
+
+        Args:
+            data (np.ndarray): part of a dataset to train (fit) scaler on
+            reset (bool, optional): if True, a new scaler is created before fitting.
+                Should be set for the first part of a dataset. A new scaler is also
+                created if one hasn't been set.
+        """
+
+        if reset or self.scaler is None:
+            self.scaler = self.ScalerClass()
+
+        self.scaler.partial_fit(data, self.scale_axis)
+
+
     def has_scaler(self):
         """
         Returns:
@@ -203,6 +356,22 @@ class FeaturesBase(ABC):
         self.scaler = scaler
 
 
+    def set_cache(self, cache):
+        """
+        Set a cache to store feature extraction results in. Cached results are used
+        by :py:meth:`~spiegelib.features.FeaturesBase.__call__` and
+        :py:meth:`~spiegelib.features.FeaturesBase.from_file`. Results are keyed by
+        the public attributes of this object, including the code and closure values
+        of modifiers. Results aren't cached if an attribute can't be keyed.
+
+        Args:
+            cache (:class:`~spiegelib.features.FeatureCache`): cache to use, or None
+                to disable caching.
+        """
+
+        self.cache = cache
+
+
     def scale(self, data):
         """
         Scale features using pre-trained scaler
@@ -218,6 +387,48 @@ class FeaturesBase(ABC):
         return self.scaler.transform(data)
 
 
+    def _stack_audio(self, audio):
+        """
+        Apply input modifiers to a batch of audio and stack samples into a 2D
+        array with the shape (batch, samples)
+        """
+
+        if len(audio) == 0:
+            raise ValueError('Received an empty batch of audio')
+
+        if isinstance(audio, np.ndarray):
+            if audio.ndim != 2:
+                raise ValueError('Expected audio batch with shape (batch, samples), '
+                                 'received %s' % (audio.shape,))
+
+            if not self.input_modifiers:
+                return audio
+
+            audio = [AudioBuffer(item, self.sample_rate) for item in audio]
+
+        samples = []
+        for item in audio:
+            if not isinstance(item, AudioBuffer):
+                raise TypeError('audio must be a list of AudioBuffers or an np.ndarray, '
+                                'recieved %s' % type(item))
+
+            if item.get_sample_rate() != self.sample_rate:
+                raise ValueError(
+                    'audio buffer samplerate does not equal feature '
+                    'extraction rate, %s != %s' % (item.get_sample_rate(), self.sample_rate)
+                )
+
+            for modifier in self.input_modifiers:
+                item = modifier(item)
+
+            samples.append(item.get_audio())
+
+        if len(set(len(item) for item in samples)) != 1:
+            raise ValueError('All audio in a batch must have the same length')
+
+        return np.stack(samples)
+
+
     def load_scaler(self, location):
         """
         Load trained scaler from a pickled file.
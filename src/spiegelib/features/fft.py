@@ -70,3 +70,23 @@ class FFT(FeaturesBase):
                                           complex_dtype=self.complex_dtype)
 
         return features
+
+
+    def get_features_batch(self, audio):
+        """
+        Run FFT on a batch of audio.
+
+        Args:
+            audio (np.ndarray): Audio samples with the shape (batch, samples)
+
+        Returns:
+            np.ndarray: Results of FFT for each item in the batch. Format depends
+                on output type set during construction.
+        """
+
+        n_output = int((audio.shape[-1]/2) + 1)
+        spectrum = np.fft.fft(audio, n=self.fft_size, axis=-1)[:, 0:n_output]
+        features = utils.convert_spectrum(spectrum, self.output, dtype=self.dtype,
+                                          complex_dtype=self.complex_dtype)
+
+        return features
@@ -4,9 +4,9 @@ Mel-Frequency Cepstral Coefficients (MFCCs)
 """
 
 import numpy as np
-import librosa
 from spiegelib import AudioBuffer
 from spiegelib.features.features_base import FeaturesBase
+from spiegelib.features.spectral_engine import SpectralEngine
 
 class MFCC(FeaturesBase):
     """
@@ -30,6 +30,9 @@ class MFCC(FeaturesBase):
         self.hop_size = hop_size
         super().__init__(scale_axis=scale_axis, **kwargs)
 
+        # Window, mel filterbank, and DCT basis are cached in the spectral engine
+        self._engine = None
+
 
     def get_features(self, audio):
         """
@@ -52,15 +55,43 @@ class MFCC(FeaturesBase):
                 'extraction rate, %s != %s' % (audio.get_sample_rate(), self.sample_rate)
             )
 
-        features = librosa.feature.mfcc(
-            y=audio.get_audio(),
-            sr=self.sample_rate,
-            n_fft=self.frame_size,
-            hop_length=self.hop_size,
-            n_mfcc=self.num_mfccs
-        )
+        features = self._get_engine().mfcc(audio.get_audio())
 
         if self.time_major:
             features = np.transpose(features)
 
         return features
+
+
+    def get_features_batch(self, audio):
+        """
+        Run MFCC extraction on a batch of audio.
+
+        Args:
+            audio (np.ndarray): Audio samples with the shape (batch, samples)
+
+        Returns:
+            np.ndarray: Results of MFCC extraction for each item in the batch.
+        """
+
+        features = self._get_engine().mfcc(audio)
+
+        if self.time_major:
+            features = np.swapaxes(features, 1, 2)
+
+        return features
+
+
+    def _get_engine(self):
+        """
+        Returns the spectral engine for the current settings, creating a new one
+        if settings have changed since it was last created.
+        """
+
+        settings = (self.sample_rate, self.frame_size, self.hop_size, self.num_mfccs)
+        engine = self._engine
+        if engine is None or settings != (engine.sample_rate, engine.frame_size,
+                                          engine.hop_size, engine.num_mfccs):
+            self._engine = SpectralEngine(*settings)
+
+        return self._engine
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+NumPy implementation of the short time Fourier transform and MFCCs that is used
+internally by feature extraction classes. The window, mel filterbank, and DCT
+basis are computed once during construction and reused for every call, and all
+frames of a signal, or a batch of signals, are transformed with a single call to
+``np.fft.rfft``.
+
+Results match the equivalent librosa functions (``librosa.stft`` and
+``librosa.feature.mfcc``) called with the same padding mode. Note that the default
+``pad_mode`` of 'reflect' matches older versions of librosa, while current versions
+of librosa pad with zeros ('constant') by default, so frames at the start and end
+of a signal differ unless the padding mode is set to match.
+
+Float32 audio is transformed with float32 copies of the window and DCT basis and
+produces complex64 spectra and float32 MFCCs, the same as librosa. Float64 audio
+produces float64 results.
+
+Example::
+
+    engine = SpectralEngine(44100, frame_size=2048, hop_size=512, num_mfccs=20)
+
+    # Works on a single array of samples or a batch with shape (batch, samples)
+    spectrum = engine.stft(audio)
+    mfccs = engine.mfcc(audio)
+"""
+
+import numpy as np
+import scipy.signal
+import librosa
+
+
+class SpectralEngine():
+    """
+    Args:
+        sample_rate (int): sample rate of audio
+        frame_size (int): size of FFT
+        hop_size (int): hop length in samples
+        num_mfccs (int, optional): number of MFCCs to compute. If None (default),
+            mel filterbank and DCT basis are not computed and only the STFT is available.
+        num_mels (int, optional): number of mel bands used for MFCC computation,
+            defaults to 128
+        pad_mode (str, optional): mode used to pad signals so that frames are
+            centered, see `np.pad <https://numpy.org/doc/stable/reference/generated/numpy.pad.html>`_.
+            Defaults to 'reflect', which differs from the default of current versions
+            of librosa.
+        top_db (float, optional): threshold for the log mel spectrum used in MFCC
+            computation, in decibels below the peak of each signal. Defaults to 80.0
+    """
+
+    def __init__(self, sample_rate, frame_size, hop_size, num_mfccs=None, num_mels=128,
+                 pad_mode='reflect', top_db=80.0):
+        """
+        Constructor
+        """
+
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.num_mfccs = num_mfccs
+        self.num_mels = num_mels
+        self.pad_mode = pad_mode
+        self.top_db = top_db
+
+        # Periodic Hann window
+        self.window = scipy.signal.get_window('hann', frame_size, fftbins=True)
+
+        # The mel filterbank is float32, the same as librosa's
+        self.mel_basis = None
+        self.dct_basis = None
+        if num_mfccs is not None:
+            self.mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=frame_size,
+                                                 n_mels=num_mels, dtype=np.float32)
+            self.dct_basis = SpectralEngine.dct_basis(num_mfccs, num_mels)
+
+        # Copies used for float32 audio so that results stay float32
+        self._window32 = self.window.astype(np.float32)
+        self._dct_basis32 = None
+        if self.dct_basis is not None:
+            self._dct_basis32 = self.dct_basis.astype(np.float32)
+
+
+    def frames(self, audio):
+        """
+        Pad and split audio into overlapping frames. Frames are a strided view
+        of the padded audio, no data is copied.
+
+        Args:
+            audio (np.ndarray): audio samples with shape (samples,) or (batch, samples)
+
+        Returns:
+            np.ndarray: frames with shape (frames, frame_size) or (batch, frames, frame_size)
+        """
+
+        pad = int(self.frame_size // 2)
+        padding = [(0, 0)] * (audio.ndim - 1) + [(pad, pad)]
+        padded = np.ascontiguousarray(np.pad(audio, padding, mode=self.pad_mode))
+
+        num_frames = 1 + (padded.shape[-1] - self.frame_size) // self.hop_size
+        shape = padded.shape[:-1] + (num_frames, self.frame_size)
+        strides = padded.strides[:-1] + (padded.strides[-1] * self.hop_size,
+                                         padded.strides[-1])
+
+        return np.lib.stride_tricks.as_strided(padded, shape=shape, strides=strides,
+                                               writeable=False)
+
+
+    def stft(self, audio):
+        """
+        Short time Fourier transform
+
+        Args:
+            audio (np.ndarray): audio samples with shape (samples,) or (batch, samples)
+
+        Returns:
+            np.ndarray: complex spectrum with shape (bins, frames) or (batch, bins, frames)
+        """
+
+        frames = self.frames(audio)
+        if frames.dtype == np.float32:
+            spectrum = np.fft.rfft(frames * self._window32, axis=-1) \
+                .astype(np.complex64, copy=False)
+        else:
+            spectrum = np.fft.rfft(frames * self.window, axis=-1)
+
+        return np.swapaxes(spectrum, -1, -2)
+
+
+    def power(self, audio):
+        """
+        Power spectrum from the short time Fourier transform
+
+        Args:
+            audio (np.ndarray): audio samples with shape (samples,) or (batch, samples)
+
+        Returns:
+            np.ndarray: power spectrum with shape (bins, frames) or (batch, bins, frames)
+        """
+
+        spectrum = self.stft(audio)
+        return spectrum.real**2 + spectrum.imag**2
+
+
+    def mfcc(self, audio):
+        """
+        Mel-frequency cepstral coefficients
+
+        Args:
+            audio (np.ndarray): audio samples with shape (samples,) or (batch, samples)
+
+        Returns:
+            np.ndarray: MFCCs with shape (num_mfccs, frames) or (batch, num_mfccs, frames)
+        """
+
+        if self.mel_basis is None:
+            raise ValueError('num_mfccs must be set during construction to compute MFCCs')
+
+        mel_spectrum = np.matmul(self.mel_basis, self.power(audio))
+
+        # Convert to decibels, clipped relative to the peak of each signal
+        log_spectrum = 10.0 * np.log10(np.maximum(1e-10, mel_spectrum))
+        if self.top_db is not None:
+            peak = log_spectrum.max(axis=(-2, -1), keepdims=True)
+            log_spectrum = np.maximum(log_spectrum, peak - self.top_db)
+
+        dct_basis = self._dct_basis32 if log_spectrum.dtype == np.float32 else self.dct_basis
+        return np.matmul(dct_basis, log_spectrum)
+
+
+    @staticmethod
+    def dct_basis(num_coefficients, size):
+        """
+        Orthonormal type-II discrete cosine transform matrix
+
+        Args:
+            num_coefficients (int): number of DCT coefficients to keep
+            size (int): length of input to the DCT
+
+        Returns:
+            np.ndarray: DCT matrix with shape (num_coefficients, size)
+        """
+
+        k = np.arange(num_coefficients)[:, np.newaxis]
+        n = np.arange(size)[np.newaxis, :]
+        basis = np.cos(np.pi * k * (2 * n + 1) / (2.0 * size)) * np.sqrt(2.0 / size)
+        basis[0] /= np.sqrt(2.0)
+        return basis
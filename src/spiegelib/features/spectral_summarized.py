@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 """
 Spectral features summarized over time using mean and variance. Returns a 22-dimension
-feature vector for each audio sample.
+feature vector for each audio sample. All features are computed from a single
+magnitude spectrogram.
 
 Features:
     - Spectral Centroid
@@ -15,6 +16,7 @@ import numpy as np
 import librosa
 from spiegelib import AudioBuffer
 from spiegelib.features.features_base import FeaturesBase
+from spiegelib.features.spectral_engine import SpectralEngine
 
 class SpectralSummarized(FeaturesBase):
     """
@@ -35,6 +37,9 @@ class SpectralSummarized(FeaturesBase):
         self.hop_size = hop_size
         super().__init__(scale_axis=scale_axis, **kwargs)
 
+        # Window is cached in the spectral engine
+        self._engine = None
+
 
     def get_features(self, audio):
         """
@@ -57,63 +62,89 @@ class SpectralSummarized(FeaturesBase):
                 'extraction rate, %s != %s' % (audio.get_sample_rate(), self.sample_rate)
             )
 
+        return self._summarize(audio.get_audio())
+
+
+    def get_features_batch(self, audio):
+        """
+        Extract spectral features for a batch of audio.
+
+        Args:
+            audio (np.ndarray): Audio samples with the shape (batch, samples)
+
+        Returns:
+            np.ndarray: Results of spectral features extraction with the shape (batch, 22)
+        """
+
+        return self._summarize(audio)
+
+
+    def _summarize(self, audio):
+        """
+        Compute spectral features and summarize over time. Works on a single
+        array of audio samples or a batch of audio with the shape (batch, samples).
+        A single magnitude spectrogram is computed and shared by all features.
+        """
+
+        spectrum = np.abs(self._get_engine().stft(audio))
+
         spectral_centroid = librosa.feature.spectral_centroid(
-            y=audio.get_audio(),
+            S=spectrum,
             sr=self.sample_rate,
             n_fft=self.frame_size,
-            hop_length=self.hop_size,
         )
 
         spectral_bandwidth = librosa.feature.spectral_bandwidth(
-            y=audio.get_audio(),
+            S=spectrum,
             sr=self.sample_rate,
             n_fft=self.frame_size,
-            hop_length=self.hop_size,
+            centroid=spectral_centroid,
         )
 
-        spectral_contrast = librosa.feature.spectral_contrast(
-            y=audio.get_audio(),
+        # Spectral contrast is clipped relative to the peak power, so it is computed
+        # for each item in a batch separately
+        spectral_contrast = np.stack([librosa.feature.spectral_contrast(
+            S=item,
             sr=self.sample_rate,
             n_fft=self.frame_size,
-            hop_length=self.hop_size,
-        )
+        ) for item in spectrum.reshape((-1,) + spectrum.shape[-2:])])
+        spectral_contrast = spectral_contrast.reshape(spectrum.shape[:-2] + spectral_contrast.shape[-2:])
 
         spectral_flatness = librosa.feature.spectral_flatness(
-            y=audio.get_audio(),
+            S=spectrum,
             n_fft=self.frame_size,
-            hop_length=self.hop_size,
         )
 
         spectral_rolloff = librosa.feature.spectral_rolloff(
-            y=audio.get_audio(),
+            S=spectrum,
             sr=self.sample_rate,
             n_fft=self.frame_size,
-            hop_length=self.hop_size,
         )
 
-        features = np.array([
-            spectral_centroid.mean(),
-            spectral_centroid.var(),
-            spectral_bandwidth.mean(),
-            spectral_bandwidth.var(),
-            spectral_flatness.mean(),
-            spectral_flatness.var(),
-            spectral_rolloff.mean(),
-            spectral_rolloff.var(),
-            spectral_contrast[0].mean(),
-            spectral_contrast[0].var(),
-            spectral_contrast[1].mean(),
-            spectral_contrast[1].var(),
-            spectral_contrast[2].mean(),
-            spectral_contrast[2].var(),
-            spectral_contrast[3].mean(),
-            spectral_contrast[3].var(),
-            spectral_contrast[4].mean(),
-            spectral_contrast[4].var(),
-            spectral_contrast[5].mean(),
-            spectral_contrast[5].var(),
-            spectral_contrast[6].mean(),
-            spectral_contrast[6].var(),
-        ])
-
-        return features
+        # Stack all features along the feature axis and compute the mean and variance
+        # of each over time. Results are interleaved so the mean of each feature is
+        # followed by the variance.
+        spectral = np.concatenate((
+            spectral_centroid,
+            spectral_bandwidth,
+            spectral_flatness,
+            spectral_rolloff,
+            spectral_contrast,
+        ), axis=-2)
+
+        features = np.stack((spectral.mean(-1), spectral.var(-1)), axis=-1)
+        return features.reshape(features.shape[:-2] + (22,))
+
+
+    def _get_engine(self):
+        """
+        Returns the spectral engine for the current settings, creating a new one
+        if settings have changed since it was last created.
+        """
+
+        engine = self._engine
+        if engine is None or (self.frame_size, self.hop_size) != (engine.frame_size,
+                                                                  engine.hop_size):
+            self._engine = SpectralEngine(self.sample_rate, self.frame_size, self.hop_size)
+
+        return self._engine
@@ -99,6 +99,12 @@ class StandardScaler(DataScalerBase):
             del self.mean
             del self.std
 
+        # Running statistics used by partial_fit
+        self._count = 0
+        self._rows = 0
+        self._running_mean = 0.0
+        self._running_m2 = 0.0
+
 
     def fit(self, data, axis=None):
         """
@@ -130,6 +136,59 @@ class StandardScaler(DataScalerBase):
         self.fit_shape = data.shape
 
 
+    def partial_fit(self, data, axis=None):
+        """
+        Update mean and std with part of a dataset. Calling this for each part of a
+        dataset split along the first axis gives the same result as calling
+        :py:meth:`fit` on the whole dataset. Call :py:meth:`fit` or create a new
+        scaler to start fitting a different dataset.
+
+        Args:
+            data (np.ndarray): part of a dataset, split along the first axis
+            axis (int, tuple, optional): axis or axes to use for calculating scaling
+                parameteres. Must include the first axis. Defaults to None which will
+                flatten the array first.
+        """
+
+        fit_axis = axis
+        if fit_axis is not None and not isinstance(fit_axis, tuple):
+            fit_axis = (fit_axis,)
+
+        if fit_axis is not None and 0 not in fit_axis:
+            raise ValueError("partial_fit requires the fit axis to include axis 0, "
+                             "received %s" % (axis,))
+
+        if not hasattr(self, '_count'):
+            self._reset()
+
+        # Combine statistics of this part with the running statistics using the
+        # parallel algorithm from Chan et al.
+        count = data.size if fit_axis is None else int(np.prod([data.shape[a] for a in fit_axis]))
+        mean = data.mean(axis, dtype=np.float64)
+        m2 = data.var(axis, dtype=np.float64) * count
+
+        total = self._count + count
+        delta = mean - self._running_mean
+        self._running_mean = self._running_mean + delta * (count / total)
+        self._running_m2 = self._running_m2 + m2 + delta ** 2 * (self._count * count / total)
+        self._count = total
+        self._rows += len(data)
+
+        variance = self._running_m2 / total
+        if isinstance(variance, np.ndarray):
+            variance = variance.copy()
+            variance[variance == 0.0] = 1.0
+        elif variance == 0.0:
+            variance = 1.0
+
+        dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+        self.mean = np.asarray(self._running_mean).astype(dtype)[()]
+        self.std = np.sqrt(np.asarray(variance)).astype(dtype)[()]
+
+        self.fit_axis = fit_axis
+        self.fit_shape = (self._rows,) + data.shape[1:]
+
+
     def transform(self, data):
         """
         Scale data
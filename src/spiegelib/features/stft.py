@@ -4,9 +4,9 @@ Short Time Fourier Transform (STFT)
 """
 
 import numpy as np
-import librosa
 from spiegelib import AudioBuffer
 from spiegelib.features.features_base import FeaturesBase
+from spiegelib.features.spectral_engine import SpectralEngine
 import spiegelib.core.utils as utils
 
 class STFT(FeaturesBase):
@@ -38,6 +38,9 @@ class STFT(FeaturesBase):
         self.dtype = np.float32
         self.complex_dtype = np.complex64
 
+        # Window is cached in the spectral engine
+        self._engine = None
+
 
     def get_features(self, audio):
         """
@@ -54,11 +57,7 @@ class STFT(FeaturesBase):
         if not isinstance(audio, AudioBuffer):
             raise TypeError('audio must be AudioBuffer, recieved %s' % type(audio))
 
-        features = librosa.stft(
-            y=audio.get_audio(),
-            n_fft=self.frame_size,
-            hop_length=self.hop_size,
-        )
+        features = self._get_engine().stft(audio.get_audio())
 
         features = utils.convert_spectrum(features, self.output, dtype=self.dtype,
                                           complex_dtype=self.complex_dtype)
@@ -67,3 +66,40 @@ class STFT(FeaturesBase):
             features = np.swapaxes(features, 0, 1)
 
         return features
+
+
+    def get_features_batch(self, audio):
+        """
+        Run STFT on a batch of audio.
+
+        Args:
+            audio (np.ndarray): Audio samples with the shape (batch, samples)
+
+        Returns:
+            np.ndarray: Results of STFT for each item in the batch. Format depends
+                on output type set during construction.
+        """
+
+        features = self._get_engine().stft(audio)
+
+        features = utils.convert_spectrum(features, self.output, dtype=self.dtype,
+                                          complex_dtype=self.complex_dtype)
+
+        if self.time_major:
+            features = np.swapaxes(features, 1, 2)
+
+        return features
+
+
+    def _get_engine(self):
+        """
+        Returns the spectral engine for the current settings, creating a new one
+        if settings have changed since it was last created.
+        """
+
+        engine = self._engine
+        if engine is None or (self.frame_size, self.hop_size) != (engine.frame_size,
+                                                                  engine.hop_size):
+            self._engine = SpectralEngine(self.sample_rate, self.frame_size, self.hop_size)
+
+        return self._engine
@@ -3,5 +3,6 @@
 Network Imports
 """
 
+from .sound_match_pool import SoundMatchPool
 from .sound_match_http_server import SoundMatchHTTPServer
 from .sound_match_osc_server import SoundMatchOSCServer
@@ -1,2 +1,4 @@
 from .osc_message import OscMessage
 from .osc_message_builder import OscMessageBuilder
+from .osc_bundle import OscBundle
+from .osc_bundle_builder import OscBundleBuilder
@@ -0,0 +1,61 @@
+"""Build OSC bundles for client applications."""
+
+from spiegelib.network.osc import osc_bundle, osc_message, osc_types
+
+from typing import List, Union
+
+# Shortcut to specify an immediate execution of messages in the bundle.
+IMMEDIATELY = osc_types.IMMEDIATELY
+
+
+class BuildError(Exception):
+    """Error raised when an error occurs building the bundle."""
+
+
+class OscBundleBuilder(object):
+    """Builds arbitrary OscBundle instances."""
+
+    def __init__(self, timestamp: Union[int, float]=IMMEDIATELY) -> None:
+        """Build a new bundle with the associated timestamp.
+
+        Args:
+          - timestamp: system time represented as a floating point number of
+                       seconds since the epoch in UTC or IMMEDIATELY.
+        """
+        self._timestamp = timestamp
+        self._contents = []
+
+    @property
+    def contents(self) -> List[Union[osc_bundle.OscBundle, osc_message.OscMessage]]:
+        """Returns the messages and bundles added to this builder."""
+        return self._contents
+
+    def add_content(self, content: Union[osc_bundle.OscBundle, osc_message.OscMessage]) -> None:
+        """Add a new content to this bundle.
+
+        Args:
+          - content: Either an OscBundle or an OscMessage
+        """
+        self._contents.append(content)
+
+    def build(self) -> osc_bundle.OscBundle:
+        """Build an OscBundle with the current state of this builder.
+
+        Raises:
+          - BuildError: if we could not build the bundle.
+        """
+        parts = [osc_bundle._BUNDLE_PREFIX]
+        try:
+            parts.append(osc_types.write_date(self._timestamp))
+            for content in self._contents:
+                if (isinstance(content, osc_message.OscMessage)
+                        or isinstance(content, osc_bundle.OscBundle)):
+                    parts.append(osc_types.write_int(content.size))
+                    parts.append(content.dgram)
+                else:
+                    raise BuildError(
+                        "Content must be either OscBundle or OscMessage"
+                        "found {}".format(type(content)))
+            return osc_bundle.OscBundle(b''.join(parts))
+        except osc_types.BuildError as be:
+            raise BuildError('Could not build the bundle {}'.format(be))
@@ -1,6 +1,8 @@
 """Representation of an OSC message in a pythonesque way."""
 
 import logging
+import re
+import struct
 
 from spiegelib.network.osc import osc_types
 from typing import List, Iterator, Any
@@ -10,50 +12,87 @@ class ParseError(Exception):
     """Base exception raised when a datagram parsing error occurs."""
 
 
+# Struct format and size for numeric types that are decoded in runs
+_NUMERIC_TYPES = {"i": ("i", 4), "f": ("f", 4), "d": ("d", 8)}
+
+# Functions to parse a single argument of each numeric type
+_NUMERIC_GETTERS = {"i": osc_types.get_int, "f": osc_types.get_float,
+                    "d": osc_types.get_double}
+
+# Splits a type tag into runs of numeric types and single other types
+_TYPE_TAG_RUNS = re.compile(r'i+|f+|d+|.')
+
+
 class OscMessage(object):
     """Representation of a parsed datagram representing an OSC message.
 
     An OSC message consists of an OSC Address Pattern followed by an OSC
     Type Tag String followed by zero or more OSC Arguments.
+
+    The datagram is parsed in place without copying: strings are located with
+    ``bytes.find`` and numbers are read with ``struct.unpack_from``. Runs of
+    consecutive int, float, or double arguments are decoded with a single call.
     """
 
     def __init__(self, dgram: bytes) -> None:
+        if not isinstance(dgram, (bytes, bytearray)):
+            dgram = bytes(dgram)
         self._dgram = dgram
         self._parameters = []
         self._parse_datagram()
 
     def _parse_datagram(self) -> None:
+        dgram = self._dgram
         try:
-            self._address_regexp, index = osc_types.get_string(self._dgram, 0)
-            if not self._dgram[index:]:
+            self._address_regexp, index = osc_types.get_string(dgram, 0)
+            if index >= len(dgram):
                 # No params is legit, just return now.
                 return
 
             # Get the parameters types.
-            type_tag, index = osc_types.get_string(self._dgram, index)
+            type_tag, index = osc_types.get_string(dgram, index)
             if type_tag.startswith(','):
                 type_tag = type_tag[1:]
 
+            view = memoryview(dgram)
             params = []
             param_stack = [params]
             # Parse each parameter given its type.
-            for param in type_tag:
+            for run in _TYPE_TAG_RUNS.findall(type_tag):
+                param = run[0]
+
+                # Decode a run of the same numeric type at once
+                if len(run) > 1:
+                    code, size = _NUMERIC_TYPES[param]
+                    if index + len(run) * size <= len(dgram):
+                        param_stack[-1].extend(
+                            struct.unpack_from('>%d%s' % (len(run), code), view, index))
+                        index += len(run) * size
+                        continue
+
+                    # Not enough data for the whole run, parse individually
+                    # so that short final floats are handled
+                    for param in run[:-1]:
+                        val, index = _NUMERIC_GETTERS[param](view, index)
+                        param_stack[-1].append(val)
+                    param = run[-1]
+
                 if param == "i":  # Integer.
-                    val, index = osc_types.get_int(self._dgram, index)
+                    val, index = osc_types.get_int(view, index)
                 elif param == "f":  # Float.
-                    val, index = osc_types.get_float(self._dgram, index)
+                    val, index = osc_types.get_float(view, index)
                 elif param == "d":  # Double.
-                    val, index = osc_types.get_double(self._dgram, index)
+                    val, index = osc_types.get_double(view, index)
                 elif param == "s":  # String.
-                    val, index = osc_types.get_string(self._dgram, index)
+                    val, index = osc_types.get_string(dgram, index)
                 elif param == "b":  # Blob.
-                    val, index = osc_types.get_blob(self._dgram, index)
+                    val, index = osc_types.get_blob(view, index)
                 elif param == "r":  # RGBA.
-                    val, index = osc_types.get_rgba(self._dgram, index)
+                    val, index = osc_types.get_rgba(view, index)
                 elif param == "m":  # MIDI.
-                    val, index = osc_types.get_midi(self._dgram, index)
+                    val, index = osc_types.get_midi(view, index)
                 elif param == "t":  # osc time tag:
-                    val, index = osc_types.get_timetag(self._dgram, index)
+                    val, index = osc_types.get_timetag(view, index)
                 elif param == "T":  # True.
                     val = True
                 elif param == "F":  # False.
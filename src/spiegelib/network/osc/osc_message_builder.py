@@ -1,5 +1,9 @@
 """Build OSC messages for client applications."""
 
+import itertools
+import struct
+import numpy as np
+
 from spiegelib.network.osc import osc_message, osc_types
 
 from typing import List, Tuple, Union, Any
@@ -29,6 +33,9 @@ class OscMessageBuilder(object):
         ARG_TYPE_FLOAT, ARG_TYPE_DOUBLE, ARG_TYPE_INT, ARG_TYPE_BLOB, ARG_TYPE_STRING,
         ARG_TYPE_RGBA, ARG_TYPE_MIDI, ARG_TYPE_TRUE, ARG_TYPE_FALSE, ARG_TYPE_NIL)
 
+    # Big-endian dtypes and struct codes for numeric types that are packed in bulk
+    _NUMERIC_DTYPES = {ARG_TYPE_FLOAT: '>f4', ARG_TYPE_DOUBLE: '>f8', ARG_TYPE_INT: '>i4'}
+
     def __init__(self, address: str=None) -> None:
         """Initialize a new builder for a message.
 
@@ -87,6 +94,33 @@ class OscMessageBuilder(object):
         else:
             self._args.append((arg_type, arg_value))
 
+    def add_array(self, values: Union[np.ndarray, List[float]], arg_type: str=ARG_TYPE_FLOAT) -> None:
+        """Add an OSC array of numbers to this message.
+
+        Produces the same message as calling add_arg with a list of numbers of
+        the same type, but the values are stored as a single array and packed
+        with one conversion when the message is built.
+
+        Args:
+          - values: A 1D array or list of numbers.
+          - arg_type: One of ARG_TYPE_FLOAT, ARG_TYPE_DOUBLE, or ARG_TYPE_INT.
+        Raises:
+          - ValueError: if the type is not supported or values is not 1D.
+        """
+        if arg_type not in self._NUMERIC_DTYPES:
+            raise ValueError('arg_type must be one of {}'.format(
+                tuple(self._NUMERIC_DTYPES.keys())))
+        values = np.asarray(values)
+        if values.ndim != 1:
+            raise ValueError('values must be 1D, received shape {}'.format(values.shape))
+
+        self._args.append((self.ARG_TYPE_ARRAY_START, None))
+        if len(values):
+            # Stored as a single argument with one type character per value
+            self._args.append((arg_type * len(values),
+                               values.astype(self._NUMERIC_DTYPES[arg_type])))
+        self._args.append((self.ARG_TYPE_ARRAY_STOP, None))
+
     def _get_arg_type(self, arg_value: Union[str, bytes, bool, int, float, tuple, list]) -> str:    # TODO: Make 'tuple' more specific for it is a MIDI packet
         """Guess the type of a value.
 
@@ -129,42 +163,59 @@ class OscMessageBuilder(object):
         """
         if not self._address:
             raise BuildError('OSC addresses cannot be empty')
-        dgram = b''
         try:
             # Write the address.
-            dgram += osc_types.write_string(self._address)
+            parts = [osc_types.write_string(self._address)]
             if not self._args:
-                dgram += osc_types.write_string(',')
-                return osc_message.OscMessage(dgram)
+                parts.append(osc_types.write_string(','))
+                return osc_message.OscMessage(b''.join(parts))
 
             # Write the parameters.
             arg_types = "".join([arg[0] for arg in self._args])
-            dgram += osc_types.write_string(',' + arg_types)
-            for arg_type, value in self._args:
-                if arg_type == self.ARG_TYPE_STRING:
-                    dgram += osc_types.write_string(value)
-                elif arg_type == self.ARG_TYPE_INT:
-                    dgram += osc_types.write_int(value)
-                elif arg_type == self.ARG_TYPE_FLOAT:
-                    dgram += osc_types.write_float(value)
-                elif arg_type == self.ARG_TYPE_DOUBLE:
-                    dgram += osc_types.write_double(value)
-                elif arg_type == self.ARG_TYPE_BLOB:
-                    dgram += osc_types.write_blob(value)
-                elif arg_type == self.ARG_TYPE_RGBA:
-                    dgram += osc_types.write_rgba(value)
-                elif arg_type == self.ARG_TYPE_MIDI:
-                    dgram += osc_types.write_midi(value)
-                elif arg_type in (self.ARG_TYPE_TRUE,
-                                  self.ARG_TYPE_FALSE,
-                                  self.ARG_TYPE_ARRAY_START,
-                                  self.ARG_TYPE_ARRAY_STOP,
-                                  self.ARG_TYPE_NIL):
+            parts.append(osc_types.write_string(',' + arg_types))
+
+            # Consecutive numbers of the same type are packed with one call
+            for arg_type, group in itertools.groupby(self._args, key=self._pack_group):
+                if arg_type in self._NUMERIC_DTYPES:
+                    values = [value for _, value in group]
+                    try:
+                        parts.append(struct.pack('>%d%s' % (len(values), arg_type), *values))
+                    except struct.error as e:
+                        raise BuildError('Wrong argument value passed: {}'.format(e))
                     continue
-                else:
-                    raise BuildError('Incorrect parameter type found {}'.format(
-                        arg_type))
 
-            return osc_message.OscMessage(dgram)
+                for arg_type, value in group:
+                    if isinstance(value, np.ndarray):
+                        parts.append(value.tobytes())
+                    elif arg_type == self.ARG_TYPE_STRING:
+                        parts.append(osc_types.write_string(value))
+                    elif arg_type == self.ARG_TYPE_BLOB:
+                        parts.append(osc_types.write_blob(value))
+                    elif arg_type == self.ARG_TYPE_RGBA:
+                        parts.append(osc_types.write_rgba(value))
+                    elif arg_type == self.ARG_TYPE_MIDI:
+                        parts.append(osc_types.write_midi(value))
+                    elif arg_type in (self.ARG_TYPE_TRUE,
+                                      self.ARG_TYPE_FALSE,
+                                      self.ARG_TYPE_ARRAY_START,
+                                      self.ARG_TYPE_ARRAY_STOP,
+                                      self.ARG_TYPE_NIL):
+                        continue
+                    else:
+                        raise BuildError('Incorrect parameter type found {}'.format(
+                            arg_type))
+
+            # Join allocates the datagram once with the total size of all parts
+            return osc_message.OscMessage(b''.join(parts))
         except osc_types.BuildError as be:
             raise BuildError('Could not build the message: {}'.format(be))
+
+    def _pack_group(self, arg: Tuple[str, Any]) -> Union[str, None]:
+        """Key used to group consecutive single numbers of the same type.
+
+        Arrays from add_array are packed on their own, including arrays with a
+        single value, which have the same type character as a single number.
+        """
+        if arg[0] in self._NUMERIC_DTYPES and not isinstance(arg[1], np.ndarray):
+            return arg[0]
+        return None
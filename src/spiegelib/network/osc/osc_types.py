@@ -55,7 +55,7 @@ def get_string(dgram: bytes, start_index: int) -> Tuple[str, int]:
     of bits a multiple of 32".
 
     Args:
-      dgram: A datagram packet.
+      dgram: A datagram packet, as bytes or a bytearray.
       start_index: An index where the string starts in the datagram.
 
     Returns:
@@ -66,28 +66,21 @@ def get_string(dgram: bytes, start_index: int) -> Tuple[str, int]:
     """
     if start_index < 0:
         raise ParseError('start_index < 0')
-    offset = 0
     try:
-        if (len(dgram) > start_index + _STRING_DGRAM_PAD
-                and dgram[start_index + _STRING_DGRAM_PAD] == _EMPTY_STR_DGRAM):
-            return '', start_index + _STRING_DGRAM_PAD
-        while dgram[start_index + offset] != 0:
-            offset += 1
-        # Align to a byte word.
-        if (offset) % _STRING_DGRAM_PAD == 0:
-            offset += _STRING_DGRAM_PAD
-        else:
-            offset += (-offset % _STRING_DGRAM_PAD)
-        # Python slices do not raise an IndexError past the last index,
-        # do it ourselves.
-        if offset > len(dgram[start_index:]):
-            raise ParseError('Datagram is too short')
-        data_str = dgram[start_index:start_index + offset]
-        return data_str.replace(b'\x00', b'').decode('utf-8'), start_index + offset
-    except IndexError as ie:
-        raise ParseError('Could not parse datagram %s' % ie)
-    except TypeError as te:
-        raise ParseError('Could not parse datagram %s' % te)
+        end = dgram.find(b'\x00', start_index)
+    except (AttributeError, TypeError) as e:
+        raise ParseError('Could not parse datagram %s' % e)
+    if end < 0:
+        raise ParseError('Could not parse datagram, string is not terminated')
+    # Align to a byte word, including at least one null character.
+    offset = end - start_index
+    offset += _STRING_DGRAM_PAD - (offset % _STRING_DGRAM_PAD)
+    if start_index + offset > len(dgram):
+        raise ParseError('Datagram is too short')
+    try:
+        return dgram[start_index:end].decode('utf-8'), start_index + offset
+    except UnicodeDecodeError as e:
+        raise ParseError('Could not parse datagram %s' % e)
 
 
 def write_int(val: int) -> bytes:
@@ -116,11 +109,10 @@ def get_int(dgram: bytes, start_index: int) -> Tuple[int, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _INT_DGRAM_LEN:
+        if len(dgram) - start_index < _INT_DGRAM_LEN:
             raise ParseError('Datagram is too short')
         return (
-            struct.unpack('>i',
-                          dgram[start_index:start_index + _INT_DGRAM_LEN])[0],
+            struct.unpack_from('>i', dgram, start_index)[0],
             start_index + _INT_DGRAM_LEN)
     except (struct.error, TypeError) as e:
         raise ParseError('Could not parse datagram %s' % e)
@@ -140,11 +132,10 @@ def get_uint64(dgram: bytes, start_index: int) -> Tuple[int, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _UINT64_DGRAM_LEN:
+        if len(dgram) - start_index < _UINT64_DGRAM_LEN:
             raise ParseError('Datagram is too short')
         return (
-            struct.unpack('>Q',
-                          dgram[start_index:start_index + _UINT64_DGRAM_LEN])[0],
+            struct.unpack_from('>Q', dgram, start_index)[0],
             start_index + _UINT64_DGRAM_LEN)
     except (struct.error, TypeError) as e:
         raise ParseError('Could not parse datagram %s' % e)
@@ -165,7 +156,7 @@ def get_timetag(dgram: bytes, start_index: int) -> Tuple[datetime, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _TIMETAG_DGRAM_LEN:
+        if len(dgram) - start_index < _TIMETAG_DGRAM_LEN:
             raise ParseError('Datagram is too short')
 
         timetag, _ = get_uint64(dgram, start_index)
@@ -208,14 +199,15 @@ def get_float(dgram: bytes, start_index: int) -> Tuple[float, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _FLOAT_DGRAM_LEN:
+        if len(dgram) - start_index < _FLOAT_DGRAM_LEN:
             # Noticed that Reaktor doesn't send the last bunch of \x00 needed to make
             # the float representation complete in some cases, thus we pad here to
             # account for that.
-            dgram = dgram + b'\x00' * (_FLOAT_DGRAM_LEN - len(dgram[start_index:]))
+            dgram = bytes(dgram[start_index:]) + b'\x00' * (
+                _FLOAT_DGRAM_LEN - (len(dgram) - start_index))
+            return struct.unpack('>f', dgram)[0], start_index + _FLOAT_DGRAM_LEN
         return (
-            struct.unpack('>f',
-                          dgram[start_index:start_index + _FLOAT_DGRAM_LEN])[0],
+            struct.unpack_from('>f', dgram, start_index)[0],
             start_index + _FLOAT_DGRAM_LEN)
     except (struct.error, TypeError) as e:
         raise ParseError('Could not parse datagram %s' % e)
@@ -247,11 +239,10 @@ def get_double(dgram: bytes, start_index: int) -> Tuple[float, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _DOUBLE_DGRAM_LEN:
+        if len(dgram) - start_index < _DOUBLE_DGRAM_LEN:
             raise ParseError('Datagram is too short')
         return (
-            struct.unpack('>d',
-                          dgram[start_index:start_index + _DOUBLE_DGRAM_LEN])[0],
+            struct.unpack_from('>d', dgram, start_index)[0],
             start_index + _DOUBLE_DGRAM_LEN)
     except (struct.error, TypeError) as e:
         raise ParseError('Could not parse datagram {}'.format(e))
@@ -276,12 +267,14 @@ def get_blob(dgram: bytes, start_index: int) -> Tuple[bytes, int]:
       ParseError if the datagram could not be parsed.
     """
     size, int_offset = get_int(dgram, start_index)
+    if size < 0:
+        raise ParseError('Blob size is negative')
     # Make the size a multiple of 32 bits.
     total_size = size + (-size % _BLOB_DGRAM_PAD)
     end_index = int_offset + size
-    if end_index - start_index > len(dgram[start_index:]):
+    if end_index > len(dgram):
         raise ParseError('Datagram is too short.')
-    return dgram[int_offset:int_offset + size], int_offset + total_size
+    return bytes(dgram[int_offset:end_index]), int_offset + total_size
 
 
 def write_blob(val: bytes) -> bytes:
@@ -321,7 +314,7 @@ def get_date(dgram: bytes, start_index: int) -> Tuple[float, int]:
     # Check for the special case first.
     if dgram[start_index:start_index + _TIMETAG_DGRAM_LEN] == ntp.IMMEDIATELY:
         return IMMEDIATELY, start_index + _TIMETAG_DGRAM_LEN
-    if len(dgram[start_index:]) < _TIMETAG_DGRAM_LEN:
+    if len(dgram) - start_index < _TIMETAG_DGRAM_LEN:
         raise ParseError('Datagram is too short')
     timetag, start_index = get_uint64(dgram, start_index)
     seconds = timetag * ntp._NTP_TIMESTAMP_TO_SECONDS
@@ -364,11 +357,10 @@ def get_rgba(dgram: bytes, start_index: int) -> Tuple[bytes, int]:
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _INT_DGRAM_LEN:
+        if len(dgram) - start_index < _INT_DGRAM_LEN:
             raise ParseError('Datagram is too short')
         return (
-            struct.unpack('>I',
-                          dgram[start_index:start_index + _INT_DGRAM_LEN])[0],
+            struct.unpack_from('>I', dgram, start_index)[0],
             start_index + _INT_DGRAM_LEN)
     except (struct.error, TypeError) as e:
         raise ParseError('Could not parse datagram %s' % e)
@@ -406,10 +398,9 @@ def get_midi(dgram: bytes, start_index: int) -> Tuple[Tuple[int, int, int, int],
       ParseError if the datagram could not be parsed.
     """
     try:
-        if len(dgram[start_index:]) < _INT_DGRAM_LEN:
+        if len(dgram) - start_index < _INT_DGRAM_LEN:
             raise ParseError('Datagram is too short')
-        val = struct.unpack('>I',
-                            dgram[start_index:start_index + _INT_DGRAM_LEN])[0]
+        val = struct.unpack_from('>I', dgram, start_index)[0]
         midi_msg = tuple((val & 0xFF << 8 * i) >> 8 * i for i in range(3, -1, -1))
         return (midi_msg, start_index + _INT_DGRAM_LEN)
     except (struct.error, TypeError) as e:
@@ -3,33 +3,111 @@
 This class runs a simple WSGI server that receives GET requests containing a path
 to an audio file to use as a sound target for synthesizer sound matching. It returns
 the parameter settings as JSON.
+
+Target audio can also be sent in the body of a POST request to ``/sound_match``,
+which is decoded in memory. The body can be a WAV file, with a Content-Type of
+``audio/wav``, or raw little-endian float32 samples, with a Content-Type of
+``application/octet-stream``. The sample rate of raw samples is set with the
+``sample_rate`` query string parameter and defaults to 44100. Audio at a different
+sample rate is resampled to 44100, the same as audio loaded from a file::
+
+    curl -X POST -H "Content-Type: audio/wav" --data-binary @target.wav \\
+        http://localhost:8000/sound_match
+
+Many targets of the same length can be matched in one POST request to
+``/sound_match/batch``. Feature extraction and parameter estimation are run once
+over all the targets. The body is either a 2D float32 array saved with ``np.save``,
+with a Content-Type of ``application/x-npy``, or raw little-endian float32 samples
+with the number of samples in each target set by the ``num_samples`` query string
+parameter. The response is a JSON object with a list of patches, or newline
+delimited JSON with one patch per line if the request has an Accept header of
+``application/x-ndjson``::
+
+    curl -X POST -H "Content-Type: application/x-npy" --data-binary @targets.npy \\
+        http://localhost:8000/sound_match/batch?batch_size=512
+
+Request bodies must have a Content-Length header. Bodies larger than
+``max_content_length`` bytes are refused with 413 Payload Too Large before they
+are read.
+
+Requests are handled concurrently. Each request is run by a worker from a
+:class:`~spiegelib.network.SoundMatchPool`, and each worker has its own sound
+matcher. If all workers are busy and the request queue is full, the server
+responds with 503 Service Unavailable. To use more than one worker, pass a
+function that creates a new sound matcher::
+
+    factory = functools.partial(loader.load, loader_root)
+    server = SoundMatchHTTPServer(sound_matcher_factory=factory, workers=4)
+    server.start()
 """
 
+import io
 import os
 import json
-from copy import copy
-from wsgiref.simple_server import make_server
+from queue import Full
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer
 from urllib.parse import parse_qs
+import numpy as np
+import scipy.io.wavfile
+import librosa
 
 import spiegelib as spgl
+from spiegelib.network.sound_match_pool import SoundMatchPool
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """
+    WSGI server that handles each connection in a new thread
+    """
+
+    daemon_threads = True
 
 
 class SoundMatchHTTPServer():
     """
     Args:
-        sound_matcher (:class:`~spiegelib.core.SoundMatch`): SountMatch object to use
+        sound_matcher (:class:`~spiegelib.core.SoundMatch`, optional): SountMatch
+            object to use with a single worker
         address (str, optional): address to run server at. Defaults to localhost
         port (int, optional): port to run server at. Defaults to 8000
+        sound_matcher_factory (callable, optional): Function that takes no arguments
+            and returns a new SoundMatch object, called once for each worker.
+            Required if workers is greater than one.
+        workers (int, optional): Number of sound matching requests that can run
+            at once. Defaults to 1.
+        queue_size (int, optional): Number of requests that can wait for a worker
+            before the server responds with 503. Defaults to 16.
+        synth_pool (:class:`~spiegelib.synth.SynthPool`, optional): Pool of
+            synthesizers that requests check out synthesizers from, see
+            :class:`~spiegelib.network.SoundMatchPool`
+        max_content_length (int, optional): Maximum size in bytes of the body of a
+            POST request. The server responds with 413 to larger requests. Defaults
+            to 256 MiB. Set to None to accept bodies of any size.
     """
 
-    def __init__(self, sound_matcher, address="localhost", port=8000):
+    # Content types accepted in POST requests
+    wav_types = ['audio/wav', 'audio/wave', 'audio/x-wav']
+    pcm_types = ['application/octet-stream', 'audio/pcm']
+    npy_types = ['application/x-npy', 'application/npy']
+
+    def __init__(self, sound_matcher=None, address="localhost", port=8000,
+                 sound_matcher_factory=None, workers=1, queue_size=16,
+                 synth_pool=None, max_content_length=2**28):
         """
         Constructor
         """
 
+        if max_content_length is not None and max_content_length <= 0:
+            raise ValueError('max_content_length must be greater than zero, received %s'
+                             % max_content_length)
+
         self.port = port
+        self.max_content_length = max_content_length
         self.address = address
         self.sound_matcher = sound_matcher
+        self.pool = SoundMatchPool(sound_matcher, sound_matcher_factory, workers, queue_size,
+                                   synth_pool)
 
 
     def start(self):
@@ -37,9 +115,14 @@ class SoundMatchHTTPServer():
         Begin server
         """
 
-        with make_server(self.address, self.port, self) as httpd:
-            print("Server started. Serving at %s:%s" % (self.address, self.port))
-            httpd.serve_forever()
+        with make_server(self.address, self.port, self,
+                         server_class=ThreadingWSGIServer) as httpd:
+            print("Server started. Serving at %s:%s with %s workers"
+                  % (self.address, self.port, self.pool.workers))
+            try:
+                httpd.serve_forever()
+            finally:
+                self.pool.close()
 
 
     def __call__(self, environ, start_response):
@@ -51,6 +134,9 @@ class SoundMatchHTTPServer():
         if method == 'GET':
             return self.get(environ, start_response)
 
+        if method == 'POST':
+            return self.post(environ, start_response)
+
         status = '500 Internal Server Error'
         start_response(status, [])
         return []
@@ -77,6 +163,29 @@ class SoundMatchHTTPServer():
         return [response_body]
 
 
+    def post(self, environ, start_response):
+        """
+        Process a POST request
+        """
+
+        path = environ['PATH_INFO']
+
+        if path == "/sound_match":
+            response_body = self.try_sound_match_body(environ, start_response)
+
+        elif path == "/sound_match/batch":
+            return self.try_sound_match_batch(environ, start_response)
+
+        else:
+            response_body = b''
+            start_response(
+                '404 Not Found',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+
+        return [response_body]
+
+
     @staticmethod
     def get_headers(response_body, mime_type):
         """
@@ -126,17 +235,276 @@ class SoundMatchHTTPServer():
             return response_body
 
 
+        return self.run_sound_match(audio, start_response)
+
+
+    def try_sound_match_body(self, environ, start_response):
+        """
+        Trys to run a sound match on audio sent in the body of a request
+
+        Args:
+            environ (dict): WSGI environment for the request
+        """
+
+        body, content_type, response_body = self.read_body(
+            environ, start_response, self.wav_types + self.pcm_types)
+        if body is None:
+            return response_body
+
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+
+        try:
+            sample_rate = int(query.get('sample_rate', [44100])[0])
+            audio = SoundMatchHTTPServer.decode_audio(body, content_type, sample_rate)
+        except ValueError as error:
+            response_body = bytes('Unable to decode target audio. %s' % str(error), 'utf-8')
+            start_response(
+                '400 Bad Request',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return response_body
+
+        return self.run_sound_match(audio, start_response)
+
+
+    def try_sound_match_batch(self, environ, start_response):
+        """
+        Trys to run a sound match on a batch of audio targets sent in the body
+        of a request
+
+        Args:
+            environ (dict): WSGI environment for the request
+        """
+
+        body, content_type, response_body = self.read_body(
+            environ, start_response, self.npy_types + self.pcm_types)
+        if body is None:
+            return [response_body]
+
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+
+        try:
+            sample_rate = int(query.get('sample_rate', [44100])[0])
+            num_samples = query.get('num_samples', [None])[0]
+            num_samples = int(num_samples) if num_samples is not None else None
+            batch_size = int(query.get('batch_size', [0])[0]) or None
+            audio = SoundMatchHTTPServer.decode_audio_batch(body, content_type, sample_rate,
+                                                            num_samples)
+        except ValueError as error:
+            response_body = bytes('Unable to decode target audio. %s' % str(error), 'utf-8')
+            start_response(
+                '400 Bad Request',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return [response_body]
+
+        try:
+            patches = self.pool.submit(SoundMatchPool.match_patches, audio,
+                                       batch_size).result()
+
+        except Full:
+            response_body = b'Server is busy, try again later'
+            start_response(
+                '503 Service Unavailable',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return [response_body]
+
+        except Exception as error:
+            response_body = bytes('Sound matching failed. %s' % str(error), 'utf-8')
+            start_response(
+                '500 Internal Server Error',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return [response_body]
+
+        # Stream one patch per line if requested, otherwise return a JSON list
+        if 'application/x-ndjson' in environ.get('HTTP_ACCEPT', ''):
+            start_response('200 Okay', [('Content-Type', 'application/x-ndjson')])
+            return (bytes(json.dumps({'patch': patch}) + '\n', 'utf-8') for patch in patches)
+
+        response_body = bytes(json.dumps({'patches': patches}), 'utf-8')
+        start_response('200 Okay', SoundMatchHTTPServer.get_headers(response_body,
+                                                                    'application/json'))
+        return [response_body]
+
+
+    def read_body(self, environ, start_response, content_types):
+        """
+        Read the body of a request, checking that it has an accepted content type
+
+        Args:
+            environ (dict): WSGI environment for the request
+            content_types (list): accepted content types
+
+        Returns:
+            tuple: body, content type, and response body. The body is None if the
+            request was invalid, in which case the response has been started and
+            the response body should be returned.
+        """
+
+        if not environ.get('CONTENT_LENGTH'):
+            response_body = b'Content-Length header is required'
+            start_response(
+                '411 Length Required',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return None, None, response_body
+
+        try:
+            content_length = int(environ['CONTENT_LENGTH'])
+        except ValueError:
+            content_length = -1
+
+        if content_length <= 0:
+            response_body = b'Request body with target audio is required'
+            start_response(
+                '400 Bad Request',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return None, None, response_body
+
+        if self.max_content_length is not None and content_length > self.max_content_length:
+            response_body = bytes('Request body is larger than the maximum of %s bytes'
+                                  % self.max_content_length, 'utf-8')
+            start_response(
+                '413 Payload Too Large',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return None, None, response_body
+
+        content_type = environ.get('CONTENT_TYPE', '').split(';')[0].strip().lower()
+        if content_type not in content_types:
+            response_body = bytes('Unsupported Content-Type %s. Use one of %s'
+                                  % (content_type, ', '.join(content_types)), 'utf-8')
+            start_response(
+                '415 Unsupported Media Type',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return None, None, response_body
+
+        body = environ['wsgi.input'].read(content_length)
+        return body, content_type, b''
+
+
+    @staticmethod
+    def decode_audio(data, content_type, sample_rate=44100):
+        """
+        Decode audio from bytes in memory. Multichannel audio is mixed down to mono
+        and audio is resampled to 44100 if required.
+
+        Args:
+            data (bytes): WAV file or raw little-endian float32 samples
+            content_type (str): one of :attr:`wav_types` for WAV files or
+                :attr:`pcm_types` for raw samples
+            sample_rate (int, optional): sample rate of raw samples. Defaults to 44100.
+
+        Returns:
+            :ref:`AudioBuffer <audio_buffer>`: decoded audio
+
+        Raises:
+            ValueError: If the audio can't be decoded
+        """
+
+        if content_type in SoundMatchHTTPServer.wav_types:
+            sample_rate, audio = scipy.io.wavfile.read(io.BytesIO(data))
+            if audio.dtype == np.uint8:
+                audio = (audio.astype(np.float32) - 128.0) / 128.0
+            elif np.issubdtype(audio.dtype, np.integer):
+                audio = audio.astype(np.float32) / -np.iinfo(audio.dtype).min
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+
+        elif content_type in SoundMatchHTTPServer.pcm_types:
+            if len(data) % 4 != 0:
+                raise ValueError('Raw audio must be float32 samples, received %s bytes'
+                                 % len(data))
+            audio = np.frombuffer(data, dtype='<f4')
+
+        else:
+            raise ValueError('Unsupported content type %s' % content_type)
+
+        if sample_rate <= 0:
+            raise ValueError('Sample rate must be greater than zero, received %s' % sample_rate)
+
+        audio = audio.astype(np.float32)
+        if sample_rate != 44100:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=44100)
+
+        return spgl.AudioBuffer(audio, 44100)
+
+
+    @staticmethod
+    def decode_audio_batch(data, content_type, sample_rate=44100, num_samples=None):
+        """
+        Decode a batch of audio targets with the same length from bytes in memory.
+        Audio is resampled to 44100 if required.
+
+        Args:
+            data (bytes): 2D array saved with ``np.save``, or raw little-endian float32
+                samples for each target one after another
+            content_type (str): one of :attr:`npy_types` or :attr:`pcm_types`
+            sample_rate (int, optional): sample rate of audio. Defaults to 44100.
+            num_samples (int, optional): number of samples in each target. Required
+                for raw samples.
+
+        Returns:
+            np.ndarray: audio with shape (batch, samples)
+
+        Raises:
+            ValueError: If the audio can't be decoded
+        """
+
+        if content_type in SoundMatchHTTPServer.npy_types:
+            audio = np.load(io.BytesIO(data), allow_pickle=False)
+            if audio.ndim != 2:
+                raise ValueError('Expected a 2D array of targets, received shape %s'
+                                 % (audio.shape,))
+
+        elif content_type in SoundMatchHTTPServer.pcm_types:
+            if not num_samples or num_samples < 1:
+                raise ValueError('num_samples query parameter is required for raw audio')
+            if len(data) % (4 * num_samples) != 0:
+                raise ValueError('Raw audio must be float32 samples with %s samples per '
+                                 'target, received %s bytes' % (num_samples, len(data)))
+            audio = np.frombuffer(data, dtype='<f4').reshape(-1, num_samples)
+
+        else:
+            raise ValueError('Unsupported content type %s' % content_type)
+
+        if sample_rate <= 0:
+            raise ValueError('Sample rate must be greater than zero, received %s' % sample_rate)
+
+        audio = audio.astype(np.float32)
+        if sample_rate != 44100:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=44100)
+
+        return audio
+
+
+    def run_sound_match(self, audio, start_response):
+        """
+        Run a sound match on target audio using a worker and return the patch
+        as JSON
+
+        Args:
+            audio (:ref:`AudioBuffer <audio_buffer>`): target audio
+        """
+
         # Attempt to get parameter settings, either just as parameters
         # from a parameter match -- or if a synthesizer is cofigured for
         # this sound matcher then run the full sound match and get the patch
         params = []
         try:
-            if self.sound_matcher.synth is None:
-                params = self.sound_matcher.match_parameters(audio, expand=True)
-            else:
-                _ = self.sound_matcher.match(audio)
-                params = copy(self.sound_matcher.get_patch())
-                self.sound_matcher.patch = None
+            params = self.pool.submit(SoundMatchPool.match_patch, audio).result()
+
+        except Full:
+            response_body = b'Server is busy, try again later'
+            start_response(
+                '503 Service Unavailable',
+                SoundMatchHTTPServer.get_headers(response_body, 'text/html')
+            )
+            return response_body
 
         except Exception as error:
             response_body = 'Sound matching failed. %s' % str(error)
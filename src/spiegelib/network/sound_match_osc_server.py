@@ -3,49 +3,378 @@
 This class runs a UDP server that receives OSC messages containing a path
 to an audio file to use as a sound target for synthesizer sound matching. It returns
 the parameter settings as JSON inside an OSC message.
+
+The server runs on an asyncio event loop. Messages are parsed on the event loop
+and sound matching is run by a worker from a :class:`~spiegelib.network.SoundMatchPool`,
+so the server keeps receiving messages while matches are running. Responses are
+sent to the address of the client that sent the request, on the send port, as soon
+as each match completes. If all workers are busy and the request queue is full, a
+``/sound_match_error`` message is returned right away.
+
+Target audio can also be sent inline as an OSC blob of little-endian float32
+samples, optionally followed by an int with the sample rate of the audio, which
+defaults to 44100. Audio at a different sample rate is resampled to 44100. The
+response to a blob request is a ``/sound_match_success`` message with an array
+of floats containing the patch values in order of parameter index, instead of a
+JSON string, so no files or JSON are involved::
+
+    /sound_match ,bi <float32 samples> 44100
+    /sound_match_success ,[ffff] 0.1 0.5 0.25 0.75
+
+The whole request has to fit in a single UDP datagram, which is limited to 65507
+bytes, so a blob can contain at most 16369 samples: about 0.37 seconds of audio at
+44100, or 1 second at 16000. Some systems limit datagrams further, e.g. to 9216
+bytes by default on macOS. One second of float32 audio at 44100 is 176400 bytes,
+so send longer clips as a path to an audio file instead. If the blob length
+doesn't match the data received a ``/sound_match_error`` message is returned.
+
+Many requests can be sent at once in an OSC bundle. All ``/sound_match`` messages
+in a bundle are run together by one worker and the responses are returned in a
+single bundle, in the same order as the requests. If every message in the bundle
+contains an audio blob of the same length and the sound matcher doesn't have a
+synthesizer, feature extraction and parameter estimation are each run once for
+all the targets (see :py:meth:`~spiegelib.core.SoundMatch.match_parameters_batch`).
+
+Sending a ``/queue_depth`` message returns a ``/queue_depth`` message with the
+number of sound match requests that are running or waiting for a worker.
+
+Example with four workers, each with a sound matcher loaded from a bundle::
+
+    factory = functools.partial(loader.load, loader_root)
+    server = SoundMatchOSCServer(sound_matcher_factory=factory, workers=4)
+    server.start()
 """
 
 import os
 import json
-import socketserver
-from copy import copy
+import asyncio
+import threading
+from queue import Full
+import numpy as np
+import librosa
 
 import spiegelib as spgl
 from spiegelib.network.osc import OscMessage, OscMessageBuilder
+from spiegelib.network.osc import OscBundle, OscBundleBuilder
+from spiegelib.network.osc import osc_types
+from spiegelib.network.osc.osc_message import ParseError
+from spiegelib.network.osc.osc_bundle import ParseError as BundleParseError
+from spiegelib.network.sound_match_pool import SoundMatchPool
 
 
-class UDPSocketHandler(socketserver.DatagramRequestHandler):
+class SoundMatchOSCProtocol(asyncio.DatagramProtocol):
     """
-    The RequestHandler class for the OSC server.
+    asyncio protocol for the OSC server. Parses incoming datagrams and sends
+    sound match requests to the server worker pool.
+
+    Args:
+        server (:class:`SoundMatchOSCServer`): server that received messages are
+            handled for
     """
 
-    def handle(self):
+    def __init__(self, server):
+        """
+        Constructor
+        """
+
+        self.server = server
+        self.transport = None
+
+
+    def connection_made(self, transport):
+        self.transport = transport
+
 
-        data = self.request[0].strip()
-        osc_data = OscMessage(data)
+    def datagram_received(self, data, addr):
+        """
+        Called on the event loop for each datagram received
+        """
+
+        if OscBundle.dgram_is_bundle(data):
+            self.bundle_received(data, addr)
+            return
+
+        try:
+            osc_data = OscMessage(data)
+        except ParseError as error:
+            print("Unable to parse request from %s: %s" % (addr[0], error))
+            self.parse_error(data, addr)
+            return
 
+        # Don't print the contents of audio blobs
         print("Received request:")
-        print(osc_data.address, osc_data.params)
+        print(osc_data.address, ['<blob %s bytes>' % len(p) if isinstance(p, bytes) else p
+                                 for p in osc_data.params])
 
-        response_builder = OscMessageBuilder("/error")
-        response_builder.add_arg("unknown address")
-        response = response_builder.build()
+        return_address = self.server.return_address(addr)
 
         if osc_data.address == "/sound_match":
-            self.sound_matcher = self.server.sound_matcher
-            response = self.try_sound_match(osc_data.params)
+            try:
+                future = self.server.pool.submit(SoundMatchOSCServer.try_sound_match,
+                                                 osc_data.params)
+            except Full:
+                response = OscMessageBuilder("/sound_match_error")
+                response.add_arg("Server is busy, try again later")
+                self.send(response.build(), return_address)
+                return
+
+            future = asyncio.wrap_future(future)
+            future.add_done_callback(lambda f: self.send_result(f, return_address))
+
+        elif osc_data.address == "/queue_depth":
+            response = OscMessageBuilder("/queue_depth")
+            response.add_arg(self.server.pool.pending)
+            self.send(response.build(), return_address)
+
+        else:
+            response = OscMessageBuilder("/error")
+            response.add_arg("unknown address")
+            self.send(response.build(), return_address)
+
+
+    def parse_error(self, data, addr):
+        """
+        Reply to a sound match request that could not be parsed. This is usually
+        an audio blob that is longer than the datagram received, because it was
+        too large to send in a single UDP datagram.
+        """
+
+        try:
+            address, _ = osc_types.get_string(data, 0)
+        except osc_types.ParseError:
+            return
+
+        if address == "/sound_match":
+            response = OscMessageBuilder("/sound_match_error")
+            response.add_arg("Unable to parse request of %s bytes, audio blob length "
+                             "does not match the data received" % len(data))
+            self.send(response.build(), self.server.return_address(addr))
+
+
+    def bundle_received(self, data, addr):
+        """
+        Called on the event loop for each bundle received. All sound match
+        requests in the bundle are sent to a worker together.
+        """
+
+        try:
+            bundle = OscBundle(data)
+        except BundleParseError as error:
+            print("Unable to parse bundle from %s: %s" % (addr[0], error))
+            return
+
+        messages = list(bundle.messages())
+        print("Received bundle with %s messages" % len(messages))
+
+        return_address = self.server.return_address(addr)
+
+        # Responses that don't require sound matching are created now
+        responses = []
+        requests = []
+        for message in messages:
+            if message.address == "/sound_match":
+                responses.append(None)
+                requests.append(message.params)
+            elif message.address == "/queue_depth":
+                response = OscMessageBuilder("/queue_depth")
+                response.add_arg(self.server.pool.pending)
+                responses.append(response.build())
+            else:
+                response = OscMessageBuilder("/error")
+                response.add_arg("unknown address")
+                responses.append(response.build())
+
+        if not requests:
+            self.send(SoundMatchOSCProtocol.build_bundle(responses), return_address)
+            return
+
+        try:
+            future = self.server.pool.submit(SoundMatchOSCServer.try_sound_match_bundle,
+                                             requests)
+        except Full:
+            response = OscMessageBuilder("/sound_match_error")
+            response.add_arg("Server is busy, try again later")
+            response = response.build()
+            responses = [response if r is None else r for r in responses]
+            self.send(SoundMatchOSCProtocol.build_bundle(responses), return_address)
+            return
+
+        future = asyncio.wrap_future(future)
+        future.add_done_callback(
+            lambda f: self.send_bundle_result(f, responses, return_address))
+
+
+    def send_bundle_result(self, future, responses, return_address):
+        """
+        Send the responses from a completed bundle of sound match requests
+        """
+
+        if future.exception() is not None:
+            response = OscMessageBuilder("/sound_match_error")
+            response.add_arg(str(future.exception()))
+            results = [response.build()] * responses.count(None)
+        else:
+            results = future.result()
+
+        results = iter(results)
+        responses = [next(results) if r is None else r for r in responses]
+        self.send(SoundMatchOSCProtocol.build_bundle(responses), return_address)
+
+
+    @staticmethod
+    def build_bundle(responses):
+        """
+        Build a bundle to be processed immediately from a list of messages
+        """
+
+        bundle = OscBundleBuilder()
+        for response in responses:
+            bundle.add_content(response)
+        return bundle.build()
+
+
+    def send_result(self, future, return_address):
+        """
+        Send the response from a completed sound match request
+        """
+
+        if future.exception() is not None:
+            response = OscMessageBuilder("/sound_match_error")
+            response.add_arg(str(future.exception()))
+            self.send(response.build(), return_address)
+        else:
+            self.send(future.result(), return_address)
+
+
+    def send(self, response, return_address):
+        """
+        Send an OSC message if the server is still running
+        """
+
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(response.dgram, return_address)
+
+
+
+class SoundMatchOSCServer():
+    """
+    Args:
+        sound_matcher (:class:`~spiegelib.core.SoundMatch`, optional): SoundMatch
+            object to use with a single worker
+        host (str, optional): address to run server at. Defaults to 127.0.0.1
+        receive (int, optonal): port to receive OSC messages on. Defaults to 9001.
+        send (int, optional): port to send OSC messages on. Defaults to 9002. If None,
+            responses are sent to the port that the request was sent from.
+        sound_matcher_factory (callable, optional): Function that takes no arguments
+            and returns a new SoundMatch object, called once for each worker.
+            Required if workers is greater than one.
+        workers (int, optional): Number of sound matching requests that can run
+            at once. Defaults to 1.
+        queue_size (int, optional): Number of requests that can wait for a worker
+            before requests are rejected. Defaults to 16.
+        synth_pool (:class:`~spiegelib.synth.SynthPool`, optional): Pool of
+            synthesizers that requests check out synthesizers from, see
+            :class:`~spiegelib.network.SoundMatchPool`
+    """
+
+    def __init__(self, sound_matcher=None, host="127.0.0.1", receive=9001, send=9002,
+                 sound_matcher_factory=None, workers=1, queue_size=16,
+                 synth_pool=None):
+        """
+        Constructor
+        """
+
+        self.sound_matcher = sound_matcher
+        self.host = host
+        self.receive_port = receive
+        self.send_port = send
+        self.pool = SoundMatchPool(sound_matcher, sound_matcher_factory, workers, queue_size,
+                                   synth_pool)
+
+        # Set once the server is receiving messages
+        self.started = threading.Event()
+        self._loop = None
+        self._stop = None
+
 
-        socket = self.request[1]
-        return_address = (self.client_address[0], self.server.send_port)
-        socket.sendto(response.dgram, return_address)
+    def start(self):
+        """
+        Start OSC server. Runs until the server is stopped.
+        """
+
+        print("To stop server press ctrl+c")
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+
+    async def serve(self):
+        """
+        Coroutine that runs the OSC server on the current event loop until
+        :py:meth:`stop` is called
+        """
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+
+        transport, _ = await self._loop.create_datagram_endpoint(
+            lambda: SoundMatchOSCProtocol(self),
+            local_addr=(self.host, self.receive_port)
+        )
+
+        # Use the bound port in case port 0 was requested
+        self.receive_port = transport.get_extra_info('sockname')[1]
+        print("Starting OSC server. Receiving on %s:%s. Sending on %s:%s"
+              % (self.host, self.receive_port, self.host, self.send_port))
+
+        self.started.set()
+        try:
+            await self._stop.wait()
+        finally:
+            transport.close()
+            self.pool.close()
+            self.started.clear()
+
+
+    def stop(self):
+        """
+        Stop the OSC server. Can be called from any thread.
+        """
+
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
 
 
-    def try_sound_match(self, params):
+    def return_address(self, client_address):
         """
-        Trys to run a sound match given a list of OSC parameters
+        Address to send responses to for a client
 
         Args:
+            client_address (tuple): host and port that a request was received from
+
+        Returns:
+            tuple: host and port to send the response to
+        """
+
+        if self.send_port is None:
+            return client_address
+
+        return (client_address[0], self.send_port)
+
+
+    @staticmethod
+    def try_sound_match(sound_matcher, params):
+        """
+        Trys to run a sound match given a list of OSC parameters. Called in a
+        worker thread.
+
+        Args:
+            sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
             params (list): List of OSC params
+
+        Returns:
+            :class:`~spiegelib.network.osc.OscMessage`: response message
         """
 
         response = OscMessageBuilder()
@@ -55,6 +384,9 @@ class UDPSocketHandler(socketserver.DatagramRequestHandler):
         except IndexError:
             target = None
 
+        if isinstance(target, bytes):
+            return SoundMatchOSCServer.try_sound_match_blob(sound_matcher, params)
+
         if target is None or not isinstance(target, str):
             response.address = "/sound_match_error"
             response.add_arg("Invalid target string received")
@@ -76,12 +408,7 @@ class UDPSocketHandler(socketserver.DatagramRequestHandler):
         # this sound matcher then run the full sound match and get the patch
         params = []
         try:
-            if self.sound_matcher.synth is None:
-                params = self.sound_matcher.match_parameters(audio, expand=True)
-            else:
-                _ = self.sound_matcher.match(audio)
-                params = copy(self.sound_matcher.get_patch())
-                self.sound_matcher.patch = None
+            params = SoundMatchPool.match_patch(sound_matcher, audio)
 
         except Exception as error:
             response.address = "/sound_match_error"
@@ -96,37 +423,116 @@ class UDPSocketHandler(socketserver.DatagramRequestHandler):
         return response.build()
 
 
+    @staticmethod
+    def try_sound_match_blob(sound_matcher, params):
+        """
+        Trys to run a sound match on audio sent inline as a blob of float32
+        samples. Called in a worker thread.
 
-class SoundMatchOSCServer():
-    """
-    Args:
-        sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
-        host (str, optional): address to run server at. Defaults to 127.0.0.1
-        receive (int, optonal): port to receive OSC messages on. Defaults to 9001.
-        send (int, optional): port to send OSC messages on. Defaults to 9002.
-    """
+        Args:
+            sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
+            params (list): List of OSC params, a blob of little-endian float32 samples
+                and an optional int sample rate
 
-    def __init__(self, sound_matcher, host="127.0.0.1", receive=9001, send=9002):
+        Returns:
+            :class:`~spiegelib.network.osc.OscMessage`: response message
         """
-        Constructor
+
+        response = OscMessageBuilder()
+        audio = SoundMatchOSCServer.decode_blob(params)
+
+        if audio is None:
+            response.address = "/sound_match_error"
+            response.add_arg("Invalid audio blob received, expected float32 samples "
+                             "followed by an int sample rate")
+            return response.build()
+
+        try:
+            params = SoundMatchPool.match_patch(sound_matcher, spgl.AudioBuffer(audio, 44100))
+
+        except Exception as error:
+            response.address = "/sound_match_error"
+            response.add_arg(str(error))
+            return response.build()
+
+        return SoundMatchOSCServer.build_patch_array(params)
+
+
+    @staticmethod
+    def try_sound_match_bundle(sound_matcher, requests):
         """
+        Trys to run sound matches for all the requests in a bundle. Called in a
+        worker thread.
 
-        self.sound_matcher = sound_matcher
-        self.host = host
-        self.receive_port = receive
-        self.send_port = send
+        Args:
+            sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
+            requests (list): List of OSC params for each request
 
+        Returns:
+            list: response message for each request
+        """
 
-    def start(self):
+        # Estimate all patches at once if possible
+        if sound_matcher.synth is None and len(requests) > 1 and \
+                all(len(params) and isinstance(params[0], bytes) for params in requests):
+            audio = [SoundMatchOSCServer.decode_blob(params) for params in requests]
+            if all(a is not None and len(a) == len(audio[0]) for a in audio):
+                try:
+                    patches = SoundMatchPool.match_patches(sound_matcher, np.stack(audio))
+                    return [SoundMatchOSCServer.build_patch_array(p) for p in patches]
+                except Exception:
+                    # Fall back to matching individually so that errors are
+                    # reported for each request
+                    pass
+
+        return [SoundMatchOSCServer.try_sound_match(sound_matcher, params)
+                for params in requests]
+
+
+    @staticmethod
+    def decode_blob(params):
         """
-        Start OSC server
+        Decode audio from OSC params containing a blob of little-endian float32
+        samples and an optional int sample rate. Audio is resampled to 44100.
+
+        Requests must fit in one UDP datagram of at most 65507 bytes, which limits
+        blobs to 16369 samples (about 0.37 seconds at 44100). Requests with larger
+        blobs are truncated or dropped before they reach the server.
+
+        Args:
+            params (list): List of OSC params
+
+        Returns:
+            np.ndarray: audio samples, or None if params are not valid
         """
 
-        server = socketserver.UDPServer((self.host, self.receive_port), UDPSocketHandler)
-        server.send_port = self.send_port
-        server.sound_matcher = self.sound_matcher
-        print("Starting OSC server. Receiving on %s:%s. Sending on %s:%s"
-              % (self.host, self.receive_port, self.host, self.send_port))
-        print("To stop server press ctrl+c")
+        blob = params[0]
+        sample_rate = params[1] if len(params) > 1 else 44100
+
+        if len(blob) % 4 != 0 or not isinstance(sample_rate, int) or sample_rate <= 0:
+            return None
 
-        server.serve_forever()
+        audio = np.frombuffer(blob, dtype='<f4').astype(np.float32)
+        if sample_rate != 44100:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=44100)
+
+        return audio
+
+
+    @staticmethod
+    def build_patch_array(params):
+        """
+        Build a success message with parameter values from a patch as an array
+        of floats ordered by parameter index
+
+        Args:
+            params (list): patch as a list of tuples of parameter indices and values
+
+        Returns:
+            :class:`~spiegelib.network.osc.OscMessage`: response message
+        """
+
+        values = [p[1] for p in sorted(params, key=lambda p: p[0])]
+        response = OscMessageBuilder("/sound_match_success")
+        response.add_array(np.array(values, dtype=np.float32))
+        return response.build()
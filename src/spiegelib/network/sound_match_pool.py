@@ -0,0 +1,236 @@
+#!/use/bin/env python
+"""
+Pool of worker threads used by the sound match servers to run sound matching
+requests concurrently. Each worker thread has its own
+:class:`~spiegelib.core.SoundMatch` object, so requests never share a synthesizer
+or estimator. The number of requests that can be running or waiting at once is
+bounded, and :py:meth:`SoundMatchPool.submit` raises ``queue.Full`` when a request
+can't be accepted so that servers can respond right away instead of queueing
+indefinitely.
+
+Synthesizers can be checked out of a :class:`~spiegelib.synth.SynthPool` for each
+request instead of each sound matcher keeping its own synthesizer. Synthesizers are
+then shared between workers and recycled by the synth pool if they leak memory.
+
+Example running two workers, each with a sound matcher loaded from a bundle::
+
+    factory = functools.partial(loader.load, loader_root)
+    pool = SoundMatchPool(sound_matcher_factory=factory, workers=2, queue_size=8)
+    future = pool.submit(SoundMatchPool.match_patch, audio)
+    patch = future.result()
+
+Example with a synth pool of two Dexed instances::
+
+    synth_pool = SynthPool(make_dexed, size=2, max_renders=10000)
+    pool = SoundMatchPool(sound_matcher_factory=factory, workers=2, synth_pool=synth_pool)
+"""
+
+import threading
+from copy import copy
+from queue import Full
+from concurrent.futures import ThreadPoolExecutor
+
+from spiegelib.synth.synth_base import SynthBase
+
+
+class SoundMatchPool():
+    """
+    Args:
+        sound_matcher (:class:`~spiegelib.core.SoundMatch`, optional): SoundMatch
+            object to use. Only valid with a single worker, since it can't be shared
+            between workers.
+        sound_matcher_factory (callable, optional): Function that takes no arguments
+            and returns a new SoundMatch object. Called once in each worker thread.
+        workers (int, optional): Number of worker threads. Defaults to 1.
+        queue_size (int, optional): Number of requests that can wait for a worker
+            when all workers are busy. Defaults to 16.
+        synth_pool (:class:`~spiegelib.synth.SynthPool`, optional): Pool of
+            synthesizers. If set, a synthesizer is checked out for each request and
+            used as the synth of the worker's sound matcher while the request runs.
+            Estimators that render with their own synth, such as
+            :class:`~spiegelib.estimator.BasicGA`, use the checked out synth as well.
+    """
+
+    def __init__(self, sound_matcher=None, sound_matcher_factory=None, workers=1,
+                 queue_size=16, synth_pool=None):
+        """
+        Constructor
+        """
+
+        if sound_matcher is None and sound_matcher_factory is None:
+            raise ValueError('Either sound_matcher or sound_matcher_factory must be provided')
+
+        if sound_matcher_factory is not None and not callable(sound_matcher_factory):
+            raise TypeError('sound_matcher_factory must be callable')
+
+        if workers < 1:
+            raise ValueError('workers must be greater than zero, received %s' % workers)
+
+        if queue_size < 0:
+            raise ValueError('queue_size must not be negative, received %s' % queue_size)
+
+        if sound_matcher_factory is None and workers > 1:
+            raise ValueError('sound_matcher_factory is required to use more than one worker')
+
+        self.sound_matcher = sound_matcher
+        self.sound_matcher_factory = sound_matcher_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.synth_pool = synth_pool
+
+        self._local = threading.local()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, initializer=self._init_worker)
+
+
+    def submit(self, function, *args):
+        """
+        Submit a request to be run by a worker
+
+        Args:
+            function (callable): Function that is called in a worker thread with that
+                worker's SoundMatch object and args
+            args: Additional arguments passed to function
+
+        Returns:
+            concurrent.futures.Future: future for the result of the function
+
+        Raises:
+            queue.Full: If all workers are busy and the queue is full
+        """
+
+        if not self._slots.acquire(blocking=False):
+            raise Full('All sound match workers are busy')
+
+        with self._pending_lock:
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(self._run, function, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda f: self._release())
+        return future
+
+
+    @property
+    def pending(self):
+        """
+        Number of requests that are running or waiting for a worker
+        """
+
+        return self._pending
+
+
+    def close(self):
+        """
+        Wait for running requests to finish and stop worker threads
+        """
+
+        self._executor.shutdown(wait=True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    @staticmethod
+    def match_patch(sound_matcher, audio):
+        """
+        Run sound matching on an audio target and return the resulting patch.
+        If the sound matcher has a synthesizer the full sound match is run,
+        otherwise parameters are estimated and expanded to a full patch.
+
+        Args:
+            sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
+            audio (:ref:`AudioBuffer <audio_buffer>`): target audio
+
+        Returns:
+            list: patch from sound matching
+        """
+
+        if sound_matcher.synth is None:
+            return sound_matcher.match_parameters(audio, expand=True)
+
+        _ = sound_matcher.match(audio)
+        params = copy(sound_matcher.get_patch())
+        sound_matcher.patch = None
+        return params
+
+
+    @staticmethod
+    def match_patches(sound_matcher, audio, batch_size=None):
+        """
+        Estimate patches for a batch of audio targets. Feature extraction and
+        parameter estimation are each run once over the batch, see
+        :py:meth:`~spiegelib.core.SoundMatch.match_parameters_batch`.
+
+        Args:
+            sound_matcher (:class:`~spiegelib.core.SoundMatch`): SoundMatch object to use
+            audio (list or np.ndarray): list of :ref:`AudioBuffers <audio_buffer>` or a
+                2D array of audio samples with shape (batch, samples)
+            batch_size (int, optional): Number of targets to predict at once
+
+        Returns:
+            list: full patch for each target
+        """
+
+        return sound_matcher.match_parameters_batch(audio, batch_size=batch_size, expand=True)
+
+
+    def _init_worker(self):
+        """
+        Initializer for worker threads. Creates a sound matcher for this worker.
+        """
+
+        if self.sound_matcher_factory is not None:
+            self._local.sound_matcher = self.sound_matcher_factory()
+        else:
+            self._local.sound_matcher = self.sound_matcher
+
+
+    def _release(self):
+        """
+        Release the slot held by a finished request
+        """
+
+        with self._pending_lock:
+            self._pending -= 1
+
+        self._slots.release()
+
+
+    def _run(self, function, *args):
+        """
+        Run a request with the sound matcher for this worker, using a synthesizer
+        from the synth pool if there is one
+        """
+
+        sound_matcher = self._local.sound_matcher
+        if self.synth_pool is None:
+            return function(sound_matcher, *args)
+
+        # Estimators that render, such as the genetic algorithms, hold a synth too
+        estimator = sound_matcher.estimator
+        swap_estimator = isinstance(getattr(estimator, 'synth', None), SynthBase)
+
+        synth = sound_matcher.synth
+        estimator_synth = estimator.synth if swap_estimator else None
+        with self.synth_pool.checkout() as pooled_synth:
+            sound_matcher.synth = pooled_synth
+            if swap_estimator:
+                estimator.synth = pooled_synth
+            try:
+                return function(sound_matcher, *args)
+            finally:
+                sound_matcher.synth = synth
+                if swap_estimator:
+                    estimator.synth = estimator_synth
@@ -5,7 +5,13 @@
 Init for synth components
 """
 
+from .patch import Patch
 from .synth_base import SynthBase
+from .render_cache import RenderCache
+from .cached_synth import CachedSynth
+from .numpy_synth import NumpySynth
+from .synth_pool import SynthPool
+from .remote_synth import RemoteSynth
 
 try:
     import librenderman
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Synthesizer wrapper that stores rendered audio in a
+:class:`~spiegelib.synth.RenderCache`. Rendering a patch that has already been
+rendered with the same settings loads the audio from the cache instead of running
+the wrapped synthesizer. All other methods and attributes are passed through to
+the wrapped synthesizer, so a CachedSynth can be used anywhere a synthesizer is
+expected::
+
+    cache = spgl.synth.RenderCache(max_size=2**28)
+    synth = spgl.synth.CachedSynth(spgl.synth.SynthVST('/path/to/Dexed.vst'), cache)
+    ga = spgl.estimator.BasicGA(synth, features)
+
+The same cache can be shared by several CachedSynth objects, including ones that
+wrap different VST plugins.
+"""
+
+import numpy as np
+
+from spiegelib import AudioBuffer
+from spiegelib.synth.synth_base import SynthBase
+
+
+class CachedSynth(SynthBase):
+    """
+    Args:
+        synth (:class:`~spiegelib.synth.SynthBase`): synthesizer to wrap
+        cache (:class:`~spiegelib.synth.RenderCache`): cache to store rendered audio in
+        name (str, optional): name added to cache keys to tell apart synthesizers
+            of the same class sharing a cache. Defaults to the plugin path or synth
+            factory of the wrapped synthesizer, see
+            :py:meth:`~spiegelib.synth.RenderCache.synth_name`.
+    """
+
+    # Attributes that belong to this object, all others are on the wrapped synth
+    _own_attributes = ('synth', 'cache', 'name', '_audio')
+
+    def __init__(self, synth, cache, name=None):
+        """
+        Constructor
+        """
+
+        if not isinstance(synth, SynthBase):
+            raise TypeError('synth must inherit from SynthBase')
+
+        self.synth = synth
+        self.cache = cache
+        self.name = name
+        self._audio = None
+
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on this object
+        if name in CachedSynth._own_attributes or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.synth, name)
+
+
+    def __setattr__(self, name, value):
+        if name in CachedSynth._own_attributes:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.synth, name, value)
+
+
+    def set_patch(self, parameters):
+        """
+        Set a new patch on the wrapped synthesizer, see
+        :py:meth:`~spiegelib.synth.SynthBase.set_patch`
+        """
+
+        self._audio = None
+        self.synth.set_patch(parameters)
+
+
+    def load_patch(self):
+        """
+        Load current patch into the wrapped synthesizer
+        """
+
+        self._audio = None
+        self.synth.load_patch()
+
+
+    def render_patch(self):
+        """
+        Render the current patch, or load audio from the cache if this patch has
+        already been rendered with the same settings
+        """
+
+        key = self.cache.key(self.synth, self.name)
+        samples = self.cache.get(key)
+
+        if samples is None:
+            self.synth.render_patch()
+            audio = self.synth.get_audio()
+            samples = audio.get_audio()
+            self.cache.put(key, samples)
+
+        self._audio = samples
+
+
+    def get_audio(self):
+        """
+        Return audio from the last call to :py:meth:`render_patch`
+
+        Returns:
+            :class:`~spiegelib.core.audio_buffer.AudioBuffer`: rendered audio
+        """
+
+        if self._audio is None:
+            raise Exception('Patch must be rendered before audio can be retrieved')
+
+        return AudioBuffer(self._audio.copy(), self.synth.sample_rate)
+
+
+    def randomize_patch(self):
+        """
+        Randomize the patch of the wrapped synthesizer
+        """
+
+        self._audio = None
+        self.synth.randomize_patch()
+
+
+    def render_batch(self, patches):
+        """
+        Render a batch of patches, loading audio from the cache for patches that
+        have already been rendered with the same settings. Patches that aren't in
+        the cache are rendered together with the wrapped synthesizer's
+        :py:meth:`~spiegelib.synth.SynthBase.render_batch`.
+
+        Args:
+            patches (np.ndarray): 2D array of parameter values with shape
+                (batch, parameters)
+
+        Returns:
+            np.ndarray: rendered audio with shape (batch, samples)
+        """
+
+        patches = np.asarray(patches, dtype=np.float64)
+        if patches.ndim != 2:
+            raise ValueError('Expected a 2D array of parameter values, received shape %s'
+                             % (patches.shape,))
+
+        # Keys use the full patches, as they would be set by set_patch
+        clamp = self.synth.param_range if self.synth.clamp_params else None
+        values = self.synth.patch.expand_batch(patches, clamp)
+        keys = self.cache.keys(self.synth, values, self.name)
+
+        audio = [self.cache.get(key) for key in keys]
+        missing = [i for i, samples in enumerate(audio) if samples is None]
+        if missing:
+            rendered = self.synth.render_batch(patches[missing])
+            for i, samples in zip(missing, rendered):
+                self.cache.put(keys[i], samples)
+                audio[i] = samples
+
+        self._audio = None
+        if len(audio) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return np.stack(audio)
+
+
+    def seed_random(self, seed):
+        """
+        Seed random number generators of the wrapped synthesizer, see
+        :py:meth:`~spiegelib.synth.SynthBase.seed_random`
+        """
+
+        self.synth.seed_random(seed)
+
+
+    def random_patches(self, size):
+        """
+        Create a batch of random patches with the wrapped synthesizer, see
+        :py:meth:`~spiegelib.synth.SynthBase.random_patches`
+        """
+
+        return self.synth.random_patches(size)
+
+
+    def get_parameters(self):
+        return self.synth.get_parameters()
+
+
+    def get_patch(self, skip_overridden=True):
+        return self.synth.get_patch(skip_overridden)
+
+
+    def set_overridden_parameters(self, parameters):
+        self._audio = None
+        self.synth.set_overridden_parameters(parameters)
+
+
+    def save_state(self, path):
+        self.synth.save_state(path)
+
+
+    def load_state(self, path):
+        self._audio = None
+        self.synth.load_state(path)
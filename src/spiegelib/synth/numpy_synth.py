@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Deterministic FM and subtractive synthesizer written in NumPy. It doesn't need
+any plugins or audio libraries, which makes it a stand-in for a VST synthesizer
+when testing and benchmarking rendering, dataset generation, and sound matching.
+
+A sine carrier with additional harmonics is frequency modulated by a sine
+modulator, shaped by an envelope, and filtered by a resonant lowpass filter.
+The first eight parameters are:
+
+    0. Tune: carrier pitch, +/- 12 semitones from the MIDI note
+    1. Mod Ratio: modulator frequency relative to the carrier, 0.5 to 8
+    2. Mod Index: frequency modulation depth, 0 to 10
+    3. Cutoff: lowpass filter cutoff, 20Hz to 20kHz
+    4. Resonance: gain of the filter peak at the cutoff
+    5. Attack: envelope attack time, 1ms to 1s
+    6. Decay: envelope decay and release time, 10ms to 2s
+    7. Sustain: envelope sustain level
+
+Synths with more than eight parameters use the rest to control the amplitude of
+harmonics of the carrier, starting at the second harmonic.
+
+Patches can be rendered one at a time like any other synthesizer, or a batch of
+patches can be rendered at once with :py:meth:`NumpySynth.render_batch`::
+
+    synth = spgl.synth.NumpySynth(num_params=16)
+    audio = synth.get_random_example()
+
+    patches = np.random.uniform(size=(64, 16))
+    batch = synth.render_batch(patches)
+"""
+
+import numpy as np
+import scipy.fft
+
+from spiegelib import AudioBuffer
+from spiegelib.synth.synth_base import SynthBase
+
+
+class NumpySynth(SynthBase):
+    """
+    Args:
+        num_params (int, optional): number of parameters, must be at least 8.
+            Defaults to 8.
+        seed (int, optional): seed for random patches. If not set, random patches
+            use the global NumPy random number generator.
+        kwargs: keyword arguments passed to :class:`~spiegelib.synth.SynthBase`
+
+    Attributes:
+        block_size (int): number of patches rendered at once in
+            :py:meth:`render_batch`, which limits memory used for large batches
+    """
+
+    # Names and default values of the first eight parameters
+    core_parameters = [
+        ('Tune', 0.5),
+        ('Mod Ratio', 0.0667),
+        ('Mod Index', 0.1),
+        ('Cutoff', 0.8),
+        ('Resonance', 0.0),
+        ('Attack', 0.01),
+        ('Decay', 0.25),
+        ('Sustain', 0.7)
+    ]
+
+    def __init__(self, num_params=8, seed=None, **kwargs):
+        """
+        Constructor
+        """
+
+        super().__init__(**kwargs)
+
+        if num_params < len(NumpySynth.core_parameters):
+            raise ValueError('num_params must be at least %s, received %s'
+                             % (len(NumpySynth.core_parameters), num_params))
+
+        self.num_params = num_params
+        self.block_size = 4
+        self.random = np.random.default_rng(seed) if seed is not None else np.random
+
+        self.parameters = {}
+        patch = []
+        for i in range(num_params):
+            if i < len(NumpySynth.core_parameters):
+                name, value = NumpySynth.core_parameters[i]
+            else:
+                name, value = ('Harmonic %s' % (i - len(NumpySynth.core_parameters) + 2), 0.0)
+
+            self.parameters[i] = name
+            patch.append((i, value))
+
+        self.patch = patch
+        self.audio = None
+
+
+    def load_patch(self):
+        """
+        Patches are read from the patch attribute when rendering, so there is
+        nothing to load
+        """
+
+
+    def render_patch(self):
+        """
+        Render the current patch
+        """
+
+        self.audio = self._render_block(self.patch.values[np.newaxis])[0]
+        self.rendered_patch = True
+
+
+    def get_audio(self):
+        """
+        Return audio from the last rendered patch
+
+        Returns:
+            :class:`~spiegelib.core.audio_buffer.AudioBuffer`: rendered audio
+        """
+
+        if not self.rendered_patch:
+            raise Exception('Patch must be rendered before audio can be retrieved')
+
+        return AudioBuffer(self.audio, self.sample_rate)
+
+
+    def randomize_patch(self):
+        """
+        Randomize parameters that aren't overridden
+        """
+
+        self.set_patch(self.random.uniform(size=len(self.patch.free)))
+
+
+    def seed_random(self, seed):
+        """
+        Seed the random number generator used for random patches
+
+        Args:
+            seed (int): seed for random patches. If None, random patches use the
+                global NumPy random number generator.
+        """
+
+        self.random = np.random.default_rng(seed) if seed is not None else np.random
+
+
+    def random_patches(self, size):
+        """
+        Create a batch of random patches
+
+        Args:
+            size (int): number of patches
+
+        Returns:
+            np.ndarray: parameter values with shape (size, non-overridden parameters)
+        """
+
+        return self.random.uniform(size=(size, len(self.patch.free)))
+
+
+    def render_batch(self, patches):
+        """
+        Render a batch of patches at once. Rows are mapped to parameters in the same
+        way as :py:meth:`~spiegelib.synth.SynthBase.set_patch`, so overridden
+        parameters keep their values. The current patch is not changed.
+
+        Args:
+            patches (np.ndarray): 2D array of parameter values with shape
+                (batch, parameters)
+
+        Returns:
+            np.ndarray: rendered audio with shape (batch, samples)
+        """
+
+        clamp = self.param_range if self.clamp_params else None
+        values = self.patch.expand_batch(patches, clamp)
+
+        audio = np.empty((len(values), self._num_samples()), dtype=np.float32)
+        for start in range(0, len(values), self.block_size):
+            audio[start:start + self.block_size] = \
+                self._render_block(values[start:start + self.block_size])
+
+        return audio
+
+
+    def _num_samples(self):
+        return int(self.render_length_secs * self.sample_rate)
+
+
+    def _render_block(self, values):
+        """
+        Render audio for a 2D array of full patch values
+        """
+
+        num_samples = self._num_samples()
+        t = np.arange(num_samples) / self.sample_rate
+        params = [values[:, i:i + 1] for i in range(values.shape[1])]
+        tune, ratio, index, cutoff, resonance, attack, decay, sustain = params[:8]
+        harmonics = [np.float32(h) for h in params[8:]]
+
+        # Phases are calculated in double precision and wrapped to a single cycle,
+        # then sin and exp are run in single precision, which is several times faster
+        note = self.midi_note + (tune - 0.5) * 24.0
+        carrier_hz = 440.0 * 2.0 ** ((note - 69.0) / 12.0)
+        modulator_hz = carrier_hz * (0.5 + 7.5 * ratio)
+        modulator = np.sin(_cycle_phase(modulator_hz * t))
+        phase = _cycle_phase(carrier_hz * t) + np.float32(10.0) * index.astype(np.float32) * modulator
+
+        # Frequency modulated carrier with harmonics. Harmonics use the recurrence
+        # sin(k x) = 2 cos(x) sin((k - 1) x) - sin((k - 2) x)
+        audio = np.sin(phase)
+        if harmonics:
+            cos_2x = np.float32(2.0) * np.cos(phase)
+            previous, current = np.zeros_like(audio), audio.copy()
+            for amplitude in harmonics:
+                previous, current = current, cos_2x * current - previous
+                audio += amplitude * current
+            audio /= np.float32(1.0) + sum(harmonics)
+
+        # Envelope with attack, decay to sustain, and release at the end of the note
+        t = t.astype(np.float32)
+        attack = (0.001 * 1000.0 ** attack).astype(np.float32)
+        decay = (0.01 * 200.0 ** decay).astype(np.float32)
+        sustain = sustain.astype(np.float32)
+        release = np.maximum(t - np.float32(self.note_length_secs), np.float32(0.0))
+        envelope = np.where(t < attack, t / attack,
+                            sustain + (np.float32(1.0) - sustain) * np.exp(-(t - attack) / decay))
+        envelope *= np.exp(-release / decay)
+        audio *= envelope * np.float32(self.midi_velocity / 127.0)
+
+        # Resonant lowpass filter applied in the frequency domain. SciPy transforms
+        # single precision audio without converting it to double precision.
+        cutoff = 20.0 * 1000.0 ** cutoff
+        freqs = np.maximum(np.fft.rfftfreq(num_samples, 1.0 / self.sample_rate), 1e-3)
+        octaves = np.log2(freqs / cutoff)
+        response = 1.0 / np.sqrt(1.0 + (freqs / cutoff) ** 4)
+        response *= 1.0 + 4.0 * resonance * np.exp(-octaves ** 2 / 0.02)
+        spectrum = scipy.fft.rfft(audio, axis=1) * response.astype(np.float32)
+        audio = scipy.fft.irfft(spectrum, n=num_samples, axis=1)
+
+        return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+
+def _cycle_phase(cycles):
+    """
+    Convert a phase in cycles to radians within a single cycle, in single precision
+    """
+
+    return (2.0 * np.pi * (cycles - np.floor(cycles))).astype(np.float32)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+Array backed synthesizer patch. Parameter indices and values are stored in NumPy
+arrays along with a mask of overridden parameters, so setting, clamping, and
+expanding patches are vectorized instead of looping over lists of tuples.
+
+A Patch behaves like the list of ``(index, value)`` tuples that synthesizers have
+always used: it can be iterated over, indexed, compared with lists, and passed
+to ``dict()``. :class:`~spiegelib.synth.SynthBase` stores its current patch as a
+Patch, and converts lists of tuples assigned to ``synth.patch``::
+
+    patch = Patch([(0, 0.5), (1, 0.25), (2, 1.0)], overridden=[1])
+
+    # Set values for the parameters that aren't overridden
+    patch.set_free([0.1, 0.2])
+    patch.to_list()
+    >>> [(0, 0.1), (1, 0.25), (2, 0.2)]
+"""
+
+import numpy as np
+
+
+class Patch():
+    """
+    Args:
+        patch (list or :class:`Patch`, optional): list of tuples of parameter indices
+            and values
+        overridden (list, optional): indices of parameters that are overridden.
+            Values of overridden parameters are not changed by :py:meth:`update`
+            or :py:meth:`set_free`.
+
+    Attributes:
+        indices (np.ndarray): parameter indices in ascending order
+        values (np.ndarray): parameter values for each index
+        overridden (np.ndarray): boolean mask of overridden parameters
+        free (np.ndarray): positions of parameters that aren't overridden
+    """
+
+    def __init__(self, patch=None, overridden=None):
+        """
+        Constructor
+        """
+
+        if isinstance(patch, Patch):
+            self.indices = patch.indices.copy()
+            self.values = patch.values.copy()
+        else:
+            items = np.asarray(list(patch) if patch is not None else [],
+                               dtype=np.float64).reshape(-1, 2)
+            order = np.argsort(items[:, 0], kind='stable')
+            self.indices = items[order, 0].astype(np.int64)
+            self.values = items[order, 1]
+
+        if len(np.unique(self.indices)) != len(self.indices):
+            raise ValueError('Patch contains duplicate parameter indices')
+
+        # Parameters numbered 0 to N - 1 are found by index directly
+        self._contiguous = np.array_equal(self.indices, np.arange(len(self.indices)))
+        self._positions = None if self._contiguous else \
+            {index: i for i, index in enumerate(self.indices.tolist())}
+
+        if overridden is None and isinstance(patch, Patch):
+            self.overridden = patch.overridden.copy()
+            self.free = patch.free.copy()
+        else:
+            self.set_overridden(overridden or [])
+
+
+    def positions(self, indices):
+        """
+        Get the positions of parameters in the value array
+
+        Args:
+            indices (list or np.ndarray): parameter indices
+
+        Returns:
+            np.ndarray: positions of each parameter
+
+        Raises:
+            IndexError: if a parameter index is not in this patch
+        """
+
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        if self._contiguous:
+            if len(indices) and (indices.min() < 0 or indices.max() >= len(self.indices)):
+                raise IndexError('Parameter index out of range for patch with %s parameters'
+                                 % len(self.indices))
+            return indices
+
+        try:
+            return np.array([self._positions[index] for index in indices.tolist()],
+                            dtype=np.int64)
+        except KeyError as error:
+            raise IndexError('Parameter %s is not in patch' % error.args[0])
+
+
+    def set_overridden(self, indices):
+        """
+        Set which parameters are overridden. Indices that aren't in this patch are
+        ignored.
+
+        Args:
+            indices (list): indices of overridden parameters
+        """
+
+        indices = np.asarray(list(indices), dtype=np.int64)
+        self.overridden = np.isin(self.indices, indices)
+        self.free = np.flatnonzero(~self.overridden)
+
+
+    def update(self, indices, values, clamp=None):
+        """
+        Update parameter values, skipping overridden parameters
+
+        Args:
+            indices (list or np.ndarray): indices of parameters to update
+            values (list or np.ndarray): new value for each parameter
+            clamp (tuple, optional): minimum and maximum parameter values. Values
+                are clipped to this range if it is set.
+        """
+
+        positions = self.positions(indices)
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) != len(positions):
+            raise ValueError('Received %s parameter indices and %s values'
+                             % (len(positions), len(values)))
+
+        if clamp is not None:
+            values = np.clip(values, clamp[0], clamp[1])
+
+        keep = ~self.overridden[positions]
+        self.values[positions[keep]] = values[keep]
+
+
+    def set_free(self, values, clamp=None):
+        """
+        Set values of parameters that aren't overridden from an ordered list of
+        values. The list can either contain a value for each parameter that isn't
+        overridden, or a value for every parameter, in which case values for
+        overridden parameters are ignored.
+
+        Args:
+            values (list or np.ndarray): ordered parameter values
+            clamp (tuple, optional): minimum and maximum parameter values. Values
+                are clipped to this range if it is set.
+        """
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == len(self.indices):
+            values = values[self.free]
+        elif len(values) != len(self.free):
+            raise ValueError((
+                'Unclear on how to map parameters, received %s parameters '
+                'and there are %s non-overridden parameters and %s total parameters.'
+            ) % (len(values), len(self.free), len(self.indices)))
+
+        if clamp is not None:
+            values = np.clip(values, clamp[0], clamp[1])
+
+        self.values[self.free] = values
+
+
+    def expand_batch(self, values, clamp=None):
+        """
+        Expand a batch of ordered parameter values into full patches, using the
+        values in this patch for overridden parameters. Each row is mapped to
+        parameters in the same way as :py:meth:`set_free`. This patch is not changed.
+
+        Args:
+            values (np.ndarray): 2D array of parameter values with shape
+                (batch, parameters), where the number of parameters is either the
+                number of free parameters or the total number of parameters
+            clamp (tuple, optional): minimum and maximum parameter values. Values
+                are clipped to this range if it is set.
+
+        Returns:
+            np.ndarray: full patch values with shape (batch, total parameters)
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2:
+            raise ValueError('Expected a 2D array of parameter values, received shape %s'
+                             % (values.shape,))
+
+        if values.shape[1] == len(self.indices):
+            values = values[:, self.free]
+        elif values.shape[1] != len(self.free):
+            raise ValueError((
+                'Unclear on how to map parameters, received %s parameters '
+                'and there are %s non-overridden parameters and %s total parameters.'
+            ) % (values.shape[1], len(self.free), len(self.indices)))
+
+        if clamp is not None:
+            values = np.clip(values, clamp[0], clamp[1])
+
+        patches = np.tile(self.values, (len(values), 1))
+        patches[:, self.free] = values
+        return patches
+
+
+    def to_list(self, skip_overridden=False):
+        """
+        Args:
+            skip_overridden (bool, optional): whether to leave out overridden
+                parameters. Defaults to False.
+
+        Returns:
+            list: list of tuples of parameter indices and values
+        """
+
+        if skip_overridden:
+            return list(zip(self.indices[self.free].tolist(), self.values[self.free].tolist()))
+
+        return list(zip(self.indices.tolist(), self.values.tolist()))
+
+
+    def copy(self):
+        """
+        Returns:
+            :class:`Patch`: copy of this patch
+        """
+
+        return Patch(self)
+
+
+    def __len__(self):
+        return len(self.indices)
+
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self.to_list()[position]
+
+        return (int(self.indices[position]), float(self.values[position]))
+
+
+    def __setitem__(self, position, parameter):
+        if parameter[0] != self.indices[position]:
+            raise IndexError('Parameter %s can not be set at position %s'
+                             % (parameter[0], position))
+
+        self.values[position] = parameter[1]
+
+
+    def __eq__(self, other):
+        if isinstance(other, Patch):
+            return (np.array_equal(self.indices, other.indices)
+                    and np.array_equal(self.values, other.values))
+
+        try:
+            return self.to_list() == [tuple(item) for item in other]
+        except TypeError:
+            return NotImplemented
+
+
+    def __repr__(self):
+        return 'Patch(%s)' % self.to_list()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+"""
+Synthesizer proxy that runs a synthesizer in a separate worker process, so a
+plugin that crashes only takes down the worker and not the dataset job or server
+using it. The worker is started again automatically when it stops, and the render
+that was running is retried.
+
+Patches and render settings are sent to the worker through a pipe with each
+render, so the worker doesn't hold any state that would be lost if it crashes.
+Rendered audio is written by the worker into a ring buffer in shared memory
+instead of being pickled and sent back, and :py:meth:`RemoteSynth.get_audio`
+returns a view of the ring buffer without copying it.
+
+The factory is called in the worker process, so it must be picklable on platforms
+that spawn processes instead of forking them::
+
+    def make_dexed():
+        return spgl.synth.SynthVST('/Library/Audio/Plug-Ins/VST/Dexed.vst')
+
+    with spgl.synth.RemoteSynth(make_dexed, synth_state='./dexed.json') as synth:
+        synth.set_patch(patch)
+        synth.render_patch()
+        audio = synth.get_audio()
+
+Audio returned by :py:meth:`RemoteSynth.get_audio` is overwritten after the ring
+buffer has wrapped around, which happens after a number of further renders equal
+to the number of slots. Copy the audio to keep it for longer.
+"""
+
+import multiprocessing
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from spiegelib import AudioBuffer
+from spiegelib.synth.synth_base import SynthBase
+
+
+class RemoteSynth(SynthBase):
+    """
+    Args:
+        synth_factory (callable): Function that takes no arguments and returns a new
+            synthesizer that inherits from :class:`~spiegelib.synth.SynthBase`.
+            Called in the worker process each time it is started.
+        synth_state (str, optional): Location of a synth state JSON file (see
+            :py:meth:`~spiegelib.synth.SynthBase.save_state`) that is loaded into the
+            worker synthesizer each time the worker is started.
+        slots (int, optional): Number of rendered sounds the shared memory ring buffer
+            holds. Defaults to 4.
+        timeout (float, optional): Number of seconds to wait for a render. The worker
+            is restarted and TimeoutError is raised if a render takes longer than this.
+            Defaults to None, which waits indefinitely.
+        max_retries (int, optional): Number of times a render is retried when the
+            worker stops while rendering. Defaults to 1.
+
+    Attributes:
+        process (multiprocessing.Process): worker process
+        restarts (int): number of times the worker process has been restarted
+    """
+
+    # Render settings sent to the worker with each render
+    settings = ('sample_rate', 'buffer_size', 'midi_note', 'midi_velocity',
+                'note_length_secs', 'render_length_secs')
+
+    def __init__(self, synth_factory, synth_state=None, slots=4, timeout=None,
+                 max_retries=1):
+        """
+        Constructor
+        """
+
+        super().__init__()
+
+        if not callable(synth_factory):
+            raise TypeError('synth_factory must be callable')
+
+        if slots < 1:
+            raise ValueError('slots must be greater than zero, received %s' % slots)
+
+        self.synth_factory = synth_factory
+        self.synth_state = synth_state
+        self.slots = slots
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.restarts = 0
+        self.process = None
+
+        self._connection = None
+        self._memory = None
+        self._ring = None
+        self._slot = 0
+        self._audio = None
+
+        # The proxy takes its parameters, patch, and settings from the worker synth
+        state = self._start()
+        for name in RemoteSynth.settings + ('param_range', 'clamp_params', 'parameters'):
+            setattr(self, name, state[name])
+
+        self.overridden_params = state['overridden_params']
+        self.patch = state['patch']
+
+
+    def load_patch(self):
+        """
+        Patches are sent to the worker with each render, so there is nothing to load
+        """
+
+
+    def render_patch(self):
+        """
+        Render the current patch in the worker process
+        """
+
+        self.rendered_patch = False
+        slot = self._slot
+        samples = self._request('render', self.patch.values)
+        self._audio = self._ring[slot, :samples]
+        self._slot = (slot + 1) % self.slots
+        self.rendered_patch = True
+
+
+    def get_audio(self):
+        """
+        Return audio from the last rendered patch. The audio is a view of the shared
+        memory ring buffer and is overwritten after the ring buffer wraps around.
+
+        Returns:
+            :class:`~spiegelib.core.audio_buffer.AudioBuffer`: rendered audio
+        """
+
+        if not self.rendered_patch:
+            raise Exception('Patch must be rendered before audio can be retrieved')
+
+        return AudioBuffer(self._audio, self.sample_rate)
+
+
+    def randomize_patch(self):
+        """
+        Randomize parameters that aren't overridden
+        """
+
+        self.set_patch(np.random.uniform(size=len(self.patch.free)))
+
+
+    def render_batch(self, patches):
+        """
+        Render a batch of patches in the worker process, using the worker synth's
+        :py:meth:`~spiegelib.synth.SynthBase.render_batch`. Rows are mapped to
+        parameters in the same way as :py:meth:`~spiegelib.synth.SynthBase.set_patch`.
+        The current patch is not changed.
+
+        Args:
+            patches (np.ndarray): 2D array of parameter values with shape
+                (batch, parameters)
+
+        Returns:
+            np.ndarray: rendered audio with shape (batch, samples)
+        """
+
+        clamp = self.param_range if self.clamp_params else None
+        values = self.patch.expand_batch(patches, clamp)
+
+        # Rendering the batch overwrites audio from the last render
+        self.rendered_patch = False
+        audio = None
+        for start in range(0, len(values), self.slots):
+            block = values[start:start + self.slots]
+            samples = self._request('batch', block)
+            if audio is None:
+                audio = np.empty((len(values), samples), dtype=np.float32)
+            audio[start:start + len(block)] = self._ring[:len(block), :samples]
+
+        if audio is None:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return audio
+
+
+    def close(self):
+        """
+        Stop the worker process and release shared memory
+        """
+
+        self._stop()
+        self._release()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+    def _start(self):
+        """
+        Start the worker process and wait for its synthesizer to be created
+
+        Returns:
+            dict: parameters, patch, and settings of the worker synth
+        """
+
+        # The worker must share this process's resource tracker, otherwise its own
+        # tracker removes the shared memory when the worker stops
+        resource_tracker.ensure_running()
+
+        self._connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve,
+            args=(worker_connection, self.synth_factory, self.synth_state),
+            daemon=True
+        )
+        self.process.start()
+        worker_connection.close()
+
+        try:
+            reply = self._receive()
+        except EOFError:
+            self._stop()
+            raise RuntimeError('Synth worker stopped while starting')
+        except RuntimeError:
+            self._stop()
+            raise
+
+        if self._memory is not None:
+            self._connection.send(('buffer', self._memory.name, self._ring.shape))
+
+        return reply[1]
+
+
+    def _restart(self):
+        """
+        Stop the worker process and start a new one
+        """
+
+        self._stop()
+        self.restarts += 1
+        self._start()
+
+
+    def _stop(self):
+        """
+        Stop the worker process, asking it to exit before terminating it
+        """
+
+        if self._connection is not None:
+            try:
+                self._connection.send(('stop',))
+            except (OSError, ValueError):
+                pass
+            self._connection.close()
+            self._connection = None
+
+        if self.process is not None:
+            self.process.join(timeout=1.0)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.process = None
+
+
+    def _allocate(self, samples):
+        """
+        Create a ring buffer in shared memory with room for a number of samples
+        in each slot, and send it to the worker
+        """
+
+        self._release()
+        size = self.slots * samples * np.dtype(np.float32).itemsize
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        self._ring = np.ndarray((self.slots, samples), dtype=np.float32,
+                                buffer=self._memory.buf)
+        self._connection.send(('buffer', self._memory.name, self._ring.shape))
+
+
+    def _release(self):
+        """
+        Release the shared memory ring buffer
+        """
+
+        if self._memory is None:
+            return
+
+        self._ring = None
+        self._memory.unlink()
+        _retired.append(self._memory)
+        self._memory = None
+
+        # Audio returned by get_audio can still be using the memory, in which
+        # case it is closed by a later release once that audio is no longer used
+        for memory in list(_retired):
+            try:
+                memory.close()
+                _retired.remove(memory)
+            except BufferError:
+                pass
+
+
+    def _request(self, command, values):
+        """
+        Send a render request to the worker, allocating a larger ring buffer if the
+        audio doesn't fit and restarting the worker if it stops
+
+        Returns:
+            int: number of samples rendered for each patch
+        """
+
+        required = int(self.render_length_secs * self.sample_rate) + self.buffer_size
+        settings = {name: getattr(self, name) for name in RemoteSynth.settings}
+        retries = 0
+        while True:
+            try:
+                if self._ring is None or self._ring.shape[1] < required:
+                    self._allocate(required)
+                self._connection.send((command, settings, values, self._slot))
+                reply = self._receive(self.timeout)
+            except TimeoutError:
+                raise
+            except (EOFError, OSError):
+                if retries >= self.max_retries:
+                    self._restart()
+                    raise RuntimeError('Synth worker stopped while rendering')
+                retries += 1
+                self._restart()
+                continue
+
+            if reply[0] == 'resize':
+                self._allocate(reply[1])
+                continue
+
+            return reply[1]
+
+
+    def _receive(self, timeout=None):
+        """
+        Receive a reply from the worker, raising errors from the worker synth. The
+        worker is restarted if it doesn't reply within the timeout.
+        """
+
+        if timeout is not None and not self._connection.poll(timeout):
+            self._restart()
+            raise TimeoutError('Synth worker did not respond within %s seconds' % timeout)
+
+        reply = self._connection.recv()
+        if reply[0] == 'error':
+            raise RuntimeError('Error in synth worker:\n%s' % reply[1])
+
+        return reply
+
+
+
+# Shared memory that couldn't be closed yet because audio was still using it
+_retired = []
+
+
+def _serve(connection, synth_factory, synth_state):
+    """
+    Main function of the worker process. Creates a synthesizer and renders patches
+    sent from a RemoteSynth until it is asked to stop.
+    """
+
+    try:
+        synth = SynthBase.from_factory(synth_factory, synth_state)
+        state = {name: getattr(synth, name) for name in
+                 RemoteSynth.settings + ('param_range', 'clamp_params', 'parameters')}
+        state['patch'] = synth.get_patch(skip_overridden=False)
+        state['overridden_params'] = list(synth.overridden_params)
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+        return
+
+    # The proxy keeps track of overridden parameters and sends full patches
+    synth.overridden_params = []
+    connection.send(('ready', state))
+
+    memory = None
+    ring = None
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                break
+
+            command = message[0]
+            if command == 'stop':
+                break
+
+            if command == 'buffer':
+                if memory is not None:
+                    ring = None
+                    memory.close()
+                memory = shared_memory.SharedMemory(name=message[1])
+                ring = np.ndarray(message[2], dtype=np.float32, buffer=memory.buf)
+                continue
+
+            try:
+                _, settings, values, slot = message
+                for name, value in settings.items():
+                    setattr(synth, name, value)
+
+                if command == 'render':
+                    synth.set_patch(values)
+                    synth.render_patch()
+                    audio = synth.get_audio().get_audio()[np.newaxis]
+                    slot = np.array([slot])
+                else:
+                    audio = synth.render_batch(values)
+                    slot = np.arange(len(audio))
+
+                if audio.shape[1] > ring.shape[1]:
+                    connection.send(('resize', audio.shape[1]))
+                    continue
+
+                ring[slot, :audio.shape[1]] = audio
+                connection.send(('audio', audio.shape[1]))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+    finally:
+        ring = None
+        if memory is not None:
+            memory.close()
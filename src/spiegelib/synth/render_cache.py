@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""
+Cache of audio rendered by synthesizers. Rendered audio is keyed by the patch,
+with parameter values rounded to a fixed resolution, along with the settings
+used for rendering: sample rate, buffer size, MIDI note and velocity, and note
+and render lengths. Synthesizers of the same class are told apart by the path of
+the loaded plugin for :class:`~spiegelib.synth.SynthVST`, and by the factory and
+synth state for :class:`~spiegelib.synth.RemoteSynth`. Audio is stored in memory up to a maximum size in bytes, and
+the least recently used audio is removed once that is reached. If a spill folder
+is given, removed audio is written to disk in a
+:class:`~spiegelib.features.FeatureCache` and loaded from there if it is
+requested again.
+
+Use :class:`~spiegelib.synth.CachedSynth` to add a render cache to a
+synthesizer::
+
+    cache = spgl.synth.RenderCache(max_size=2**28, spill_path='./render_cache')
+    synth = spgl.synth.CachedSynth(spgl.synth.SynthVST('/path/to/Dexed.vst'), cache)
+
+    synth.set_patch(patch)
+    synth.render_patch()
+    audio = synth.get_audio()
+    print(cache.report())
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from spiegelib.features.feature_cache import FeatureCache, _UnkeyableError
+
+
+class RenderCache():
+    """
+    Args:
+        max_size (int, optional): maximum size in bytes of audio stored in memory.
+            Defaults to 256 MiB.
+        resolution (float, optional): parameter values are rounded to a multiple of
+            this value before being used as a key. Defaults to 1e-6.
+        spill_path (str, optional): folder to write audio to when it is removed from
+            memory. Audio is not kept after being removed from memory if this isn't set.
+        spill_size (int, optional): maximum size in bytes of audio stored on disk.
+            Defaults to 1 GiB.
+
+    Attributes:
+        hits (int): number of renders that were found in memory or on disk
+        misses (int): number of renders that were not found
+        evictions (int): number of renders removed from memory
+        disk_hits (int): number of renders that were found on disk
+    """
+
+    def __init__(self, max_size=2**28, resolution=1e-6, spill_path=None, spill_size=2**30):
+        """
+        Constructor
+        """
+
+        if max_size <= 0:
+            raise ValueError('max_size must be greater than zero, received %s' % max_size)
+
+        if resolution <= 0:
+            raise ValueError('resolution must be greater than zero, received %s' % resolution)
+
+        self.max_size = max_size
+        self.resolution = resolution
+        self.spill = FeatureCache(spill_path, spill_size) if spill_path else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+
+    def key(self, synth, name=None):
+        """
+        Get the cache key for the current patch and render settings of a synthesizer
+
+        Args:
+            synth (:class:`~spiegelib.synth.SynthBase`): synthesizer
+            name (str, optional): name used to tell apart synthesizers of the same
+                class. Defaults to a name based on the plugin path or synth factory,
+                see :py:meth:`synth_name`.
+
+        Returns:
+            str: hex digest key
+        """
+
+        return self.keys(synth, synth.patch.values[np.newaxis], name)[0]
+
+
+    def keys(self, synth, values, name=None):
+        """
+        Get cache keys for a batch of patches rendered with the current render
+        settings of a synthesizer
+
+        Args:
+            synth (:class:`~spiegelib.synth.SynthBase`): synthesizer
+            values (np.ndarray): values for all parameters of the synthesizer with
+                shape (batch, parameters), see
+                :py:meth:`~spiegelib.synth.Patch.expand_batch`
+            name (str, optional): name used to tell apart synthesizers of the same
+                class, see :py:meth:`key`
+
+        Returns:
+            list: hex digest key for each patch
+        """
+
+        if name is None:
+            name = RenderCache.synth_name(synth)
+
+        cls = type(synth)
+        settings = (cls.__module__, cls.__qualname__, name, synth.sample_rate,
+                    synth.buffer_size, synth.midi_note, synth.midi_velocity,
+                    synth.note_length_secs, synth.render_length_secs)
+
+        values = np.round(np.asarray(values) / self.resolution).astype(np.int64)
+
+        digest = hashlib.sha1(repr(settings).encode('utf-8'))
+        digest.update(synth.patch.indices.tobytes())
+
+        keys = []
+        for row in values:
+            row_digest = digest.copy()
+            row_digest.update(row.tobytes())
+            keys.append(row_digest.hexdigest())
+
+        return keys
+
+
+    @staticmethod
+    def synth_name(synth):
+        """
+        Get a name that tells apart synthesizers of the same class. This is the
+        absolute path of the loaded plugin for synthesizers with a plugin_path, such
+        as :class:`~spiegelib.synth.SynthVST`, and a digest of the factory and
+        synth state for synthesizers created by a synth_factory, such as
+        :class:`~spiegelib.synth.RemoteSynth`. Other synthesizers are identified by
+        their class alone.
+
+        Args:
+            synth (:class:`~spiegelib.synth.SynthBase`): synthesizer
+
+        Returns:
+            str: name, or None for synthesizers identified by their class
+
+        Raises:
+            ValueError: if the synth factory can't be identified, in which case a
+                name must be given
+        """
+
+        plugin_path = getattr(synth, 'plugin_path', None)
+        if plugin_path is not None:
+            return os.path.abspath(plugin_path)
+
+        synth_factory = getattr(synth, 'synth_factory', None)
+        if synth_factory is not None:
+            digest = hashlib.sha1()
+            synth_state = getattr(synth, 'synth_state', None)
+            if synth_state is not None:
+                synth_state = os.path.abspath(synth_state)
+            try:
+                FeatureCache._update_digest(digest, (synth_factory, synth_state))
+            except _UnkeyableError:
+                raise ValueError('Unable to identify synth_factory %r, a name must be '
+                                 'given to cache its renders' % synth_factory)
+            return digest.hexdigest()
+
+        return None
+
+
+    def get(self, key):
+        """
+        Get rendered audio samples
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            np.ndarray: audio samples, or None if they are not in the cache
+        """
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        samples = self.spill.get(key) if self.spill is not None else None
+
+        with self._lock:
+            if samples is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.disk_hits += 1
+
+        # Audio found on disk is moved back into memory
+        self.put(key, samples)
+        return samples
+
+
+    def put(self, key, samples):
+        """
+        Store rendered audio samples, removing least recently used audio if
+        the cache is larger than the maximum size
+
+        Args:
+            key (str): cache key
+            samples (np.ndarray): audio samples
+        """
+
+        samples = np.array(samples)
+        samples.flags.writeable = False
+        spilled = []
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key).nbytes
+
+            if samples.nbytes <= self.max_size:
+                self._entries[key] = samples
+                self._size += samples.nbytes
+            else:
+                spilled.append((key, samples))
+
+            while self._size > self.max_size:
+                evicted = self._entries.popitem(last=False)
+                self._size -= evicted[1].nbytes
+                self.evictions += 1
+                spilled.append(evicted)
+
+        # Disk writes happen outside of the lock
+        if self.spill is not None:
+            for item in spilled:
+                self.spill.put(*item)
+
+
+    def report(self):
+        """
+        Returns:
+            dict: number of hits, misses, evictions, and hits from disk, hit rate,
+            and number and total size in bytes of audio in memory and on disk
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            report = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'entries': len(self._entries),
+                'size': self._size,
+                'disk_entries': 0,
+                'disk_size': 0
+            }
+
+        if self.spill is not None:
+            spill_report = self.spill.report()
+            report['disk_entries'] = spill_report['entries']
+            report['disk_size'] = spill_report['size']
+
+        return report
+
+
+    def clear(self):
+        """
+        Remove all audio from memory and disk and reset counters
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.disk_hits = 0
+
+        if self.spill is not None:
+            self.spill.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
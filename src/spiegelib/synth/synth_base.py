@@ -7,6 +7,9 @@ import os
 import numbers
 import json
 from abc import ABC, abstractmethod
+import numpy as np
+
+from spiegelib.synth.patch import Patch
 
 
 class SynthBase(ABC):
@@ -33,8 +36,9 @@ class SynthBase(ABC):
     :vartype rendered_patch: boolean
     :cvar parameters: parameter indices and names
     :vartype parameters: dict
-    :cvar patch: current patch values
-    :vartype patch: list
+    :cvar patch: current patch values. Lists of tuples assigned to this are
+        converted to a :class:`~spiegelib.synth.Patch`
+    :vartype patch: :class:`~spiegelib.synth.Patch`
     :cvar param_range: Range of acceptable parameter values, defaults to (0.0, 1.0)
     :vartype param_range: tuple
     """
@@ -47,6 +51,7 @@ class SynthBase(ABC):
         """
         super().__init__()
 
+        self._patch = None
         self.sample_rate = sample_rate
         self.buffer_size = buffer_size
         self.midi_note = midi_note
@@ -86,38 +91,62 @@ class SynthBase(ABC):
         if len(parameters) == 0:
             return
 
-        param_indices = self.get_parameters().keys()
-        overridden_indices = [p[0] for p in self.overridden_params]
-        new_patch = []
+        clamp = self.param_range if self.clamp_params else None
 
-        # If this is just a list of numbers, then try to associate with parameter settings
-        if isinstance(parameters[0], numbers.Number):
-            new_patch = SynthBase.expand_sub_patch(parameters,
-                                                   param_indices,
-                                                   self.overridden_params)
+        if isinstance(parameters, Patch):
+            self.patch.update(parameters.indices, parameters.values, clamp)
 
-        # If this is a list of tuples then add those directly
+        # If this is just a list of numbers, then map to non-overridden parameters
+        elif isinstance(parameters[0], numbers.Number):
+            self.patch.set_free(parameters, clamp)
+
+        # If this is a list of tuples then update those parameters directly
         elif len(parameters[0]) == 2:
-            new_patch = parameters
+            parameters = np.asarray(parameters, dtype=np.float64)
+            self.patch.update(parameters[:, 0].astype(np.int64), parameters[:, 1], clamp)
 
         else:
             raise Exception("Invalid parameter list provided. Must be a list of "
                             "numbers or a list of tuples.")
 
-        # Update patch member variable with new patch, skipping any overridden params
-        for param in new_patch:
-            if not param[0] in overridden_indices:
-                value = param[1]
-                if self.clamp_params:
-                    value = max(min(value, self.param_range[1]), self.param_range[0])
-
-                self.patch[param[0]] = (param[0], value)
-
         # Load new patch into synth engine
         self.rendered_patch = False
         self.load_patch()
 
 
+    @property
+    def patch(self):
+        """
+        Current patch as a :class:`~spiegelib.synth.Patch`
+        """
+
+        return self._patch
+
+
+    @patch.setter
+    def patch(self, patch):
+        if patch is not None:
+            patch = Patch(patch, [p[0] for p in self.overridden_params])
+        self._patch = patch
+
+
+    @property
+    def overridden_params(self):
+        """
+        List of tuples of overridden parameter indices and values. Setting this
+        updates the overridden mask of the current patch.
+        """
+
+        return self._overridden_params
+
+
+    @overridden_params.setter
+    def overridden_params(self, parameters):
+        self._overridden_params = parameters
+        if self._patch is not None:
+            self._patch.set_overridden([p[0] for p in parameters])
+
+
     @abstractmethod
     def load_patch(self):
         """
@@ -165,6 +194,73 @@ class SynthBase(ABC):
         return self.get_audio()
 
 
+    def render_batch(self, patches):
+        """
+        Render a batch of patches. Each row is set as a patch in the same way as
+        :py:meth:`set_patch`, so rows can have values for the non-overridden
+        parameters or for all parameters. The current patch is restored afterwards.
+
+        This renders each patch in turn, inheriting classes that can render many
+        patches at once should override this.
+
+        :param patches: 2D array of parameter values with shape (batch, parameters)
+        :type patches: np.ndarray
+        :return: rendered audio with shape (batch, samples)
+        :rtype: np.ndarray
+        """
+
+        patches = np.asarray(patches, dtype=np.float64)
+        if patches.ndim != 2:
+            raise ValueError('Expected a 2D array of parameter values, received shape %s'
+                             % (patches.shape,))
+
+        current = self.patch.copy()
+        audio = []
+        try:
+            for values in patches:
+                self.set_patch(values)
+                self.render_patch()
+                audio.append(self.get_audio().get_audio())
+        finally:
+            self.patch = current
+            self.rendered_patch = False
+            self.load_patch()
+
+        if len(audio) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return np.stack(audio)
+
+
+    def random_patches(self, size):
+        """
+        Create a batch of random patches, which can be rendered with
+        :py:meth:`render_batch`. Each row contains values for the non-overridden
+        parameters, in the same order as :py:meth:`get_patch`. The current patch
+        is restored afterwards.
+
+        This calls :py:meth:`randomize_patch` for each patch, inheriting classes
+        can override this to create patches more efficiently.
+
+        :param size: number of patches
+        :type size: int
+        :return: parameter values with shape (size, non-overridden parameters)
+        :rtype: np.ndarray
+        """
+
+        current = self.patch.copy()
+        patches = np.empty((size, len(current.free)))
+        try:
+            for i in range(size):
+                self.randomize_patch()
+                patches[i] = self.patch.values[self.patch.free]
+        finally:
+            self.patch = current
+            self.load_patch()
+
+        return patches
+
+
     def get_parameters(self):
         """
         Returns parameters for the synth
@@ -186,16 +282,10 @@ class SynthBase(ABC):
         :type skip_overridden: bool, optional
         """
 
-        if not skip_overridden:
-            return self.patch
-
-        patch = []
-        overridden_params = [p[0] for p in self.overridden_params]
-        for item in self.patch:
-            if not item[0] in overridden_params:
-                patch.append(item)
+        if self.patch is None:
+            return None
 
-        return patch
+        return self.patch.to_list(skip_overridden)
 
 
     def set_overridden_parameters(self, parameters):
@@ -238,14 +328,14 @@ class SynthBase(ABC):
 
         # Create a dictionary of parameters and settings for saving
         param_dict = {}
-        overridden_params = [p[0] for p in self.overridden_params]
+        overridden = self.patch.overridden.tolist()
 
-        for parameter in self.patch:
+        for parameter, is_overridden in zip(self.patch, overridden):
             param_dict[parameter[0]] = {
                 "id": parameter[0],
                 "desc": self.parameters[parameter[0]],
                 "value": float(parameter[1]),
-                "overridden": parameter[0] in overridden_params
+                "overridden": is_overridden
             }
 
         with open(fullpath, 'w') as file_handle:
@@ -266,6 +356,45 @@ class SynthBase(ABC):
         self.set_patch(patch)
 
 
+    def seed_random(self, seed):
+        """
+        Seed random number generators that belong to this synthesizer and are used
+        to create random patches. Synthesizers that use the global python or numpy
+        random number generators don't need to override this, since those are
+        seeded by the caller.
+
+        :param seed: seed for random patches, or None to stop using a seed
+        :type seed: int
+        """
+
+
+    @staticmethod
+    def from_factory(synth_factory, state_path=None):
+        """
+        Create a new synthesizer using a factory function and optionally load
+        a saved synth state into it. Used to create synthesizers in worker processes,
+        for synthesizers that cannot be pickled.
+
+        Args:
+            synth_factory (callable): Function that takes no arguments and returns
+                a new synthesizer that inherits from SynthBase
+            state_path (str, optional): Location of a synth state JSON file to load
+                into the new synthesizer, see :py:meth:`save_state`
+
+        Returns:
+            :class:`~spiegelib.synth.SynthBase`: new synthesizer
+        """
+
+        synth = synth_factory()
+        if not isinstance(synth, SynthBase):
+            raise TypeError('synth_factory must return an object that inherits from SynthBase')
+
+        if state_path is not None:
+            synth.load_state(state_path)
+
+        return synth
+
+
     @staticmethod
     def load_synth_config(path):
         """
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+Pool of synthesizer instances that are created up front and shared between
+threads. Creating a synthesizer such as :class:`~spiegelib.synth.SynthVST` loads
+a plugin, which is slow, so pooled synthesizers are reused for many renders.
+A synthesizer is checked out of the pool for exclusive use and is reset to its
+original state when it is checked back in.
+
+Plugins often leak memory, so synthesizers are recycled: a synthesizer is
+replaced with a new one from the factory once it has rendered a set number of
+patches, or once the memory used by this process has grown by a set amount
+while it was checked out.
+
+Example with four Dexed instances that are recycled every 10000 renders::
+
+    def make_dexed():
+        return spgl.synth.SynthVST('/Library/Audio/Plug-Ins/VST/Dexed.vst')
+
+    pool = spgl.synth.SynthPool(make_dexed, size=4, synth_state='./dexed.json',
+                                max_renders=10000)
+
+    with pool.checkout() as synth:
+        synth.set_patch(patch)
+        synth.render_patch()
+        audio = synth.get_audio()
+
+The sound match servers can use a synth pool so that requests running at the
+same time render with separate synthesizers, see
+:class:`~spiegelib.network.SoundMatchPool`.
+"""
+
+import os
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+from spiegelib.synth.synth_base import SynthBase
+
+
+class SynthPool():
+    """
+    Args:
+        synth_factory (callable): Function that takes no arguments and returns a new
+            synthesizer that inherits from :class:`~spiegelib.synth.SynthBase`
+        size (int, optional): Number of synthesizers in the pool. Defaults to 1.
+        synth_state (str, optional): Location of a synth state JSON file (see
+            :py:meth:`~spiegelib.synth.SynthBase.save_state`) that is loaded into each
+            synthesizer when it is created.
+        max_renders (int, optional): Number of patches a synthesizer can render
+            before it is replaced. Defaults to None, which never replaces synthesizers
+            based on renders.
+        max_memory_growth (int, optional): Number of bytes the resident memory of this
+            process can grow by while a synthesizer is checked out, summed over all
+            of its checkouts, before it is replaced. When synthesizers are used in
+            several threads at once, growth is attributed to every synthesizer that
+            was checked out. Defaults to None, which never replaces synthesizers
+            based on memory.
+
+    Attributes:
+        recycled (int): number of synthesizers that have been replaced
+    """
+
+    def __init__(self, synth_factory, size=1, synth_state=None, max_renders=None,
+                 max_memory_growth=None):
+        """
+        Constructor
+        """
+
+        if not callable(synth_factory):
+            raise TypeError('synth_factory must be callable')
+
+        if size < 1:
+            raise ValueError('size must be greater than zero, received %s' % size)
+
+        if max_renders is not None and max_renders < 1:
+            raise ValueError('max_renders must be greater than zero, received %s' % max_renders)
+
+        self.synth_factory = synth_factory
+        self.size = size
+        self.synth_state = synth_state
+        self.max_renders = max_renders
+        self.max_memory_growth = max_memory_growth
+        self.recycled = 0
+
+        self._idle = queue.Queue()
+        self._usage = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(size):
+            self._idle.put(self._create())
+
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Check out a synthesizer for use within a with statement. The synthesizer
+        is checked back in when the with statement is exited.
+
+        Args:
+            timeout (float, optional): Number of seconds to wait for a synthesizer
+                if they are all checked out. Defaults to None, which waits indefinitely.
+
+        Yields:
+            :class:`~spiegelib.synth.SynthBase`: synthesizer for exclusive use
+
+        Raises:
+            queue.Empty: if no synthesizer became available within the timeout
+        """
+
+        synth = self.acquire(timeout)
+        try:
+            yield synth
+        finally:
+            self.release(synth)
+
+
+    def acquire(self, timeout=None):
+        """
+        Check out a synthesizer. It must be returned with :py:meth:`release`.
+
+        Args:
+            timeout (float, optional): Number of seconds to wait for a synthesizer
+                if they are all checked out. Defaults to None, which waits indefinitely.
+
+        Returns:
+            :class:`~spiegelib.synth.SynthBase`: synthesizer for exclusive use
+
+        Raises:
+            queue.Empty: if no synthesizer became available within the timeout
+        """
+
+        if self._closed:
+            raise ValueError('SynthPool has been closed')
+
+        synth = self._idle.get(timeout=timeout)
+        self._usage[id(synth)]['checkout_memory'] = _resident_memory()
+        return synth
+
+
+    def release(self, synth):
+        """
+        Check in a synthesizer. The synthesizer is reset to its original state, or
+        replaced with a new synthesizer if it has reached the render or memory limit.
+        If the replacement can't be created, a warning is logged and the synthesizer
+        is reset and kept, so that the pool doesn't lose a synthesizer and errors
+        raised while it was checked out aren't hidden.
+
+        Args:
+            synth (:class:`~spiegelib.synth.SynthBase`): synthesizer returned by
+                :py:meth:`acquire`
+        """
+
+        usage = self._usage[id(synth)]
+        memory = _resident_memory()
+        if usage['checkout_memory'] is not None and memory is not None:
+            usage['memory_growth'] += memory - usage['checkout_memory']
+
+        replacement = None
+        if self._should_recycle(usage):
+            try:
+                replacement = self._create()
+            except Exception:
+                logging.warning('Unable to replace synthesizer, keeping the current one',
+                                exc_info=True)
+
+        if replacement is not None:
+            del self._usage[id(synth)]
+            with self._lock:
+                self.recycled += 1
+            synth = replacement
+        else:
+            self._reset(synth)
+
+        if not self._closed:
+            self._idle.put(synth)
+
+
+    @property
+    def available(self):
+        """
+        Number of synthesizers that are not checked out
+        """
+
+        return self._idle.qsize()
+
+
+    def renders(self, synth):
+        """
+        Args:
+            synth (:class:`~spiegelib.synth.SynthBase`): synthesizer from this pool
+
+        Returns:
+            int: number of patches rendered by a synthesizer since it was created
+        """
+
+        return self._usage[id(synth)]['renders']
+
+
+    def close(self):
+        """
+        Remove all synthesizers that are not checked out. Synthesizers that are
+        checked in after this are discarded.
+        """
+
+        self._closed = True
+        while True:
+            try:
+                synth = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._usage.pop(id(synth), None)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def _create(self):
+        """
+        Create a new synthesizer, record its original state, and count its renders
+        """
+
+        synth = SynthBase.from_factory(self.synth_factory, self.synth_state)
+        usage = {
+            'renders': 0,
+            'memory_growth': 0,
+            'checkout_memory': None,
+            'settings': {name: getattr(synth, name) for name in SynthPool._settings},
+            'patch': synth.patch.copy() if synth.patch is not None else None,
+            'overridden': list(synth.overridden_params)
+        }
+
+        # Count renders by wrapping the render methods of this instance
+        render_patch = synth.render_patch
+        render_batch = synth.render_batch
+
+        def counted_render_patch():
+            usage['renders'] += 1
+            return render_patch()
+
+        # The default render_batch calls render_patch for each patch, which
+        # must not be counted twice
+        def counted_render_batch(patches):
+            renders = usage['renders']
+            audio = render_batch(patches)
+            usage['renders'] = renders + len(patches)
+            return audio
+
+        synth.render_patch = counted_render_patch
+        synth.render_batch = counted_render_batch
+
+        self._usage[id(synth)] = usage
+        return synth
+
+
+    def _reset(self, synth):
+        """
+        Return a synthesizer to its original state
+        """
+
+        usage = self._usage[id(synth)]
+        for name, value in usage['settings'].items():
+            setattr(synth, name, value)
+
+        # The patch recorded when the synthesizer was created already has the
+        # synth state loaded, so the state file isn't read again
+        if usage['patch'] is not None:
+            synth.overridden_params = list(usage['overridden'])
+            synth.patch = usage['patch']
+            synth.load_patch()
+
+        synth.rendered_patch = False
+
+
+    def _should_recycle(self, usage):
+        if self.max_renders is not None and usage['renders'] >= self.max_renders:
+            return True
+
+        if self.max_memory_growth is not None and usage['memory_growth'] >= self.max_memory_growth:
+            return True
+
+        return False
+
+
+    # Render settings restored when a synthesizer is checked in
+    _settings = ('sample_rate', 'buffer_size', 'midi_note', 'midi_velocity',
+                 'note_length_secs', 'render_length_secs', 'clamp_params')
+
+
+
+def _resident_memory():
+    """
+    Resident memory of this process in bytes, or None if it can't be read
+    """
+
+    try:
+        with open('/proc/self/statm', 'r') as file_handle:
+            return int(file_handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+        # Peak resident memory, in kilobytes on Linux and bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if os.uname().sysname == 'Darwin' else usage * 1024
+    except (ImportError, AttributeError, OSError):
+        return None
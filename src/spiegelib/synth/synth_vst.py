@@ -32,6 +32,7 @@ class SynthVST(SynthBase):
         else:
             self.engine = None
             self.loaded_plugin = False
+            self.plugin_path = None
 
 
     def load_plugin(self, plugin_path):
@@ -46,6 +47,7 @@ class SynthVST(SynthBase):
 
             if self.engine.load_plugin(plugin_path):
                 self.loaded_plugin = True
+                self.plugin_path = plugin_path
                 self.generator = rm.PatchGenerator(self.engine)
                 self.patch = self.engine.get_patch()
                 self.parameters = parse_parameters(self.engine.get_plugin_parameters_description())
@@ -67,16 +69,20 @@ class SynthVST(SynthBase):
         """
 
         # Check for parameters to include in patch update
-        for param in self.patch:
-            if not self.is_valid_parameter_setting(param):
-                raise Exception(
-                    'Parameter %s is invalid. Must be a valid '
-                    'parameter number and be in range 0-1. '
-                    'Received %s' % param
-                )
+        patch = self.patch
+        valid = (np.isin(patch.indices, list(self.parameters))
+                 & (patch.values >= 0.0)
+                 & (patch.values <= 1.0))
+
+        if not valid.all():
+            raise Exception(
+                'Parameter %s is invalid. Must be a valid '
+                'parameter number and be in range 0-1. '
+                'Received %s' % patch[int(np.flatnonzero(~valid)[0])]
+            )
 
         # Patch VST with parameters
-        self.engine.set_patch(self.patch)
+        self.engine.set_patch(patch.to_list())
 
 
     def is_valid_parameter_setting(self, parameter):
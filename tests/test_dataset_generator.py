@@ -2,10 +2,261 @@
 Tests for Dataset Generator class
 """
 
+import functools
+import json
 import pytest
 import numpy as np
 from spiegelib import DatasetGenerator
+from spiegelib.features import FFT, StandardScaler
+from spiegelib.synth import NumpySynth
+
+import utils
+
+
+def failing_factory():
+    raise ValueError('Unable to load plugin')
+
 
 class TestDatasetGenerator():
 
-    pass
+    def test_generate(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, seed=1)
+
+        features = np.load(tmp_path / 'features.npy')
+        patches = np.load(tmp_path / 'patches.npy')
+        assert features.shape == (10, 2206)
+        assert patches.shape == (10, 2)
+
+
+    def test_generate_parallel(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, file_prefix='a_', workers=2, seed=1)
+        generator.generate(10, file_prefix='b_', workers=2, seed=1)
+
+        features = np.load(tmp_path / 'a_features.npy')
+        patches = np.load(tmp_path / 'a_patches.npy')
+        assert features.shape == (10, 2206)
+        assert patches.shape == (10, 2)
+
+        # Same seed and number of workers should reproduce the dataset
+        np.testing.assert_array_equal(patches, np.load(tmp_path / 'b_patches.npy'))
+        np.testing.assert_array_equal(features, np.load(tmp_path / 'b_features.npy'))
+
+        # Each worker should create different patches
+        assert not np.array_equal(patches[0], patches[5])
+
+
+    def test_generate_parallel_factory(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        factory = functools.partial(utils.SineSynth, render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path,
+                                     synth_factory=factory)
+        generator.generate(5, workers=3)
+
+        features = np.load(tmp_path / 'features.npy')
+        assert features.shape == (5, 2206)
+
+
+    def test_invalid_factory(self, tmp_path):
+        synth = utils.SineSynth()
+        with pytest.raises(TypeError):
+            DatasetGenerator(synth, FFT(), output_folder=tmp_path, synth_factory='synth')
+
+
+    def test_failing_factory(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+
+        # Errors creating synths in workers are raised instead of restarting workers
+        generator = DatasetGenerator(synth, FFT(), output_folder=tmp_path,
+                                     synth_factory=failing_factory)
+        with pytest.raises(ValueError):
+            generator.generate(4, workers=2)
+
+        generator.synth_factory = functools.partial(dict)
+        with pytest.raises(TypeError):
+            generator.generate(4, workers=2)
+
+
+    def test_generate_stream(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, file_prefix='a_', seed=1, chunk_size=3)
+        generator.generate(10, file_prefix='b_', seed=1, chunk_size=3, workers=2)
+
+        features = np.load(tmp_path / 'a_features.npy')
+        patches = np.load(tmp_path / 'a_patches.npy')
+        assert features.shape == (10, 2206)
+        assert patches.shape == (10, 2)
+
+        # Chunks are seeded independently of the number of workers
+        np.testing.assert_array_equal(patches, np.load(tmp_path / 'b_patches.npy'))
+        np.testing.assert_array_equal(features, np.load(tmp_path / 'b_features.npy'))
+
+
+    def test_generate_stream_scale(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude', scale_axis=0),
+                                     output_folder=tmp_path, scale=True)
+        generator.generate(10, chunk_size=4)
+
+        features = np.load(tmp_path / 'features.npy')
+        assert generator.features.has_scaler()
+        np.testing.assert_array_almost_equal(features.mean(0), np.zeros(2206), decimal=5)
+
+
+    def test_generate_stream_scale_matches_memory(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude', scale_axis=0),
+                                     output_folder=tmp_path, scale=True)
+        generator.generate(10, file_prefix='scaled_', seed=1, chunk_size=3)
+
+        generator.should_scale = False
+        generator.generate(10, file_prefix='raw_', seed=1, chunk_size=3)
+
+        # Scaler fit one chunk at a time matches fitting on the whole dataset
+        expected = StandardScaler().fit_transform(np.load(tmp_path / 'raw_features.npy'), 0)
+        np.testing.assert_allclose(np.load(tmp_path / 'scaled_features.npy'), expected,
+                                   rtol=1e-4, atol=1e-4)
+
+
+    def test_generate_parallel_synth_seed(self, tmp_path):
+
+        # Synths with their own random number generator are reseeded for each chunk
+        def generate(prefix, workers, seed):
+            generator = DatasetGenerator(NumpySynth(seed=1, render_length_secs=0.1),
+                                         FFT(output='magnitude'), output_folder=tmp_path)
+            generator.generate(8, file_prefix=prefix, workers=workers, chunk_size=4,
+                               seed=seed)
+            return np.load(tmp_path / ('%spatches.npy' % prefix))
+
+        patches = generate('a_', 2, 3)
+        assert not np.allclose(patches[:4], patches[4:])
+        np.testing.assert_array_equal(patches, generate('b_', 2, 3))
+        np.testing.assert_array_equal(patches, generate('c_', 1, 3))
+        assert not np.allclose(patches, generate('d_', 2, 4))
+
+        # Workers render different patches without a seed
+        patches = generate('e_', 2, None)
+        assert not np.allclose(patches[:4], patches[4:])
+
+
+    def test_default_chunks(self):
+        chunks = DatasetGenerator._get_chunks(5000, 2, None, 1, False, None, 64, 1024)
+        assert len(chunks) == 5
+        assert max(c[1] - c[0] for c in chunks) <= 1024
+        assert chunks[-1][1] == 5000
+
+        chunks = DatasetGenerator._get_chunks(10, 3, None, 1, False, None, 64, 1024)
+        assert len(chunks) == 3
+
+
+    def test_invalid_chunk_size(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(), output_folder=tmp_path)
+        with pytest.raises(ValueError):
+            generator.generate(10, chunk_size=0)
+
+
+    def test_generate_resume(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, file_prefix='a_', seed=1, chunk_size=3)
+
+        # Interrupt generation partway through the second chunk
+        class FailingSynth(utils.SineSynth):
+            renders = 0
+            def render_patch(self):
+                FailingSynth.renders += 1
+                if FailingSynth.renders > 6:
+                    raise RuntimeError('Synth crashed')
+                super().render_patch()
+
+        generator.synth = FailingSynth(render_length_secs=0.1)
+        with pytest.raises(RuntimeError):
+            generator.generate(10, file_prefix='b_', seed=1, chunk_size=3)
+
+        with open(tmp_path / 'b_manifest.json') as file_handle:
+            manifest = json.load(file_handle)
+        assert manifest['chunks'] == [[0, 3]]
+        assert not manifest['complete']
+
+        # Resume with a new synth, the seed is loaded from the manifest
+        generator.synth = synth
+        generator.generate(10, file_prefix='b_', chunk_size=3, resume=True)
+
+        np.testing.assert_array_equal(np.load(tmp_path / 'a_patches.npy'),
+                                      np.load(tmp_path / 'b_patches.npy'))
+        np.testing.assert_array_equal(np.load(tmp_path / 'a_features.npy'),
+                                      np.load(tmp_path / 'b_features.npy'))
+
+        with open(tmp_path / 'b_manifest.json') as file_handle:
+            assert json.load(file_handle)['complete']
+
+
+    def test_resume_without_seed(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, file_prefix='a_', chunk_size=3)
+
+        with open(tmp_path / 'a_manifest.json') as file_handle:
+            seed = json.load(file_handle)['seed']
+        assert seed is not None
+
+        # A dataset generated with the recorded seed matches
+        generator.generate(10, file_prefix='b_', seed=seed, chunk_size=3)
+        np.testing.assert_array_equal(np.load(tmp_path / 'a_patches.npy'),
+                                      np.load(tmp_path / 'b_patches.npy'))
+
+
+    def test_resume_scaling(self, tmp_path, monkeypatch):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude', scale_axis=0),
+                                     output_folder=tmp_path, scale=True)
+        generator.generate(10, file_prefix='a_', seed=1, chunk_size=3)
+        expected = np.load(tmp_path / 'a_features.npy')
+
+        # Interrupt the scaling pass after the second chunk has been scaled
+        features = FFT(output='magnitude', scale_axis=0)
+        generator = DatasetGenerator(synth, features, output_folder=tmp_path, scale=True)
+        scale = features.scale
+        calls = []
+        def failing_scale(data):
+            calls.append(len(data))
+            if len(calls) > 2:
+                raise RuntimeError('Interrupted')
+            return scale(data)
+
+        monkeypatch.setattr(features, 'scale', failing_scale)
+        with pytest.raises(RuntimeError):
+            generator.generate(10, file_prefix='b_', seed=1, chunk_size=3)
+
+        with open(tmp_path / 'b_manifest.json') as file_handle:
+            manifest = json.load(file_handle)
+        assert manifest['scaler']
+        assert manifest['scaled'] == [[0, 3], [3, 6]]
+        assert not manifest['complete']
+
+        # Resume in a new generator, the saved scaler is used and scaled chunks are skipped
+        generator = DatasetGenerator(synth, FFT(output='magnitude', scale_axis=0),
+                                     output_folder=tmp_path, scale=True)
+        generator.generate(10, file_prefix='b_', chunk_size=3, resume=True)
+        assert generator.features.has_scaler()
+        np.testing.assert_allclose(np.load(tmp_path / 'b_features.npy'), expected)
+
+        with open(tmp_path / 'b_manifest.json') as file_handle:
+            assert json.load(file_handle)['complete']
+
+
+    def test_resume_mismatch(self, tmp_path):
+        synth = utils.SineSynth(render_length_secs=0.1)
+        generator = DatasetGenerator(synth, FFT(output='magnitude'), output_folder=tmp_path)
+        generator.generate(10, chunk_size=3)
+
+        with pytest.raises(ValueError):
+            generator.generate(12, chunk_size=3, resume=True)
+
+        with pytest.raises(ValueError):
+            generator.generate(10, resume=True)
@@ -0,0 +1,93 @@
+"""
+Tests for EvaluationPool class
+"""
+
+import functools
+import random
+import pytest
+import numpy as np
+
+from spiegelib import AudioBuffer
+from spiegelib.estimator import BasicGA, NSGA3, EvaluationPool
+from spiegelib.features import FFT, MFCC
+
+import utils
+
+
+def failing_factory():
+    raise ValueError('Unable to load plugin')
+
+
+class TestEvaluationPool():
+
+    def test_map(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        features = FFT(output='magnitude')
+        target = features(AudioBuffer(utils.make_test_sine(4410, 440), 44100))
+        individuals = [[random.random(), random.random()] for i in range(7)]
+
+        with EvaluationPool(features, workers=3, synth=synth) as pool:
+            results = pool.map(BasicGA.evaluate_fitness, target, individuals)
+
+        expected = [BasicGA.evaluate_fitness(synth, features, target, individual)
+                    for individual in individuals]
+        assert results == expected
+        assert pool.pool is None
+
+
+    def test_map_factory(self):
+
+        factory = functools.partial(utils.SineSynth, render_length_secs=0.1)
+        features = [FFT(output='magnitude'), MFCC()]
+        audio = AudioBuffer(utils.make_test_sine(4410, 440), 44100)
+        target = [f(audio) for f in features]
+
+        pool = EvaluationPool(features, workers=2, synth_factory=factory)
+        results = pool.map(NSGA3.evaluate_fitness, target, [[0.5, 0.5], [0.1, 0.9]])
+        pool.close()
+
+        assert len(results) == 2
+        assert len(results[0]) == 2
+        assert pool.map(NSGA3.evaluate_fitness, target, []) == []
+
+
+    def test_failing_factory(self):
+
+        audio = AudioBuffer(utils.make_test_sine(4410, 440), 44100)
+
+        # Errors creating synths in workers are raised instead of restarting workers
+        with BasicGA(utils.SineSynth(), MFCC(), pop_size=4, ngen=1, workers=2,
+                     synth_factory=failing_factory) as ga:
+            with pytest.raises(ValueError):
+                ga.predict(audio)
+
+        features = [FFT(output='magnitude'), MFCC()]
+        with NSGA3(utils.SineSynth(), features, pop_size=4, ngen=1, workers=2,
+                   synth_factory=functools.partial(dict)) as ga:
+            with pytest.raises(TypeError):
+                ga.predict(audio)
+
+
+    def test_invalid_construction(self):
+
+        with pytest.raises(ValueError):
+            EvaluationPool(FFT())
+
+        with pytest.raises(TypeError):
+            EvaluationPool(FFT(), synth_factory='synth')
+
+
+    def test_basic_ga_parallel(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        audio = AudioBuffer(utils.make_test_sine(4410, 440), 44100)
+
+        serial = BasicGA(synth, MFCC(), seed=1, pop_size=10, ngen=2)
+        expected = serial.predict(audio)
+
+        with BasicGA(synth, MFCC(), seed=1, pop_size=10, ngen=2, workers=2) as parallel:
+            result = parallel.predict(audio)
+
+        assert result == expected
+        assert parallel.evaluation_pool.pool is None
@@ -0,0 +1,224 @@
+"""
+Tests for FeatureCache class
+"""
+
+import os
+import pickle
+import functools
+import pytest
+import numpy as np
+import scipy.io.wavfile
+
+from spiegelib import AudioBuffer, SoundMatch
+from spiegelib.features import FeatureCache, FFT, MFCC, StandardScaler
+
+import utils
+
+
+def double(features):
+    return features * 2.0
+
+
+def multiply(features, factor):
+    return features * factor
+
+
+def make_multiplier(factor):
+    def multiplier(features):
+        return features * factor
+    return multiplier
+
+
+class Multiplier():
+
+    __slots__ = ()
+
+    def __call__(self, features):
+        return features * 2.0
+
+
+class TestFeatureCache():
+
+    def test_call(self, tmp_path):
+
+        cache = FeatureCache(tmp_path)
+        fft = FFT(output='magnitude')
+        fft.set_cache(cache)
+
+        audio = AudioBuffer(utils.make_test_sine(1024, 440), 44100)
+        expected = FFT(output='magnitude')(audio)
+
+        first = fft(audio)
+        second = fft(audio)
+        assert np.array_equal(first, expected)
+        assert np.array_equal(second, expected)
+        assert second.dtype == expected.dtype
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+        report = cache.report()
+        assert report['hit_rate'] == 0.5
+        assert report['entries'] == 1
+        assert report['size'] > expected.nbytes
+
+        # Different audio is a miss
+        fft(AudioBuffer(utils.make_test_sine(1024, 880), 44100))
+        assert cache.misses == 2
+
+    def test_settings_change_key(self, tmp_path):
+
+        cache = FeatureCache(tmp_path)
+        audio = AudioBuffer(utils.make_test_sine(2048, 440), 44100)
+
+        mfcc = MFCC(num_mfccs=13)
+        keys = set([cache.key(mfcc, audio, False)])
+        keys.add(cache.key(MFCC(num_mfccs=20), audio, False))
+        keys.add(cache.key(FFT(), audio, False))
+
+        mfcc.add_modifier(double, 'output')
+        keys.add(cache.key(mfcc, audio, False))
+
+        mfcc.set_scaler(StandardScaler())
+        mfcc.scaler.fit(np.random.rand(5, 13, 3))
+        keys.add(cache.key(mfcc, audio, True))
+        mfcc.scaler.fit(np.random.rand(5, 13, 3))
+        keys.add(cache.key(mfcc, audio, True))
+
+        assert len(keys) == 6
+
+        # Same settings on a new object share a key
+        assert cache.key(MFCC(num_mfccs=20), audio, False) in keys
+
+    def test_modifier_keys(self, tmp_path):
+
+        cache = FeatureCache(tmp_path)
+        audio = AudioBuffer(utils.make_test_sine(2048, 440), 44100)
+
+        def key(modifier):
+            fft = FFT()
+            fft.add_modifier(modifier, 'output')
+            return cache.key(fft, audio, False)
+
+        # Modifiers with the same name but different arguments, code, or
+        # closure values have different keys
+        keys = [
+            key(functools.partial(multiply, factor=2.0)),
+            key(functools.partial(multiply, factor=3.0)),
+            key(lambda features: features * 2.0),
+            key(lambda features: features * 3.0),
+            key(make_multiplier(2.0)),
+            key(make_multiplier(3.0)),
+        ]
+        assert len(set(keys)) == len(keys)
+
+        # Equivalent modifiers share a key
+        assert key(functools.partial(multiply, factor=2.0)) == keys[0]
+        assert key(make_multiplier(3.0)) == keys[5]
+
+        # Cached results aren't shared between modifiers
+        fft = FFT()
+        fft.set_cache(cache)
+        fft.add_modifier(make_multiplier(2.0), 'output')
+        first = fft(audio)
+        fft.output_modifiers = [make_multiplier(3.0)]
+        assert np.allclose(fft(audio), first * 1.5)
+        assert cache.misses == 2
+
+    def test_unkeyable_modifier(self, tmp_path):
+
+        cache = FeatureCache(tmp_path)
+        audio = AudioBuffer(utils.make_test_sine(1024, 440), 44100)
+        fft = FFT()
+        fft.set_cache(cache)
+        fft.add_modifier(Multiplier(), 'output')
+
+        # Modifiers that can only be identified by their address aren't cached
+        assert cache.key(fft, audio, False) is None
+        assert np.array_equal(fft(audio), FFT()(audio) * 2.0)
+        assert len(cache) == 0
+        assert cache.hits == 0 and cache.misses == 0
+
+    def test_persistence_and_eviction(self, tmp_path):
+
+        features = [np.full(100, i, dtype=np.float32) for i in range(4)]
+
+        # Size of a .npy file for each array, including the header
+        cache = FeatureCache(tmp_path / 'size')
+        cache.put('00', features[0])
+        max_size = 3 * cache.report()['size']
+
+        cache = FeatureCache(tmp_path / 'cache', max_size=max_size)
+
+        for i, item in enumerate(features):
+            cache.put('%02d' % i, item)
+            if i == 1:
+                # Make the first entry the most recently used
+                assert np.array_equal(cache.get('00'), features[0])
+
+        # Least recently used entry was removed
+        assert len(cache) == 3
+        assert cache.get('01') is None
+        assert os.path.exists(os.path.join(tmp_path, 'cache', '00', '00.npy'))
+
+        # Entries are loaded from the folder by a new cache
+        cache = FeatureCache(tmp_path / 'cache', max_size=max_size)
+        assert len(cache) == 3
+        assert np.array_equal(cache.get('03'), features[3])
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.report()['size'] == 0
+        assert cache.get('03') is None
+
+    def test_from_file(self, tmp_path):
+
+        path = str(tmp_path / 'sine.wav')
+        samples = utils.make_test_sine(2048, 440).astype(np.float32)
+        scipy.io.wavfile.write(path, 44100, samples)
+
+        cache = FeatureCache(tmp_path / 'cache')
+        mfcc = MFCC()
+        mfcc.set_cache(cache)
+
+        expected = MFCC()(AudioBuffer(path, 44100))
+        assert np.allclose(mfcc.from_file(path), expected)
+        assert np.allclose(mfcc.from_file(path), expected)
+        assert cache.hits == 1
+
+        # Modifying the file changes the key
+        scipy.io.wavfile.write(path, 44100, samples[:1024])
+        os.utime(path, ns=(0, 0))
+        assert mfcc.from_file(path).shape != expected.shape
+        assert cache.misses == 2
+
+    def test_match_from_file(self, tmp_path):
+
+        path = str(tmp_path / 'sine.wav')
+        samples = utils.make_test_sine(2048, 440).astype(np.float32)
+        scipy.io.wavfile.write(path, 44100, samples)
+
+        mfcc = MFCC()
+        mfcc.set_cache(FeatureCache(tmp_path / 'cache'))
+        matcher = SoundMatch(utils.SineSynth(), utils.ConstantEstimator(), features=mfcc)
+
+        first = matcher.match_from_file(path)
+        second = matcher.match_from_file(path)
+        assert np.array_equal(first.get_audio(), second.get_audio())
+        assert matcher.get_patch() == [(0, 0.25), (1, 0.75)]
+        assert mfcc.cache.hits == 1
+
+    def test_pickle(self, tmp_path):
+
+        fft = FFT()
+        fft.set_cache(FeatureCache(tmp_path))
+        audio = AudioBuffer(utils.make_test_sine(1024, 440), 44100)
+        fft(audio)
+
+        copy = pickle.loads(pickle.dumps(fft))
+        copy(audio)
+        assert copy.cache.hits == 1
+
+    def test_invalid_size(self, tmp_path):
+
+        with pytest.raises(ValueError):
+            FeatureCache(tmp_path, max_size=0)
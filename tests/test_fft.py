@@ -154,3 +154,53 @@ class TestFFT():
         assert fft.scaler.mean.shape == (2,)
         assert fft.scaler.mean[0] == pytest.approx(expected_mean)
         assert scaled.shape == feature_batch.shape
+
+
+    def test_batch_extraction(self):
+
+        bin_freq = 44100. / 1024.
+        audio = [AudioBuffer(utils.make_test_cosine(1024, bin_freq*(i+1), 44100), 44100)
+                 for i in range(5)]
+        fft = FFT(output='magnitude_phase')
+        features = fft.batch(audio)
+
+        assert features.shape == (5,513,2)
+        assert features.dtype == np.float32
+        for i in range(5):
+            np.testing.assert_array_almost_equal(features[i], fft(audio[i]), decimal=4)
+
+        # Batch can also be a 2D array
+        samples = np.stack([a.get_audio() for a in audio])
+        np.testing.assert_array_equal(fft.batch(samples), features)
+
+
+    def test_batch_extraction_scale(self):
+
+        bin_freq = 44100. / 1024.
+        audio = [AudioBuffer(utils.make_test_cosine(1024, bin_freq*(i+1), 44100), 44100)
+                 for i in range(5)]
+        fft = FFT(output='magnitude', scale_axis=0)
+        fft.add_modifier(lambda x: x * 2.0, 'prescale')
+        features = fft.batch(audio)
+        fft.fit_scaler(features)
+
+        scaled = fft.batch(audio, scale=True)
+        assert scaled.shape == (5,513)
+        for i in range(5):
+            np.testing.assert_array_almost_equal(scaled[i], fft(audio[i], scale=True), decimal=4)
+
+
+    def test_batch_invalid(self):
+
+        fft = FFT()
+        with pytest.raises(ValueError):
+            fft.batch([])
+
+        with pytest.raises(ValueError):
+            fft.batch([AudioBuffer(np.zeros(1024), 44100), AudioBuffer(np.zeros(512), 44100)])
+
+        with pytest.raises(ValueError):
+            fft.batch([AudioBuffer(np.zeros(1024), 22050)])
+
+        with pytest.raises(ValueError):
+            fft.batch(np.zeros(1024))
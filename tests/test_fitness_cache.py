@@ -0,0 +1,100 @@
+"""
+Tests for FitnessCache class
+"""
+
+import pytest
+import numpy as np
+
+from spiegelib import AudioBuffer
+from spiegelib.estimator import BasicGA, NSGA3, FitnessCache
+from spiegelib.features import FFT, MFCC
+
+import utils
+
+class TestFitnessCache():
+
+    def test_map(self):
+
+        cache = FitnessCache(max_size=10, resolution=1e-3)
+        cache.set_target(np.zeros(4))
+        evaluated = []
+
+        def evaluate(individuals):
+            evaluated.extend(individuals)
+            return [(sum(individual),) for individual in individuals]
+
+        results = cache.map(evaluate, [[0.1, 0.2], [0.3, 0.4], [0.1, 0.2]])
+        assert results == [(0.1 + 0.2,), (0.3 + 0.4,), (0.1 + 0.2,)]
+        assert evaluated == [[0.1, 0.2], [0.3, 0.4]]
+        assert cache.hits == 1
+        assert cache.misses == 2
+
+        # Values within the resolution share a key
+        results = cache.map(evaluate, [[0.1001, 0.2], [0.5, 0.5]])
+        assert results[0] == (0.1 + 0.2,)
+        assert len(evaluated) == 3
+        assert cache.hits == 2
+        assert cache.misses == 3
+
+        # A different target does not reuse values
+        cache.set_target(np.ones(4))
+        cache.map(evaluate, [[0.1, 0.2]])
+        assert len(evaluated) == 4
+        assert len(cache) == 4
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 0 and cache.misses == 0
+
+
+    def test_eviction(self):
+
+        cache = FitnessCache(max_size=2)
+        evaluate = lambda individuals: [(individual[0],) for individual in individuals]
+
+        cache.map(evaluate, [[0.1], [0.2]])
+        cache.map(evaluate, [[0.1]])
+        cache.map(evaluate, [[0.3]])
+        assert len(cache) == 2
+
+        # Least recently used value was removed
+        cache.map(evaluate, [[0.1], [0.2]])
+        assert cache.misses == 4
+
+
+    def test_invalid_construction(self):
+
+        with pytest.raises(ValueError):
+            FitnessCache(max_size=0)
+
+        with pytest.raises(ValueError):
+            FitnessCache(resolution=0)
+
+
+    def test_basic_ga_cache(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        audio = AudioBuffer(utils.make_test_sine(4410, 440), 44100)
+
+        expected = BasicGA(synth, MFCC(), seed=1, pop_size=10, ngen=2).predict(audio)
+
+        ga = BasicGA(synth, MFCC(), seed=1, pop_size=10, ngen=2, cache_size=1000)
+        assert ga.predict(audio) == expected
+        assert ga.fitness_cache.misses > 0
+
+        # Repeating a prediction for the same target reuses fitness values
+        misses = ga.fitness_cache.misses
+        hits = ga.fitness_cache.hits
+        ga.predict(audio)
+        assert ga.fitness_cache.hits > hits
+        assert ga.fitness_cache.misses - misses < misses
+
+
+    def test_nsga3_cache(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        audio = AudioBuffer(utils.make_test_sine(4410, 440), 44100)
+
+        ga = NSGA3(synth, [FFT(output='magnitude'), MFCC()], seed=1, pop_size=8, ngen=2, cache_size=1000)
+        ga.predict(audio)
+        assert ga.fitness_cache.hits + ga.fitness_cache.misses > 0
@@ -74,3 +74,15 @@ class TestMFCC():
         assert scaled.std() == pytest.approx(1.)
         np.testing.assert_array_almost_equal(scaled.mean((0,1)), np.zeros(13))
         np.testing.assert_array_almost_equal(scaled.std((0,1)), np.ones(13))
+
+
+    def test_batch_extraction(self):
+
+        audio = [AudioBuffer(utils.make_test_sine(4096, 100 + (50 * i), 44100), 44100)
+                 for i in range(4)]
+        mfcc = MFCC(13, hop_size=512, frame_size=1024, time_major=True)
+        features = mfcc.batch(audio)
+
+        assert features.shape == (4,9,13)
+        for i in range(4):
+            np.testing.assert_allclose(features[i], mfcc(audio[i]), rtol=1e-4, atol=1e-3)
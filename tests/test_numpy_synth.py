@@ -0,0 +1,93 @@
+"""
+Tests for NumpySynth class
+"""
+
+import pytest
+import numpy as np
+
+from spiegelib.synth import NumpySynth
+
+
+class TestNumpySynth():
+
+    def test_construction(self):
+
+        synth = NumpySynth(num_params=12)
+        assert len(synth.get_parameters()) == 12
+        assert len(synth.get_patch()) == 12
+        assert synth.get_parameters()[8] == 'Harmonic 2'
+
+        with pytest.raises(ValueError):
+            NumpySynth(num_params=4)
+
+    def test_render(self):
+
+        synth = NumpySynth(render_length_secs=0.5)
+        synth.render_patch()
+        audio = synth.get_audio()
+        samples = audio.get_audio()
+
+        assert audio.get_sample_rate() == 44100
+        assert samples.shape == (22050,)
+        assert samples.dtype == np.float32
+        assert np.abs(samples).max() <= 1.0
+        assert np.abs(samples).max() > 0.1
+
+        # Rendering is deterministic
+        synth.render_patch()
+        assert np.array_equal(synth.get_audio().get_audio(), samples)
+
+        # Parameters change the audio
+        synth.set_patch([(3, 0.2)])
+        synth.render_patch()
+        assert not np.allclose(synth.get_audio().get_audio(), samples)
+
+    def test_get_audio_before_render(self):
+
+        synth = NumpySynth()
+        with pytest.raises(Exception):
+            synth.get_audio()
+
+    def test_random_seed(self):
+
+        first = NumpySynth(seed=1, render_length_secs=0.1).get_random_example()
+        second = NumpySynth(seed=1, render_length_secs=0.1).get_random_example()
+        assert np.array_equal(first.get_audio(), second.get_audio())
+
+    def test_render_batch(self):
+
+        synth = NumpySynth(num_params=10, render_length_secs=0.25, note_length_secs=0.1)
+        synth.block_size = 2
+        patches = np.random.uniform(size=(5, 10))
+        patch = synth.get_patch()
+
+        batch = synth.render_batch(patches)
+        assert batch.shape == (5, 11025)
+        assert batch.dtype == np.float32
+        assert synth.get_patch() == patch
+
+        for i in range(len(patches)):
+            synth.set_patch(patches[i])
+            synth.render_patch()
+            assert np.allclose(batch[i], synth.get_audio().get_audio(), atol=1e-6)
+
+    def test_render_batch_overridden(self):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        synth.set_overridden_parameters([(0, 0.75)])
+
+        # Rows can have values for free parameters or all parameters
+        free = synth.render_batch(np.full((2, 7), 0.5))
+        full = synth.render_batch(np.full((2, 8), 0.5))
+        assert np.array_equal(free, full)
+
+        synth.set_patch([0.5] * 7)
+        synth.render_patch()
+        assert np.allclose(free[0], synth.get_audio().get_audio(), atol=1e-6)
+
+        # Values are clamped
+        clamped = synth.render_batch(np.full((1, 7), 2.0))
+        assert np.array_equal(clamped, synth.render_batch(np.full((1, 7), 1.0)))
+
+        with pytest.raises(ValueError):
+            synth.render_batch(np.zeros((1, 3)))
@@ -0,0 +1,215 @@
+"""
+Tests for OSC message parsing and building
+"""
+
+import struct
+import pytest
+import numpy as np
+
+from spiegelib.network.osc import OscMessage, OscMessageBuilder
+from spiegelib.network.osc import OscBundle, OscBundleBuilder
+from spiegelib.network.osc import osc_types
+from spiegelib.network.osc.osc_message import ParseError
+from spiegelib.network.osc import osc_bundle
+
+
+class TestOsc():
+
+    def test_parse_message(self):
+
+        builder = OscMessageBuilder('/test')
+        args = ['abcd', '', 1, 2, 3, 0.5, 0.25, b'\x01\x02\x03', True, False, 'end', 7, 1.5]
+        for arg in args:
+            builder.add_arg(arg)
+        builder.add_arg(2.5, 'd')
+        builder.add_arg(3.5, 'd')
+        builder.add_arg([1.0, 2.0, [3, 4]])
+
+        message = OscMessage(builder.build().dgram)
+        assert message.address == '/test'
+        assert message.params == args + [2.5, 3.5, [1.0, 2.0, [3, 4]]]
+
+        # Parsing works on any bytes-like object
+        assert OscMessage(memoryview(builder.build().dgram)).params == message.params
+        assert OscMessage(bytearray(builder.build().dgram)).params == message.params
+
+
+    def test_parse_many_floats(self):
+
+        values = [float(v) for v in np.random.rand(1000).astype(np.float32)]
+        builder = OscMessageBuilder('/floats')
+        for value in values:
+            builder.add_arg(value)
+
+        assert OscMessage(builder.build().dgram).params == values
+
+
+    def test_parse_short_float(self):
+
+        # Some clients leave off trailing zeros of the last float
+        dgram = osc_types.write_string('/short') + osc_types.write_string(',ff')
+        dgram += struct.pack('>f', 1.0) + struct.pack('>f', 2.0)[:2]
+        assert OscMessage(dgram).params == [1.0, 2.0]
+
+
+    def test_parse_no_params(self):
+
+        message = OscMessage(osc_types.write_string('/address'))
+        assert message.address == '/address'
+        assert message.params == []
+
+
+    def test_parse_errors(self):
+
+        with pytest.raises(ParseError):
+            OscMessage(b'/address')
+
+        dgram = osc_types.write_string('/test') + osc_types.write_string(',i') + b'\x00'
+        with pytest.raises(ParseError):
+            OscMessage(dgram)
+
+        dgram = osc_types.write_string('/test') + osc_types.write_string(',b')
+        with pytest.raises(ParseError):
+            OscMessage(dgram + osc_types.write_int(16) + b'\x00' * 4)
+
+
+    def test_get_string(self):
+
+        assert osc_types.get_string(b'abc\x00', 0) == ('abc', 4)
+        assert osc_types.get_string(b'abcd\x00\x00\x00\x00', 0) == ('abcd', 8)
+        assert osc_types.get_string(b'\x00\x00\x00\x00ab\x00\x00', 4) == ('ab', 8)
+
+        with pytest.raises(osc_types.ParseError):
+            osc_types.get_string(b'abcd\x00', 0)
+
+        with pytest.raises(osc_types.ParseError):
+            osc_types.get_string(b'abc\x00', -1)
+
+
+def reference_build(builder):
+    """
+    Builds a datagram one argument at a time, the way OscMessageBuilder.build
+    did before numeric arguments were packed in bulk
+    """
+
+    dgram = osc_types.write_string(builder.address)
+    if not builder.args:
+        return dgram + osc_types.write_string(',')
+
+    dgram += osc_types.write_string(',' + ''.join([arg[0] for arg in builder.args]))
+    writers = {'s': osc_types.write_string, 'i': osc_types.write_int,
+               'f': osc_types.write_float, 'd': osc_types.write_double,
+               'b': osc_types.write_blob, 'r': osc_types.write_rgba,
+               'm': osc_types.write_midi}
+    for arg_type, value in builder.args:
+        if arg_type in writers:
+            dgram += writers[arg_type](value)
+    return dgram
+
+
+class TestOscMessageBuilder():
+
+    def test_build_equality(self):
+
+        builder = OscMessageBuilder('/test')
+        for arg in ['abcd', '', 1, 2, -3, 0.5, 0.1, 1e20, b'\x01\x02\x03', True, None,
+                    'end', 7, 1.5, (1, 144, 60, 100), [1.0, 2, [3, 'x']]]:
+            builder.add_arg(arg)
+        builder.add_arg(2.5, 'd')
+        builder.add_arg(0.1, 'd')
+        builder.add_arg(255, 'r')
+
+        assert builder.build().dgram == reference_build(builder)
+
+        empty = OscMessageBuilder('/empty')
+        assert empty.build().dgram == reference_build(empty)
+
+
+    def test_add_array(self):
+
+        for arg_type, values in [('f', np.random.rand(1000)),
+                                 ('d', np.random.rand(10)),
+                                 ('i', np.arange(-5, 5))]:
+            builder = OscMessageBuilder('/array')
+            builder.add_arg('before')
+            builder.add_array(values, arg_type)
+            builder.add_arg(1)
+
+            reference = OscMessageBuilder('/array')
+            reference.add_arg('before')
+            reference.add_arg([v.item() for v in values], [arg_type] * len(values))
+            reference.add_arg(1)
+
+            assert builder.build().dgram == reference.build().dgram
+            assert builder.build().dgram == reference_build(reference)
+
+        builder = OscMessageBuilder('/array')
+        builder.add_array([])
+        assert OscMessage(builder.build().dgram).params == [[]]
+
+
+    def test_add_array_short(self):
+
+        # Arrays with one or no values next to single numbers of the same type
+        for arg_type, value in [('f', 0.5), ('d', 0.25), ('i', 3)]:
+            for values in [[value], []]:
+                builder = OscMessageBuilder('/array')
+                builder.add_arg(value, arg_type)
+                builder.add_array(values, arg_type)
+                builder.add_arg(value, arg_type)
+
+                reference = OscMessageBuilder('/array')
+                reference.add_arg(value, arg_type)
+                reference.add_arg(list(values), [arg_type] * len(values))
+                reference.add_arg(value, arg_type)
+
+                assert builder.build().dgram == reference_build(reference)
+                assert OscMessage(builder.build().dgram).params == [value, values, value]
+
+
+    def test_add_array_errors(self):
+
+        builder = OscMessageBuilder('/array')
+        with pytest.raises(ValueError):
+            builder.add_array([1, 2], 's')
+
+        with pytest.raises(ValueError):
+            builder.add_array(np.zeros((2, 2)))
+
+
+class TestOscBundle():
+
+    def test_build_and_parse(self):
+
+        first = OscMessageBuilder('/first')
+        first.add_arg(1)
+        second = OscMessageBuilder('/second')
+        second.add_arg('two')
+        second.add_array(np.arange(3, dtype=np.float32))
+
+        inner = OscBundleBuilder()
+        inner.add_content(second.build())
+
+        builder = OscBundleBuilder(1000.5)
+        builder.add_content(first.build())
+        builder.add_content(inner.build())
+        bundle = OscBundle(builder.build().dgram)
+
+        assert bundle.timestamp == pytest.approx(1000.5)
+        assert bundle.num_contents == 2
+        assert bundle.content(0).address == '/first'
+        assert isinstance(bundle.content(1), OscBundle)
+        assert [m.params for m in bundle.messages()] == [[1], ['two', [0.0, 1.0, 2.0]]]
+
+        # Bundles default to being processed immediately
+        assert OscBundle(OscBundleBuilder().build().dgram).timestamp == 0
+
+
+    def test_parse_errors(self):
+
+        with pytest.raises(osc_bundle.ParseError):
+            OscBundle(b'/not_a_bundle')
+
+        dgram = OscBundleBuilder().build().dgram + osc_types.write_int(16) + b'/abc'
+        with pytest.raises(osc_bundle.ParseError):
+            OscBundle(dgram)
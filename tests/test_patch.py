@@ -0,0 +1,119 @@
+"""
+Tests for Patch class and its use in SynthBase
+"""
+
+import pytest
+import numpy as np
+
+from spiegelib.synth import Patch
+
+import utils
+
+
+class TestPatch():
+
+    def test_list_compatibility(self):
+
+        items = [(2, 0.75), (0, 0.25), (1, 0.5)]
+        patch = Patch(items)
+
+        assert len(patch) == 3
+        assert patch == sorted(items)
+        assert list(patch) == sorted(items)
+        assert dict(patch) == dict(items)
+        assert patch[1] == (1, 0.5)
+        assert patch[-1] == (2, 0.75)
+        assert patch[0:2] == [(0, 0.25), (1, 0.5)]
+
+        patch[1] = (1, 0.1)
+        assert patch[1] == (1, 0.1)
+        with pytest.raises(IndexError):
+            patch[1] = (2, 0.1)
+
+    def test_overridden(self):
+
+        patch = Patch([(0, 0.5), (1, 0.25), (2, 1.0)], overridden=[1])
+        assert patch.free.tolist() == [0, 2]
+        assert patch.to_list(skip_overridden=True) == [(0, 0.5), (2, 1.0)]
+
+        # Values for free parameters only
+        patch.set_free([0.1, 0.2])
+        assert patch == [(0, 0.1), (1, 0.25), (2, 0.2)]
+
+        # Values for all parameters, overridden values are ignored
+        patch.set_free([0.3, 0.4, 0.5])
+        assert patch == [(0, 0.3), (1, 0.25), (2, 0.5)]
+
+        with pytest.raises(ValueError):
+            patch.set_free([0.1])
+
+        patch.update([1, 2], [0.9, 2.0], clamp=(0.0, 1.0))
+        assert patch == [(0, 0.3), (1, 0.25), (2, 1.0)]
+
+        patch.set_overridden([])
+        patch.update([1], [0.9])
+        assert patch[1] == (1, 0.9)
+
+    def test_non_contiguous_indices(self):
+
+        patch = Patch([(10, 0.5), (3, 0.25), (7, 1.0)], overridden=[7])
+        assert patch.positions([3, 10]).tolist() == [0, 2]
+        patch.update([10, 7], [0.1, 0.2])
+        assert patch == [(3, 0.25), (7, 1.0), (10, 0.1)]
+
+        with pytest.raises(IndexError):
+            patch.update([4], [0.1])
+
+        with pytest.raises(ValueError):
+            Patch([(0, 0.1), (0, 0.2)])
+
+    def test_copy(self):
+
+        patch = Patch([(0, 0.5), (1, 0.25)], overridden=[0])
+        copy = patch.copy()
+        copy.set_free([0.9])
+        assert patch[1] == (1, 0.25)
+        assert copy.overridden.tolist() == [True, False]
+
+
+class TestSynthBasePatch():
+
+    def test_set_patch(self):
+
+        synth = utils.SineSynth()
+        assert isinstance(synth.patch, Patch)
+
+        synth.set_patch([0.1, 1.5])
+        assert synth.get_patch() == [(0, 0.1), (1, 1.0)]
+
+        synth.set_patch([(1, 0.3)])
+        assert synth.get_patch() == [(0, 0.1), (1, 0.3)]
+
+        synth.set_patch(np.array([0.2, 0.4], dtype=np.float32))
+        assert synth.patch.values == pytest.approx([0.2, 0.4])
+
+        synth.set_patch(Patch([(0, 0.6), (1, 0.7)]))
+        assert synth.get_patch() == [(0, 0.6), (1, 0.7)]
+
+    def test_overridden_parameters(self, tmp_path):
+
+        synth = utils.SineSynth()
+        synth.set_overridden_parameters([(1, 0.8)])
+        assert synth.get_patch() == [(0, 0.5)]
+        assert synth.get_patch(skip_overridden=False) == [(0, 0.5), (1, 0.8)]
+
+        synth.set_patch([0.3])
+        synth.set_patch([(1, 0.1)])
+        assert synth.get_patch(skip_overridden=False) == [(0, 0.3), (1, 0.8)]
+
+        # Assigning a new patch keeps overridden parameters
+        synth.patch = [(0, 0.1), (1, 0.2)]
+        synth.set_patch([0.4, 0.5])
+        assert synth.get_patch(skip_overridden=False) == [(0, 0.4), (1, 0.2)]
+
+        path = str(tmp_path / 'synth.json')
+        synth.save_state(path)
+        loaded = utils.SineSynth()
+        loaded.load_state(path)
+        assert loaded.overridden_params == [(1, 0.2)]
+        assert loaded.get_patch() == [(0, 0.4)]
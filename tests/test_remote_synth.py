@@ -0,0 +1,154 @@
+"""
+Tests for RemoteSynth class
+"""
+
+import os
+import time
+
+import pytest
+import numpy as np
+
+from spiegelib.synth import NumpySynth, RemoteSynth
+
+
+class FaultySynth(NumpySynth):
+    """
+    NumpySynth that crashes, hangs, or raises an error when the first parameter
+    is set to a value of 1.0, 0.9, or 0.8
+    """
+
+    def render_patch(self):
+        value = self.patch.values[0]
+        if value == 1.0:
+            os._exit(1)
+        elif value == 0.9:
+            time.sleep(10)
+        elif value == 0.8:
+            raise ValueError('Invalid patch')
+        super().render_patch()
+
+
+def make_synth():
+    return NumpySynth(render_length_secs=0.1)
+
+
+def make_faulty_synth():
+    return FaultySynth(render_length_secs=0.1)
+
+
+def make_invalid_synth():
+    raise ValueError('Unable to load plugin')
+
+
+class TestRemoteSynth():
+
+    def test_render(self):
+
+        local = make_synth()
+        with RemoteSynth(make_synth) as synth:
+            assert synth.get_parameters() == local.get_parameters()
+            assert synth.get_patch() == local.get_patch()
+            assert synth.render_length_secs == 0.1
+
+            patch = np.random.uniform(size=8)
+            synth.set_patch(patch)
+            local.set_patch(patch)
+            synth.render_patch()
+            local.render_patch()
+
+            audio = synth.get_audio().get_audio()
+            assert np.array_equal(audio, local.get_audio().get_audio())
+
+            # Audio is a view of shared memory
+            assert not audio.flags.owndata
+
+    def test_ring_buffer(self):
+
+        with RemoteSynth(make_synth, slots=2) as synth:
+            patches = np.random.uniform(size=(3, 8))
+            audio = []
+            for patch in patches:
+                synth.set_patch(patch)
+                synth.render_patch()
+                audio.append(synth.get_audio().get_audio())
+
+            # The third render wraps around and overwrites the first slot
+            assert np.array_equal(audio[0], audio[2])
+            assert not np.array_equal(audio[0], audio[1])
+
+    def test_render_batch(self):
+
+        local = make_synth()
+        local.set_overridden_parameters([(0, 0.75)])
+        with RemoteSynth(make_synth, slots=3) as synth:
+            synth.set_overridden_parameters([(0, 0.75)])
+            patches = np.random.uniform(size=(7, 7))
+            assert np.array_equal(synth.render_batch(patches), local.render_batch(patches))
+            assert synth.get_patch() == local.get_patch()
+            assert synth.render_batch(np.zeros((0, 7))).shape == (0, 0)
+
+    def test_settings(self):
+
+        with RemoteSynth(make_synth) as synth:
+            synth.render_length_secs = 1.5
+            synth.render_patch()
+            assert synth.get_audio().get_audio().shape == (66150,)
+
+    def test_synth_state(self, tmp_path):
+
+        local = make_synth()
+        local.set_overridden_parameters([(1, 0.25)])
+        local.save_state(tmp_path / 'synth.json')
+
+        with RemoteSynth(make_synth, synth_state=tmp_path / 'synth.json') as synth:
+            assert synth.overridden_params == [(1, 0.25)]
+            assert synth.get_patch() == local.get_patch()
+
+    def test_restart(self):
+
+        with RemoteSynth(make_synth) as synth:
+            synth.process.kill()
+            synth.process.join()
+
+            synth.render_patch()
+            assert synth.restarts == 1
+            assert synth.get_audio().get_audio().shape == (4410,)
+
+    def test_crash(self):
+
+        with RemoteSynth(make_faulty_synth, max_retries=2) as synth:
+            synth.set_patch([(0, 1.0)])
+            with pytest.raises(RuntimeError):
+                synth.render_patch()
+
+            assert synth.restarts == 3
+            synth.set_patch([(0, 0.5)])
+            synth.render_patch()
+            assert synth.get_audio().get_audio().shape == (4410,)
+
+    def test_error(self):
+
+        with RemoteSynth(make_faulty_synth) as synth:
+            synth.set_patch([(0, 0.8)])
+            with pytest.raises(RuntimeError, match='Invalid patch'):
+                synth.render_patch()
+
+            assert synth.restarts == 0
+
+        with pytest.raises(RuntimeError, match='Unable to load plugin'):
+            RemoteSynth(make_invalid_synth)
+
+        with pytest.raises(TypeError):
+            RemoteSynth('factory')
+
+    def test_timeout(self):
+
+        with RemoteSynth(make_faulty_synth, timeout=0.5) as synth:
+            synth.set_patch([(0, 0.9)])
+            with pytest.raises(TimeoutError):
+                synth.render_patch()
+
+            assert synth.restarts == 1
+            synth.set_patch([(0, 0.5)])
+            synth.render_patch()
+            assert synth.get_audio().get_audio().shape == (4410,)
@@ -0,0 +1,153 @@
+"""
+Tests for batch rendering with SynthBase and its use in dataset generation,
+genetic algorithms, and sound matching
+"""
+
+import numpy as np
+
+from spiegelib import AudioBuffer, DatasetGenerator, SoundMatch
+from spiegelib.estimator import BasicGA, NSGA3
+from spiegelib.features import FFT, MFCC
+from spiegelib.synth import NumpySynth
+
+import utils
+
+
+class TestRenderBatch():
+
+    def test_render_batch_fallback(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        synth.set_patch([0.3, 0.6])
+        patches = np.array([[0.1, 0.5], [0.9, 0.2]])
+
+        audio = synth.render_batch(patches)
+        assert audio.shape == (2, 4410)
+        assert synth.get_patch() == [(0, 0.3), (1, 0.6)]
+
+        for samples, values in zip(audio, patches):
+            synth.set_patch(values)
+            synth.render_patch()
+            assert np.array_equal(samples, synth.get_audio().get_audio())
+
+    def test_random_patches_fallback(self):
+
+        synth = utils.SineSynth()
+        synth.set_overridden_parameters([(1, 0.25)])
+        patch = synth.get_patch(skip_overridden=False)
+
+        np.random.seed(1)
+        patches = synth.random_patches(5)
+        assert patches.shape == (5, 1)
+        assert len(np.unique(patches)) == 5
+        assert synth.get_patch(skip_overridden=False) == patch
+
+        # Same values as randomizing patches one at a time
+        np.random.seed(1)
+        for values in patches:
+            synth.randomize_patch()
+            assert synth.get_patch() == [(0, values[0])]
+
+    def test_random_patches(self):
+
+        synth = NumpySynth(num_params=10)
+        synth.set_overridden_parameters([(0, 0.5)])
+        patches = synth.random_patches(4)
+        assert patches.shape == (4, 9)
+        assert patches.min() >= 0.0 and patches.max() <= 1.0
+
+    def test_dataset_generator(self, tmp_path):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        features = FFT(output='magnitude', fft_size=256)
+
+        generator = DatasetGenerator(synth, features, output_folder=tmp_path)
+        generator.batch_size = 3
+        generator.generate(8, seed=1)
+
+        feature_set = np.load(tmp_path / 'features.npy')
+        patch_set = np.load(tmp_path / 'patches.npy')
+        assert feature_set.shape == (8, 256)
+        assert patch_set.shape == (8, 8)
+
+        # Features match rendering each patch individually
+        for feature, patch in zip(feature_set, patch_set):
+            synth.set_patch(patch)
+            synth.render_patch()
+            assert np.allclose(features(synth.get_audio()), feature, atol=1e-4)
+
+        # Seeded generation is reproducible with any batch size
+        generator.batch_size = 8
+        generator.generate(8, file_prefix='repeat_', seed=1)
+        assert np.array_equal(np.load(tmp_path / 'repeat_patches.npy'), patch_set)
+
+    def test_evaluate_population(self):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        features = MFCC()
+        target = features(synth.get_random_example())
+        individuals = [list(p) for p in np.random.uniform(size=(5, 8))]
+
+        results = BasicGA.evaluate_population(synth, features, target, individuals,
+                                              batch_size=2)
+        expected = [BasicGA.evaluate_fitness(synth, features, target, individual)
+                    for individual in individuals]
+        assert np.allclose(results, expected, rtol=1e-4)
+
+        features_list = [MFCC(), FFT(output='magnitude')]
+        target = [f(synth.get_random_example()) for f in features_list]
+        results = NSGA3.evaluate_population(synth, features_list, target, individuals)
+        expected = [NSGA3.evaluate_fitness(synth, features_list, target, individual)
+                    for individual in individuals]
+        assert np.allclose(results, expected, rtol=1e-4)
+
+    def test_ga_predict(self):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        target = synth.get_random_example()
+        ga = BasicGA(synth, MFCC(), seed=1, pop_size=6, ngen=2)
+        result = ga.predict(target)
+        assert len(result) == 8
+
+    def test_ga_toolbox_map(self):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        ga = BasicGA(synth, MFCC(), seed=1, pop_size=6, ngen=1)
+        ga.target = ga.features(synth.get_random_example())
+        individuals = [list(p) for p in np.random.uniform(size=(4, 8))]
+
+        # Other functions are called for each individual
+        assert ga.toolbox.map(sum, individuals) == [sum(i) for i in individuals]
+
+        # The toolbox evaluate function is run on the whole population at once
+        batches = []
+        ga.toolbox.register("evaluate_population",
+                            lambda population: batches.append(population) or
+                            [(0.0,)] * len(population))
+        assert ga.toolbox.map(ga.toolbox.evaluate, individuals) == [(0.0,)] * 4
+        assert batches == [individuals]
+
+        # A replaced evaluate function is called for each individual
+        ga.toolbox.register("evaluate", lambda individual: (1.0,))
+        ga.predict(synth.get_random_example())
+        assert ga.logbook.select('min') == [1.0, 1.0]
+
+    def test_sound_match_batch(self):
+
+        synth = NumpySynth(render_length_secs=0.1)
+        synth.set_overridden_parameters([(0, 0.5)])
+        estimator = utils.ConstantEstimator(params=[0.25] * 6 + [1.5])
+        matcher = SoundMatch(synth, estimator)
+
+        targets = [AudioBuffer(np.zeros(100), 44100)] * 3
+        audio = matcher.match_batch(targets)
+        assert len(audio) == 3
+
+        patches = matcher.get_patch()
+        assert len(patches) == 3
+        assert patches[0] == [(i, 0.25) for i in range(1, 7)] + [(7, 1.0)]
+
+        matcher.match(targets[0])
+        assert np.allclose(audio[0].get_audio(), matcher.synth.get_audio().get_audio(),
+                           atol=1e-6)
+        assert matcher.get_patch() == patches[0]
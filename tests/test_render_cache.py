@@ -0,0 +1,214 @@
+"""
+Tests for RenderCache and CachedSynth classes
+"""
+
+import pickle
+import pytest
+import numpy as np
+
+from spiegelib.synth import RenderCache, CachedSynth, NumpySynth
+
+import utils
+
+
+class CountingSynth(utils.SineSynth):
+    """
+    Sine synth that counts calls to render_patch
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.renders = 0
+
+    def render_patch(self):
+        self.renders += 1
+        super().render_patch()
+
+
+def make_synth():
+    return utils.SineSynth()
+
+
+def make_other_synth():
+    return utils.SineSynth(midi_note=60)
+
+
+class Factory():
+
+    __slots__ = ()
+
+    def __call__(self):
+        return utils.SineSynth()
+
+
+class TestRenderCache():
+
+    def test_cached_render(self):
+
+        synth = CountingSynth(render_length_secs=0.1)
+        cache = RenderCache(resolution=1e-3)
+        cached = CachedSynth(synth, cache)
+
+        cached.set_patch([0.2, 0.8])
+        cached.render_patch()
+        expected = cached.get_audio().get_audio()
+
+        # Values within the resolution are a hit
+        cached.set_patch([0.2001, 0.8])
+        cached.render_patch()
+        assert np.array_equal(cached.get_audio().get_audio(), expected)
+        assert synth.renders == 1
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+        # Render settings are part of the key
+        cached.midi_note = 60
+        assert synth.midi_note == 60
+        cached.render_patch()
+        assert synth.renders == 2
+
+        cached.set_patch([0.5, 0.5])
+        cached.render_patch()
+        assert synth.renders == 3
+        assert cache.report()['entries'] == 3
+
+    def test_synth_name(self):
+
+        cache = RenderCache()
+
+        def key(**attributes):
+            synth = utils.SineSynth()
+            for name, value in attributes.items():
+                setattr(synth, name, value)
+            return cache.key(synth)
+
+        # Synths of the same class are told apart by plugin path and factory
+        keys = [
+            key(),
+            key(plugin_path='/plugins/Dexed.vst'),
+            key(plugin_path='/plugins/Helm.vst'),
+            key(synth_factory=make_synth),
+            key(synth_factory=make_other_synth),
+            key(synth_factory=make_synth, synth_state='synth.json'),
+        ]
+        assert len(set(keys)) == len(keys)
+        assert key(plugin_path='/plugins/Dexed.vst') == keys[1]
+        assert key(synth_factory=make_synth) == keys[3]
+
+        # An explicit name is used instead
+        assert (cache.key(utils.SineSynth(), 'dexed') !=
+                key(plugin_path='/plugins/Dexed.vst'))
+
+        # Factories that can't be identified require a name
+        with pytest.raises(ValueError):
+            key(synth_factory=Factory())
+
+        synth = utils.SineSynth()
+        synth.synth_factory = Factory()
+        assert cache.key(synth, 'factory') == cache.key(utils.SineSynth(), 'factory')
+
+    def test_render_batch(self):
+
+        synth = CountingSynth(render_length_secs=0.1)
+        synth.set_overridden_parameters([(1, 0.5)])
+        cache = RenderCache()
+        cached = CachedSynth(synth, cache)
+
+        cached.set_patch([0.2])
+        cached.render_patch()
+        assert synth.renders == 1
+
+        # Only patches that aren't in the cache are rendered by the wrapped synth
+        patches = np.array([[0.2], [0.4], [0.6]])
+        expected = utils.SineSynth(render_length_secs=0.1).render_batch(
+            np.array([[0.2, 0.5], [0.4, 0.5], [0.6, 0.5]]))
+        assert np.array_equal(cached.render_batch(patches), expected)
+        assert synth.renders == 3
+        assert cache.hits == 1
+
+        assert np.array_equal(cached.render_batch(patches), expected)
+        assert synth.renders == 3
+        assert cached.get_patch() == [(0, 0.2)]
+
+        # Rendered batches are used by render_patch
+        cached.set_patch([0.6])
+        cached.render_patch()
+        assert synth.renders == 3
+        assert np.array_equal(cached.get_audio().get_audio(), expected[2])
+
+        assert cached.render_batch(np.zeros((0, 1))).shape == (0, 0)
+
+    def test_random_patches(self):
+
+        cached = CachedSynth(NumpySynth(seed=1), RenderCache())
+        assert np.array_equal(cached.random_patches(3), NumpySynth(seed=1).random_patches(3))
+
+        cached.seed_random(2)
+        assert np.array_equal(cached.random_patches(3), NumpySynth(seed=2).random_patches(3))
+
+    def test_audio_copied(self):
+
+        cached = CachedSynth(utils.SineSynth(render_length_secs=0.1), RenderCache())
+        cached.render_patch()
+        audio = cached.get_audio().get_audio()
+        audio[:] = 0.0
+        cached.render_patch()
+        assert np.any(cached.get_audio().get_audio() != 0.0)
+
+    def test_eviction_and_spill(self, tmp_path):
+
+        synth = CountingSynth(render_length_secs=0.01)
+        synth.render_patch()
+        size = synth.get_audio().get_audio().nbytes
+        synth.renders = 0
+
+        cache = RenderCache(max_size=2 * size, spill_path=tmp_path)
+        cached = CachedSynth(synth, cache)
+
+        patches = [[0.1, 0.5], [0.2, 0.5], [0.3, 0.5]]
+        audio = []
+        for patch in patches:
+            cached.set_patch(patch)
+            cached.render_patch()
+            audio.append(cached.get_audio().get_audio())
+
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert cache.report()['disk_entries'] == 1
+
+        # Evicted audio is loaded from disk
+        cached.set_patch(patches[0])
+        cached.render_patch()
+        assert np.array_equal(cached.get_audio().get_audio(), audio[0])
+        assert synth.renders == 3
+        assert cache.disk_hits == 1
+
+        cache.clear()
+        assert cache.report()['disk_entries'] == 0
+        cached.render_patch()
+        assert synth.renders == 4
+
+    def test_without_spill(self):
+
+        synth = CountingSynth(render_length_secs=0.01)
+        cache = RenderCache(max_size=1)
+        cached = CachedSynth(synth, cache)
+        cached.render_patch()
+        cached.render_patch()
+        assert synth.renders == 2
+        assert len(cache) == 0
+
+    def test_get_audio_before_render(self):
+
+        cached = CachedSynth(utils.SineSynth(), RenderCache())
+        with pytest.raises(Exception):
+            cached.get_audio()
+
+    def test_pickle(self):
+
+        cached = CachedSynth(utils.SineSynth(render_length_secs=0.01), RenderCache())
+        cached.render_patch()
+        copy = pickle.loads(pickle.dumps(cached))
+        copy.render_patch()
+        assert copy.cache.hits == 1
+        assert copy.get_patch() == cached.get_patch()
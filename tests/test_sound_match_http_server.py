@@ -0,0 +1,239 @@
+"""
+Tests for SoundMatchHTTPServer class
+"""
+
+import io
+import json
+import threading
+import pytest
+import numpy as np
+from wsgiref.util import setup_testing_defaults
+
+from spiegelib import AudioBuffer, SoundMatch
+from spiegelib.features import FFT
+from spiegelib.network import SoundMatchHTTPServer, SoundMatchPool
+
+import utils
+
+
+def make_sound_matcher(event=None):
+    synth = utils.SineSynth(render_length_secs=0.1)
+    return SoundMatch(synth, utils.ConstantEstimator(event=event))
+
+
+def request(server, method='GET', path='/sound_match', query='', body=b'',
+            content_type='text/plain', accept='*/*', content_length=None):
+    environ = {}
+    setup_testing_defaults(environ)
+    environ['REQUEST_METHOD'] = method
+    environ['PATH_INFO'] = path
+    environ['QUERY_STRING'] = query
+    environ['CONTENT_LENGTH'] = str(len(body)) if content_length is None else content_length
+    environ['CONTENT_TYPE'] = content_type
+    environ['HTTP_ACCEPT'] = accept
+    environ['wsgi.input'] = io.BytesIO(body)
+
+    response = {}
+    def start_response(status, headers):
+        response['status'] = status
+        response['headers'] = dict(headers)
+
+    response['body'] = b''.join(server(environ, start_response))
+    return response
+
+
+class TestSoundMatchHTTPServer():
+
+    def test_sound_match(self, tmp_path):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+
+        server = SoundMatchHTTPServer(sound_matcher_factory=make_sound_matcher, workers=2)
+        response = request(server, query='target=%s' % target)
+        server.pool.close()
+
+        assert response['status'].startswith('200')
+        assert json.loads(response['body']) == {'patch': [[0, 0.25], [1, 0.75]]}
+
+
+    def test_not_found(self, tmp_path):
+
+        server = SoundMatchHTTPServer(make_sound_matcher())
+        assert request(server, path='/unknown')['status'].startswith('404')
+        assert request(server, query='')['status'].startswith('404')
+        assert request(server, query='target=%s' % (tmp_path / 'missing.wav'))['status'] \
+            .startswith('500')
+        server.pool.close()
+
+
+    def test_post_sound_match(self, tmp_path):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+        server = SoundMatchHTTPServer(make_sound_matcher())
+
+        response = request(server, method='POST', body=target.read_bytes(),
+                           content_type='audio/wav')
+        assert response['status'].startswith('200')
+        assert json.loads(response['body']) == {'patch': [[0, 0.25], [1, 0.75]]}
+
+        samples = utils.make_test_sine(4410, 440).astype('<f4').tobytes()
+        response = request(server, method='POST', body=samples,
+                           content_type='application/octet-stream')
+        assert response['status'].startswith('200')
+
+        assert request(server, method='POST', body=samples,
+                       content_type='text/plain')['status'].startswith('415')
+        assert request(server, method='POST', body=samples[:-1],
+                       content_type='audio/pcm')['status'].startswith('400')
+        assert request(server, method='POST', content_type='audio/pcm')['status'] \
+            .startswith('400')
+        assert request(server, method='POST', content_type='audio/pcm',
+                       content_length='')['status'].startswith('411')
+        assert request(server, method='POST', body=samples, content_type='audio/pcm',
+                       content_length='many')['status'].startswith('400')
+        server.pool.close()
+
+
+    def test_max_content_length(self):
+
+        server = SoundMatchHTTPServer(make_sound_matcher(), max_content_length=4410 * 4)
+        samples = utils.make_test_sine(4410, 440).astype('<f4').tobytes()
+        assert request(server, method='POST', body=samples,
+                       content_type='audio/pcm')['status'].startswith('200')
+
+        # Larger bodies are refused for single and batch requests
+        for path in ['/sound_match', '/sound_match/batch']:
+            response = request(server, method='POST', path=path, body=samples + samples[:4],
+                               content_type='audio/pcm')
+            assert response['status'].startswith('413')
+
+        server.pool.close()
+
+        with pytest.raises(ValueError):
+            SoundMatchHTTPServer(make_sound_matcher(), max_content_length=0)
+
+
+    def test_decode_audio(self, tmp_path):
+
+        samples = utils.make_test_sine(4410, 440).astype(np.float32)
+        target = tmp_path / 'target.wav'
+        AudioBuffer(samples, 44100).save(str(target))
+
+        decoded = SoundMatchHTTPServer.decode_audio(target.read_bytes(), 'audio/wav')
+        expected = AudioBuffer()
+        expected.load(str(target))
+        np.testing.assert_array_almost_equal(decoded.get_audio(), expected.get_audio())
+
+        decoded = SoundMatchHTTPServer.decode_audio(samples.tobytes(), 'audio/pcm')
+        np.testing.assert_array_equal(decoded.get_audio(), samples)
+        assert decoded.get_sample_rate() == 44100
+
+        # Raw samples at a different rate are resampled
+        decoded = SoundMatchHTTPServer.decode_audio(samples.tobytes(), 'audio/pcm', 22050)
+        assert decoded.get_audio().shape == (8820,)
+
+
+    def test_post_sound_match_batch(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        sound_matcher = SoundMatch(synth, utils.ConstantEstimator(), FFT(output='magnitude'))
+        server = SoundMatchHTTPServer(sound_matcher)
+
+        targets = np.array([utils.make_test_sine(4410, f) for f in [220, 440, 880]],
+                           dtype=np.float32)
+        expected = [[[0, 0.25], [1, 0.75]]] * 3
+
+        body = io.BytesIO()
+        np.save(body, targets)
+        response = request(server, method='POST', path='/sound_match/batch',
+                           body=body.getvalue(), content_type='application/x-npy')
+        assert response['status'].startswith('200')
+        assert json.loads(response['body']) == {'patches': expected}
+
+        response = request(server, method='POST', path='/sound_match/batch',
+                           query='num_samples=4410&batch_size=2', body=targets.tobytes(),
+                           content_type='application/octet-stream',
+                           accept='application/x-ndjson')
+        assert response['status'].startswith('200')
+        lines = response['body'].decode('utf-8').strip().split('\n')
+        assert [json.loads(line)['patch'] for line in lines] == expected
+
+        assert request(server, method='POST', path='/sound_match/batch',
+                       body=targets.tobytes(), content_type='audio/pcm')['status'] \
+            .startswith('400')
+        server.pool.close()
+
+
+    def test_decode_audio_batch(self):
+
+        targets = np.random.uniform(-1, 1, (4, 100)).astype(np.float32)
+        decoded = SoundMatchHTTPServer.decode_audio_batch(targets.tobytes(), 'audio/pcm',
+                                                          num_samples=100)
+        np.testing.assert_array_equal(decoded, targets)
+
+        with pytest.raises(ValueError):
+            SoundMatchHTTPServer.decode_audio_batch(targets.tobytes(), 'audio/pcm',
+                                                    num_samples=99)
+
+        body = io.BytesIO()
+        np.save(body, targets[0])
+        with pytest.raises(ValueError):
+            SoundMatchHTTPServer.decode_audio_batch(body.getvalue(), 'application/x-npy')
+
+
+    def test_queue_full(self, tmp_path):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+
+        event = threading.Event()
+        server = SoundMatchHTTPServer(make_sound_matcher(event), workers=1, queue_size=1)
+
+        # Fill the worker and the queue with requests that wait on the event
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(
+            request(server, query='target=%s' % target))) for i in range(2)]
+        for thread in threads:
+            thread.start()
+
+        while server.pool._slots._value > 0:
+            threading.Event().wait(0.01)
+
+        assert request(server, query='target=%s' % target)['status'].startswith('503')
+
+        event.set()
+        for thread in threads:
+            thread.join()
+        server.pool.close()
+
+        assert [r['status'][:3] for r in responses] == ['200', '200']
+
+
+    def test_invalid_workers(self):
+
+        with pytest.raises(ValueError):
+            SoundMatchHTTPServer(make_sound_matcher(), workers=2)
+
+        with pytest.raises(ValueError):
+            SoundMatchHTTPServer()
+
+        with pytest.raises(TypeError):
+            SoundMatchPool(sound_matcher_factory='factory')
+
+
+    def test_worker_sound_matchers(self):
+
+        with SoundMatchPool(sound_matcher_factory=make_sound_matcher, workers=3) as pool:
+            barrier = threading.Barrier(3)
+            def get_matcher(sound_matcher):
+                barrier.wait()
+                return sound_matcher
+
+            futures = [pool.submit(get_matcher) for i in range(3)]
+            matchers = [future.result() for future in futures]
+
+        # Each worker has its own sound matcher and synth
+        assert len(set(id(m) for m in matchers)) == 3
+        assert len(set(id(m.synth) for m in matchers)) == 3
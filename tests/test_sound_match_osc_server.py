@@ -0,0 +1,207 @@
+"""
+Tests for SoundMatchOSCServer class
+"""
+
+import json
+import socket
+import threading
+import pytest
+import numpy as np
+
+from spiegelib import AudioBuffer, SoundMatch
+from spiegelib.network import SoundMatchOSCServer
+from spiegelib.features import FFT
+from spiegelib.network.osc import OscMessage, OscMessageBuilder
+from spiegelib.network.osc import OscBundle, OscBundleBuilder
+
+import utils
+
+
+def make_sound_matcher(event=None):
+    synth = utils.SineSynth(render_length_secs=0.1)
+    return SoundMatch(synth, utils.ConstantEstimator(event=event))
+
+
+@pytest.fixture
+def client():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(10)
+    yield sock
+    sock.close()
+
+
+def run_server(server):
+    thread = threading.Thread(target=server.start)
+    thread.start()
+    assert server.started.wait(10)
+    return thread
+
+
+def send(client, server, address, *args):
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    client.sendto(builder.build().dgram, ('127.0.0.1', server.receive_port))
+
+
+def receive(client):
+    return OscMessage(client.recvfrom(65536)[0])
+
+
+def send_bundle(client, server, messages):
+    bundle = OscBundleBuilder()
+    for address, args in messages:
+        builder = OscMessageBuilder(address)
+        for arg in args:
+            builder.add_arg(arg)
+        bundle.add_content(builder.build())
+    client.sendto(bundle.build().dgram, ('127.0.0.1', server.receive_port))
+
+
+def receive_bundle(client):
+    return OscBundle(client.recvfrom(65536)[0])
+
+
+class BatchEstimator(utils.ConstantEstimator):
+    """
+    Counts calls to predict_batch
+    """
+
+    batches = 0
+
+    def predict_batch(self, inputs, batch_size=None):
+        BatchEstimator.batches += 1
+        return super().predict_batch(inputs, batch_size)
+
+
+class TestSoundMatchOSCServer():
+
+    def test_sound_match(self, tmp_path, client):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+
+        server = SoundMatchOSCServer(sound_matcher_factory=make_sound_matcher, receive=0,
+                                     send=None, workers=2)
+        thread = run_server(server)
+
+        send(client, server, '/sound_match', str(target))
+        response = receive(client)
+        assert response.address == '/sound_match_success'
+        assert json.loads(response.params[0]) == {'patch': [[0, 0.25], [1, 0.75]]}
+
+        send(client, server, '/sound_match', str(tmp_path / 'missing.wav'))
+        assert receive(client).address == '/sound_match_error'
+
+        send(client, server, '/unknown')
+        assert receive(client).address == '/error'
+
+        server.stop()
+        thread.join()
+
+
+    def test_queue_depth(self, tmp_path, client):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+
+        event = threading.Event()
+        server = SoundMatchOSCServer(make_sound_matcher(event), receive=0, send=None,
+                                     queue_size=1)
+        thread = run_server(server)
+
+        # Messages are handled while matches are running
+        send(client, server, '/sound_match', str(target))
+        send(client, server, '/sound_match', str(target))
+        send(client, server, '/sound_match', str(target))
+        response = receive(client)
+        assert response.address == '/sound_match_error'
+
+        send(client, server, '/queue_depth')
+        response = receive(client)
+        assert response.address == '/queue_depth'
+        assert response.params == [2]
+
+        event.set()
+        assert receive(client).address == '/sound_match_success'
+        assert receive(client).address == '/sound_match_success'
+
+        server.stop()
+        thread.join()
+
+
+    def test_sound_match_blob(self, client):
+
+        server = SoundMatchOSCServer(make_sound_matcher(), receive=0, send=None)
+        thread = run_server(server)
+
+        audio = utils.make_test_sine(4410, 440).astype('<f4')
+        send(client, server, '/sound_match', audio.tobytes(), 44100)
+        response = receive(client)
+        assert response.address == '/sound_match_success'
+        assert response.params == [[0.25, 0.75]]
+
+        send(client, server, '/sound_match', audio.tobytes())
+        assert receive(client).params == [[0.25, 0.75]]
+
+        send(client, server, '/sound_match', audio.tobytes()[:-2] + b'\x00\x00\x00', 44100)
+        assert receive(client).address == '/sound_match_error'
+
+        # Blob longer than the datagram received
+        builder = OscMessageBuilder('/sound_match')
+        builder.add_arg(audio.tobytes())
+        client.sendto(builder.build().dgram[:-400], ('127.0.0.1', server.receive_port))
+        assert receive(client).address == '/sound_match_error'
+
+        server.stop()
+        thread.join()
+
+
+    def test_sound_match_bundle(self, tmp_path, client):
+
+        target = tmp_path / 'target.wav'
+        AudioBuffer(utils.make_test_sine(4410, 440), 44100).save(str(target))
+        audio = utils.make_test_sine(4410, 440).astype('<f4').tobytes()
+
+        server = SoundMatchOSCServer(make_sound_matcher(), receive=0, send=None)
+        thread = run_server(server)
+
+        send_bundle(client, server, [('/sound_match', [audio, 44100]),
+                                     ('/queue_depth', []),
+                                     ('/sound_match', [str(target)]),
+                                     ('/unknown', []),
+                                     ('/sound_match', [b'\x00\x00'])])
+
+        bundle = receive_bundle(client)
+        assert [m.address for m in bundle] == ['/sound_match_success', '/queue_depth',
+                                               '/sound_match_success', '/error',
+                                               '/sound_match_error']
+        assert bundle.content(0).params == [[0.25, 0.75]]
+        assert json.loads(bundle.content(2).params[0]) == {'patch': [[0, 0.25], [1, 0.75]]}
+
+        server.stop()
+        thread.join()
+
+
+    def test_sound_match_bundle_batch(self, tmp_path, client):
+
+        # Sound matcher without a synth estimates the whole bundle at once
+        config = tmp_path / 'synth.json'
+        utils.SineSynth().save_state(str(config))
+        sound_matcher = SoundMatch(str(config), BatchEstimator(), FFT(output='magnitude'))
+
+        server = SoundMatchOSCServer(sound_matcher, receive=0, send=None)
+        thread = run_server(server)
+
+        messages = [('/sound_match', [utils.make_test_sine(4410, f).astype('<f4').tobytes()])
+                    for f in [220, 440, 880]]
+        send_bundle(client, server, messages)
+
+        bundle = receive_bundle(client)
+        assert bundle.num_contents == 3
+        assert all(m.params == [[0.25, 0.75]] for m in bundle)
+        assert BatchEstimator.batches == 1
+
+        server.stop()
+        thread.join()
@@ -0,0 +1,78 @@
+"""
+Tests for SpectralEngine class
+"""
+
+import pytest
+import numpy as np
+import librosa
+
+from spiegelib.features.spectral_engine import SpectralEngine
+
+import utils
+
+class TestSpectralEngine():
+
+    def test_stft_librosa_parity(self):
+
+        audio = utils.make_test_sine(22050, 440, 44100).astype(np.float32)
+        engine = SpectralEngine(44100, 2048, 512)
+        expected = librosa.stft(y=audio, n_fft=2048, hop_length=512, pad_mode='reflect')
+        spectrum = engine.stft(audio)
+
+        assert spectrum.shape == expected.shape
+        np.testing.assert_allclose(spectrum, expected, atol=1e-3)
+
+
+    def test_mfcc_librosa_parity(self):
+
+        np.random.seed(0)
+        audio = np.random.uniform(-1.0, 1.0, size=(3, 22050)).astype(np.float32)
+        engine = SpectralEngine(44100, 1024, 256, num_mfccs=13)
+        mfccs = engine.mfcc(audio)
+
+        assert mfccs.shape == (3, 13, 87)
+        for i in range(3):
+            expected = librosa.feature.mfcc(y=audio[i], sr=44100, n_fft=1024, hop_length=256,
+                                            n_mfcc=13, pad_mode='reflect')
+            np.testing.assert_allclose(mfccs[i], expected, rtol=1e-4, atol=1e-3)
+
+
+    def test_dtype(self):
+
+        engine = SpectralEngine(44100, 1024, 256, num_mfccs=13)
+        audio = utils.make_test_sine(4096, 440, 44100)
+
+        # Float32 audio gives float32 results, as with librosa
+        audio32 = audio.astype(np.float32)
+        assert engine.stft(audio32).dtype == np.complex64
+        assert engine.power(audio32).dtype == np.float32
+        assert engine.mfcc(audio32).dtype == np.float32
+        assert engine.mfcc(audio32[np.newaxis]).dtype == np.float32
+        assert engine.stft(audio32).dtype == librosa.stft(y=audio32, n_fft=1024).dtype
+
+        assert engine.stft(audio.astype(np.float64)).dtype == np.complex128
+        assert engine.mfcc(audio.astype(np.float64)).dtype == np.float64
+
+
+    def test_frames_are_views(self):
+
+        audio = np.arange(4096, dtype=np.float32)
+        engine = SpectralEngine(44100, 1024, 512, pad_mode='constant')
+        frames = engine.frames(audio)
+
+        assert frames.shape == (9, 1024)
+        assert not frames.flags.writeable
+        np.testing.assert_array_equal(frames[1], np.arange(1024))
+
+
+    def test_mfcc_requires_num_mfccs(self):
+
+        engine = SpectralEngine(44100, 1024, 512)
+        with pytest.raises(ValueError):
+            engine.mfcc(np.zeros(4096))
+
+
+    def test_dct_basis_orthonormal(self):
+
+        basis = SpectralEngine.dct_basis(128, 128)
+        np.testing.assert_array_almost_equal(basis @ basis.T, np.eye(128))
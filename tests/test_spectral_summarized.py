@@ -5,6 +5,7 @@ Tests for Spectral Summarized class
 
 import pytest
 import numpy as np
+import librosa
 
 from spiegelib import AudioBuffer
 from spiegelib.features import SpectralSummarized
@@ -77,3 +78,37 @@ class TestSpectralSummarized():
         assert scaled.std() == pytest.approx(1.)
         np.testing.assert_array_almost_equal(scaled.mean(0), np.zeros(22))
         np.testing.assert_array_almost_equal(scaled.std(0), np.ones(22))
+
+
+    def test_batch_extraction(self):
+
+        bin_freq = 44100. / 1024.
+        audio = [AudioBuffer(utils.make_test_cosine(4096, bin_freq*(i+1), 44100), 44100)
+                 for i in range(4)]
+        spectral = SpectralSummarized(frame_size=1024, hop_size=512)
+        features = spectral.batch(audio)
+
+        assert features.shape == (4,22)
+        for i in range(4):
+            np.testing.assert_allclose(features[i], spectral(audio[i]), rtol=1e-4, atol=1e-4)
+
+
+    def test_librosa_parity(self):
+
+        np.random.seed(0)
+        audio = np.random.uniform(-1.0, 1.0, 22050).astype(np.float32)
+        spectral = SpectralSummarized(frame_size=1024, hop_size=512)
+        features = spectral(AudioBuffer(audio, 44100))
+
+        kwargs = {'y': audio, 'n_fft': 1024, 'hop_length': 512, 'pad_mode': 'reflect'}
+        expected = [
+            librosa.feature.spectral_centroid(sr=44100, **kwargs)[0],
+            librosa.feature.spectral_bandwidth(sr=44100, **kwargs)[0],
+            librosa.feature.spectral_flatness(**kwargs)[0],
+            librosa.feature.spectral_rolloff(sr=44100, **kwargs)[0],
+        ]
+        expected.extend(librosa.feature.spectral_contrast(sr=44100, **kwargs))
+
+        for i, feature in enumerate(expected):
+            assert features[i*2] == pytest.approx(feature.mean(), rel=1e-4)
+            assert features[i*2+1] == pytest.approx(feature.var(), rel=1e-3, abs=1e-8)
@@ -202,3 +202,23 @@ class TestStandardScaler():
         scaled = scaler.transform(features[0])
         assert scaled.shape == features[0].shape
         np.testing.assert_array_almost_equal(scaled, expected_scaled)
+
+
+    def test_partial_fit(self, shared_datadir):
+        test_data = (shared_datadir / 'test_mfcc/train_features.npy').resolve()
+        features = np.load(test_data)
+
+        for axis in [None, 0, (0, 2)]:
+            expected = StandardScaler()
+            expected.fit(features, axis)
+
+            scaler = StandardScaler()
+            for start in range(0, len(features), 7):
+                scaler.partial_fit(features[start:start + 7], axis)
+
+            np.testing.assert_allclose(scaler.mean, expected.mean, rtol=1e-4, atol=1e-4)
+            np.testing.assert_allclose(scaler.std, expected.std, rtol=1e-4)
+            assert scaler.transform(features).shape == features.shape
+
+        with pytest.raises(ValueError):
+            StandardScaler().partial_fit(features, 1)
@@ -134,3 +134,16 @@ class TestSTFT():
         assert scaled.shape == (10,21,513)
         assert scaled.mean() == pytest.approx(0.)
         assert scaled.std() == pytest.approx(1.)
+
+
+    def test_batch_extraction(self):
+
+        bin_freq = 44100. / 1024.
+        audio = [AudioBuffer(utils.make_test_cosine(4096, bin_freq*(i+1), 44100), 44100)
+                 for i in range(4)]
+        stft = STFT(output='magnitude_phase', fft_size=1024, hop_size=512, time_major=True)
+        features = stft.batch(audio)
+
+        assert features.shape == (4,9,513,2)
+        for i in range(4):
+            np.testing.assert_array_almost_equal(features[i], stft(audio[i]), decimal=3)
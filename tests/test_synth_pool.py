@@ -0,0 +1,243 @@
+"""
+Tests for SynthPool class and its use by SoundMatchPool
+"""
+
+import queue
+import threading
+
+import pytest
+import numpy as np
+
+from spiegelib import AudioBuffer, SoundMatch
+from spiegelib.network import SoundMatchPool
+from spiegelib.synth import NumpySynth, SynthPool
+
+import utils
+
+
+def make_synth():
+    return utils.SineSynth(render_length_secs=0.1)
+
+
+class TestSynthPool():
+
+    def test_construction(self):
+
+        created = []
+        def factory():
+            created.append(make_synth())
+            return created[-1]
+
+        pool = SynthPool(factory, size=3)
+        assert len(created) == 3
+        assert pool.available == 3
+
+        with pytest.raises(TypeError):
+            SynthPool('factory')
+
+        with pytest.raises(ValueError):
+            SynthPool(make_synth, size=0)
+
+        with pytest.raises(TypeError):
+            SynthPool(lambda: 'synth')
+
+    def test_checkout(self):
+
+        pool = SynthPool(make_synth, size=2)
+        with pool.checkout() as first:
+            with pool.checkout() as second:
+                assert first is not second
+                assert pool.available == 0
+
+                with pytest.raises(queue.Empty):
+                    with pool.checkout(timeout=0.01):
+                        pass
+
+            assert pool.available == 1
+
+        assert pool.available == 2
+
+        # Synth is checked in if an exception is raised
+        with pytest.raises(RuntimeError):
+            with pool.checkout():
+                raise RuntimeError()
+
+        assert pool.available == 2
+
+    def test_reset_on_checkin(self):
+
+        pool = SynthPool(make_synth)
+        with pool.checkout() as synth:
+            synth.set_overridden_parameters([(1, 0.2)])
+            synth.set_patch([0.9])
+            synth.render_length_secs = 0.5
+            synth.render_patch()
+
+        with pool.checkout() as checked_out:
+            assert checked_out is synth
+            assert synth.get_patch() == [(0, 0.5), (1, 0.5)]
+            assert synth.overridden_params == []
+            assert synth.render_length_secs == 0.1
+            assert not synth.rendered_patch
+
+    def test_synth_state(self, tmp_path):
+
+        synth = make_synth()
+        synth.set_overridden_parameters([(1, 0.75)])
+        synth.set_patch([0.25])
+        synth.save_state(tmp_path / 'synth.json')
+
+        pool = SynthPool(make_synth, synth_state=tmp_path / 'synth.json')
+        with pool.checkout() as synth:
+            assert synth.get_patch(skip_overridden=False) == [(0, 0.25), (1, 0.75)]
+            synth.set_overridden_parameters([])
+            synth.set_patch([0.5, 0.5])
+
+        with pool.checkout() as synth:
+            assert synth.get_patch(skip_overridden=False) == [(0, 0.25), (1, 0.75)]
+            assert synth.overridden_params == [(1, 0.75)]
+
+    def test_recycle_renders(self):
+
+        pool = SynthPool(make_synth, max_renders=3)
+        with pool.checkout() as synth:
+            synth.render_patch()
+            synth.render_batch(np.full((1, 2), 0.5))
+            assert pool.renders(synth) == 2
+
+        with pool.checkout() as same:
+            assert same is synth
+            synth.render_patch()
+            assert pool.renders(synth) == 3
+
+        with pool.checkout() as replacement:
+            assert replacement is not synth
+            assert pool.renders(replacement) == 0
+
+        assert pool.recycled == 1
+
+    def test_recycle_memory(self):
+
+        pool = SynthPool(make_synth, max_memory_growth=1)
+        with pool.checkout() as synth:
+            leak = np.ones(2 ** 24)
+
+        with pool.checkout() as replacement:
+            assert replacement is not synth
+
+        assert pool.recycled == 1
+        del leak
+
+    def test_recycle_error(self, caplog):
+
+        created = []
+        def factory():
+            if len(created) == 1:
+                raise RuntimeError('Unable to load plugin')
+            created.append(make_synth())
+            return created[-1]
+
+        pool = SynthPool(factory, max_renders=1)
+
+        # The caller's error isn't hidden and the synth stays in the pool
+        with pytest.raises(ValueError):
+            with pool.checkout() as synth:
+                synth.set_patch([(0, 0.9)])
+                synth.render_patch()
+                raise ValueError('Request failed')
+
+        assert 'Unable to replace synthesizer' in caplog.text
+        assert pool.available == 1
+        assert pool.recycled == 0
+
+        with pool.checkout() as same:
+            assert same is synth
+            assert synth.get_patch() == [(0, 0.5), (1, 0.5)]
+
+    def test_threads(self):
+
+        pool = SynthPool(lambda: NumpySynth(render_length_secs=0.1), size=2, max_renders=4)
+        patches = np.random.uniform(size=(12, 8))
+        results = [None] * len(patches)
+
+        def render(i):
+            with pool.checkout() as synth:
+                synth.set_patch(patches[i])
+                synth.render_patch()
+                results[i] = synth.get_audio().get_audio()
+
+        threads = [threading.Thread(target=render, args=(i,)) for i in range(len(patches))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        synth = NumpySynth(render_length_secs=0.1)
+        for values, audio in zip(patches, results):
+            synth.set_patch(values)
+            synth.render_patch()
+            assert np.array_equal(audio, synth.get_audio().get_audio())
+
+        assert pool.available == 2
+        assert pool.recycled in (2, 3)
+
+    def test_close(self):
+
+        pool = SynthPool(make_synth, size=2)
+        with pool:
+            synth = pool.acquire()
+
+        assert pool.available == 0
+        pool.release(synth)
+        assert pool.available == 0
+
+        with pytest.raises(ValueError):
+            pool.acquire()
+
+    def test_sound_match_pool(self):
+
+        synth_pool = SynthPool(make_synth, size=2)
+        pooled = [synth_pool.acquire() for i in range(2)]
+        for synth in pooled:
+            synth_pool.release(synth)
+
+        factory = lambda: SoundMatch(make_synth(), utils.ConstantEstimator())
+        with SoundMatchPool(sound_matcher_factory=factory, workers=2,
+                            synth_pool=synth_pool) as pool:
+            audio = AudioBuffer(np.zeros(4410), 44100)
+            patch = pool.submit(SoundMatchPool.match_patch, audio).result()
+            synths = [pool.submit(lambda matcher: matcher.synth).result() for i in range(4)]
+            matchers = [pool.submit(lambda matcher: matcher).result() for i in range(4)]
+
+        # Requests render with pooled synths, and each sound matcher has its own
+        # synth again when the request is finished
+        assert patch == [(0, 0.25), (1, 0.75)]
+        assert all(any(synth is p for p in pooled) for synth in synths)
+        assert not any(matcher.synth is p for matcher in matchers for p in pooled)
+        assert synth_pool.available == 2
+
+    def test_sound_match_pool_estimator_synth(self):
+
+        class RenderingEstimator(utils.ConstantEstimator):
+            def __init__(self, synth):
+                super().__init__()
+                self.synth = synth
+                self.used = []
+
+            def predict(self, input):
+                self.used.append(self.synth)
+                return super().predict(input)
+
+        synth_pool = SynthPool(make_synth)
+        with synth_pool.checkout() as pooled:
+            pass
+
+        synth = make_synth()
+        estimator = RenderingEstimator(synth)
+        with SoundMatchPool(SoundMatch(synth, estimator), synth_pool=synth_pool) as pool:
+            audio = AudioBuffer(np.zeros(4410), 44100)
+            pool.submit(SoundMatchPool.match_patch, audio).result()
+
+        # The estimator renders with the pooled synth, and has its own synth afterwards
+        assert estimator.used == [pooled]
+        assert estimator.synth is synth
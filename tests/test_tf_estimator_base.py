@@ -0,0 +1,98 @@
+"""
+Tests for TFEstimatorBase predictions
+"""
+
+import pytest
+import numpy as np
+
+from spiegelib import AudioBuffer, SoundMatch
+from spiegelib.estimator import MLP
+from spiegelib.features import FFT
+
+import utils
+
+class TestTFEstimatorBase():
+
+    def test_predict_single(self):
+
+        model = MLP((10,), 3)
+        input = np.random.rand(10).astype(np.float32)
+        prediction = model.predict(input)
+
+        assert prediction.shape == (3,)
+        np.testing.assert_array_almost_equal(prediction, model.model(input[np.newaxis])[0],
+                                             decimal=5)
+
+
+    def test_predict_batch(self):
+
+        model = MLP((10,), 3)
+        inputs = np.random.rand(25, 10).astype(np.float32)
+        expected = np.array([model.predict(input) for input in inputs])
+
+        np.testing.assert_array_almost_equal(model.predict(inputs, batch_size=8), expected,
+                                             decimal=5)
+        np.testing.assert_array_almost_equal(model.predict(iter(inputs), batch_size=8),
+                                             expected, decimal=5)
+        assert model.predict(np.empty((0, 10))).shape == (0, 3)
+
+
+    def test_predict_incorrect_shape(self):
+
+        model = MLP((10,), 3)
+        with pytest.raises(Exception):
+            model.predict(np.zeros((4, 9)))
+
+        with pytest.raises(Exception):
+            model.predict([np.zeros(10), np.zeros(9)])
+
+        with pytest.raises(ValueError):
+            model.predict(np.zeros((4, 10)), batch_size=-1)
+
+
+    def test_inference_mode(self):
+
+        model = MLP((10,), 3)
+        inputs = np.random.rand(4, 10).astype(np.float32)
+        expected = model.predict(inputs)
+
+        model.set_inference_mode(True)
+        assert model.inference_mode
+        for input, prediction in zip(inputs, expected):
+            np.testing.assert_array_almost_equal(model.predict(input), prediction, decimal=5)
+
+        # Batches are not run through the inference function
+        np.testing.assert_array_almost_equal(model.predict(inputs), expected, decimal=5)
+
+        model.set_inference_mode(False)
+        assert not model.inference_mode
+        np.testing.assert_array_almost_equal(model.predict(inputs[0]), expected[0], decimal=5)
+
+
+    def test_match_parameters_batch(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        features = FFT(output='magnitude')
+        model = MLP((2206,), 2)
+        matcher = SoundMatch(synth, model, features)
+
+        targets = [AudioBuffer(utils.make_test_sine(4410, f), 44100) for f in [220, 440, 880]]
+        expected = np.array([matcher.match_parameters(target) for target in targets])
+
+        np.testing.assert_array_almost_equal(matcher.match_parameters_batch(targets, 2),
+                                             expected, decimal=5)
+
+
+    def test_match_parameters_batch_expand(self):
+
+        synth = utils.SineSynth(render_length_secs=0.1)
+        matcher = SoundMatch(synth, MLP((2206,), 2), FFT(output='magnitude'))
+        targets = [AudioBuffer(utils.make_test_sine(4410, f), 44100) for f in [220, 440]]
+
+        patches = matcher.match_parameters_batch(targets, expand=True)
+        expected = [matcher.match_parameters(target, expand=True) for target in targets]
+
+        assert len(patches) == 2
+        for patch, expected_patch in zip(patches, expected):
+            np.testing.assert_array_almost_equal(np.array(patch), np.array(expected_patch),
+                                                 decimal=5)
@@ -4,6 +4,10 @@ Utility functions for testing
 
 import numpy as np
 
+from spiegelib import AudioBuffer
+from spiegelib.synth import SynthBase
+from spiegelib.estimator import EstimatorBase
+
 
 def make_test_sine(size, hz, rate=44100):
     samples = np.zeros(size)
@@ -25,3 +29,49 @@ def make_test_cosine(size, hz, rate=44100):
         phase = phase + phaseIncrement
 
     return samples
+
+
+class SineSynth(SynthBase):
+    """
+    Simple sine wave synthesizer used for testing. Has two parameters, the
+    first controls frequency and the second controls amplitude.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.parameters = {0: 'Frequency', 1: 'Amplitude'}
+        self.patch = [(0, 0.5), (1, 0.5)]
+        self.audio = None
+
+    def load_patch(self):
+        pass
+
+    def render_patch(self):
+        params = dict(self.patch)
+        hz = 100.0 + 1000.0 * params[0]
+        size = int(self.render_length_secs * self.sample_rate)
+        self.audio = params[1] * np.sin(2 * np.pi * hz * np.arange(size) / self.sample_rate)
+        self.rendered_patch = True
+
+    def get_audio(self):
+        return AudioBuffer(self.audio, self.sample_rate)
+
+    def randomize_patch(self):
+        self.set_patch(list(np.random.uniform(size=len(self.parameters))))
+
+
+class ConstantEstimator(EstimatorBase):
+    """
+    Estimator used for testing that always predicts the same parameters. If
+    an event is given, predictions wait until the event is set.
+    """
+
+    def __init__(self, params=(0.25, 0.75), event=None):
+        super().__init__()
+        self.params = list(params)
+        self.event = event
+
+    def predict(self, input):
+        if self.event is not None:
+            self.event.wait()
+        return list(self.params)